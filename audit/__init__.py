@@ -0,0 +1 @@
+from .registry import get_spec, record, register  # noqa: F401
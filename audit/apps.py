@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class AuditConfig(AppConfig):
+    """
+    Configuration for the audit app (shared history recording for models).
+    """
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'audit'
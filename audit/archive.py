@@ -0,0 +1,213 @@
+"""Move old history rows into compressed, date-partitioned archive files.
+
+Rows older than AUDIT_ARCHIVE_AFTER_DAYS are appended, in id order and in
+batches, to gzip JSON-lines files under AUDIT_ARCHIVE_DIR:
+
+    <dir>/<app_label>/<history_model>/<YYYY>/<MM>/<YYYY-MM-DD>.jsonl.gz
+
+Each batch is written and fsynced, then recorded in a `.checkpoint.json` next
+to the files, and only then deleted from the table. A run that is killed
+midway finishes the recorded batch on the next start; a batch written but not
+yet recorded is simply written again, and readers drop the duplicate ids.
+
+History is delta-encoded (see audit.history), so before a batch is deleted
+the first remaining row of each affected object is rewritten as a full
+checkpoint. The rows left in the table always rebuild on their own.
+"""
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .history import annotate_changes
+from .registry import _registry
+
+
+def archive_root():
+    return Path(getattr(settings, 'AUDIT_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'archive'))
+
+
+def _spec_for(history_model):
+    for spec in _registry.values():
+        if spec.history_model is history_model:
+            return spec
+    raise LookupError(f'{history_model.__name__} is not the history model of an audited model')
+
+
+def _model_dir(history_model):
+    meta = history_model._meta
+    return archive_root() / meta.app_label / meta.model_name
+
+
+def _partition(history_model, day):
+    return _model_dir(history_model) / f'{day:%Y}' / f'{day:%m}' / f'{day.isoformat()}.jsonl.gz'
+
+
+def _serialize(entry):
+    return {field.attname: getattr(entry, field.attname) for field in entry._meta.concrete_fields}
+
+
+def _deserialize(history_model, row):
+    entry = history_model(**row)
+    if isinstance(entry.timestamp, str):
+        entry.timestamp = parse_datetime(entry.timestamp)
+    return entry
+
+
+class HistoryArchiver:
+    """Archive one history model's old rows; see the module docstring."""
+
+    def __init__(self, history_model, batch_size=1000):
+        self.history_model = history_model
+        self.spec = _spec_for(history_model)
+        self.batch_size = batch_size
+        self.checkpoint_path = _model_dir(history_model) / '.checkpoint.json'
+
+    def run(self, cutoff, limit=None):
+        """
+        Archive rows older than `cutoff`; returns the number of rows moved.
+
+        `limit` caps the rows taken from the table in this run. Rows finished
+        for an interrupted run are counted in the result but not against it.
+        """
+        resumed = self.resume()
+        moved = 0
+        while limit is None or moved < limit:
+            size = self.batch_size if limit is None else min(self.batch_size, limit - moved)
+            rows = list(
+                self.history_model._default_manager.filter(timestamp__lt=cutoff).order_by('id')[:size]
+            )
+            if not rows:
+                break
+            self._write(rows)
+            self._save_checkpoint(rows[-1].id, cutoff)
+            self._remove(rows[-1].id, cutoff)
+            moved += len(rows)
+        return resumed + moved
+
+    def resume(self):
+        """Finish deleting a batch that was archived by an interrupted run."""
+        try:
+            state = json.loads(self.checkpoint_path.read_text())
+        except FileNotFoundError:
+            return 0
+        return self._remove(state['last_id'], parse_datetime(state['cutoff']))
+
+    def _write(self, rows):
+        by_day = {}
+        for entry in rows:
+            by_day.setdefault(timezone.localdate(entry.timestamp), []).append(entry)
+        for day, entries in by_day.items():
+            path = _partition(self.history_model, day)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Each append adds a gzip member; gzip readers concatenate them
+            with open(path, 'ab') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='ab') as out:
+                    for entry in entries:
+                        out.write(json.dumps(_serialize(entry), cls=DjangoJSONEncoder).encode() + b'\n')
+                raw.flush()
+                os.fsync(raw.fileno())
+
+    def _save_checkpoint(self, last_id, cutoff):
+        tmp = self.checkpoint_path.with_suffix('.tmp')
+        tmp.write_text(json.dumps({'last_id': last_id, 'cutoff': cutoff.isoformat()}))
+        os.replace(tmp, self.checkpoint_path)
+
+    def _remove(self, last_id, cutoff):
+        manager = self.history_model._default_manager
+        pk_field = self.spec.object_pk_field
+        archived = manager.filter(timestamp__lt=cutoff, id__lte=last_id)
+        with transaction.atomic():
+            pks = set(archived.values_list(pk_field, flat=True))
+            if pks:
+                self._promote_successors(pks, ~Q(timestamp__lt=cutoff, id__lte=last_id))
+            count, _ = archived.delete()
+        self.checkpoint_path.unlink(missing_ok=True)
+        return count
+
+    def _promote_successors(self, pks, remaining):
+        """Rewrite the first remaining row of each object as a full checkpoint."""
+        manager = self.history_model._default_manager
+        pk_field = self.spec.object_pk_field
+        firsts = (
+            manager.filter(remaining, **{f'{pk_field}__in': pks})
+            .order_by()
+            .values(pk_field)
+            .annotate(first=Min('id'))
+            .values_list('first', flat=True)
+        )
+        successors = list(manager.filter(id__in=list(firsts), is_checkpoint=False))
+        if not successors:
+            return
+        for entry in annotate_changes(self.spec.model, successors):
+            entry.data = entry.state
+            entry.is_checkpoint = True
+        manager.bulk_update(successors, ['data', 'is_checkpoint'])
+
+
+def archive_history(history_model, days=None, batch_size=1000, limit=None):
+    """Archive `history_model` rows older than `days` (AUDIT_ARCHIVE_AFTER_DAYS by default)."""
+    if days is None:
+        days = getattr(settings, 'AUDIT_ARCHIVE_AFTER_DAYS', 180)
+    cutoff = timezone.now() - timedelta(days=days)
+    return HistoryArchiver(history_model, batch_size=batch_size).run(cutoff, limit=limit)
+
+
+def read_archive(history_model, object_pk=None, since=None, until=None):
+    """
+    Return archived rows as unsaved `history_model` instances, in id order.
+
+    `object_pk` limits the result to one audited object; `since` and `until`
+    (dates, inclusive) limit which daily partitions are opened.
+    """
+    pk_field = _spec_for(history_model).object_pk_field
+    found = {}
+    for path in sorted(_model_dir(history_model).glob('*/*/*.jsonl.gz')):
+        day = date.fromisoformat(path.name.split('.')[0])
+        if (since and day < since) or (until and day > until):
+            continue
+        with gzip.open(path, 'rt') as lines:
+            for line in lines:
+                row = json.loads(line)
+                if object_pk is None or row[pk_field] == object_pk:
+                    found[row['id']] = row
+    return [_deserialize(history_model, found[key]) for key in sorted(found)]
+
+
+def _created_day(model, object_pk):
+    """The local date the object was created, from its auto_now_add field, or None."""
+    for field in model._meta.concrete_fields:
+        if getattr(field, 'auto_now_add', False):
+            created = model._base_manager.filter(pk=object_pk).values_list(field.attname, flat=True).first()
+            if created is None:
+                return None
+            return timezone.localdate(created) if isinstance(created, datetime) else created
+    return None
+
+
+def full_history(model, object_pk):
+    """
+    Return every history row for one object, archived and live, in id order.
+
+    Only the partitions between the object's creation and its oldest live
+    row are opened, as rows are archived oldest first.
+    """
+    spec = _registry[model]
+    live = list(
+        spec.history_model._default_manager.filter(**{spec.object_pk_field: object_pk}).order_by('id')
+    )
+    live_ids = {entry.id for entry in live}
+    since = _created_day(model, object_pk)
+    until = timezone.localdate(min(entry.timestamp for entry in live)) if live else None
+    archived = [
+        e for e in read_archive(spec.history_model, object_pk, since=since, until=until) if e.id not in live_ids
+    ]
+    return archived + live
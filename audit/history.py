@@ -0,0 +1,170 @@
+"""Rebuild full states and per-row changes from delta-encoded history.
+
+A checkpoint row holds a complete snapshot; every other row holds only the
+fields that changed. The state after a row is therefore the nearest earlier
+checkpoint with the later deltas applied in id order.
+"""
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models import Max, Q, Subquery
+from django.template.defaultfilters import date as date_filter
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.text import capfirst
+
+from .registry import get_spec
+
+
+def _spec(model):
+    spec = get_spec(model)
+    if spec is None:
+        raise LookupError(f'{model.__name__} is not registered for auditing')
+    return spec
+
+
+def _apply(state, entry):
+    data = entry.data or {}
+    if entry.is_checkpoint:
+        return dict(data)
+    merged = dict(state or {})
+    merged.update(data)
+    return merged
+
+
+def state_at(model, pk, until=None):
+    """
+    Return the recorded state of object `pk` after history row `until`
+    (the latest row if None), or None if it has no history.
+    """
+    spec = _spec(model)
+    rows = spec.history_model._default_manager.filter(**{spec.object_pk_field: pk})
+    if until is not None:
+        rows = rows.filter(id__lte=until)
+    checkpoint = rows.filter(is_checkpoint=True).order_by('-id').values('id')[:1]
+    state = None
+    for entry in rows.filter(id__gte=Subquery(checkpoint)).order_by('id'):
+        state = _apply(state, entry)
+    return state
+
+
+def annotate_changes(model, entries):
+    """
+    Set `state` (full state after the row) and `changes` (a list of
+    (field, old, new) tuples) on each history row in `entries`.
+
+    Rows may belong to different objects and come in any order. The other
+    rows each chain needs (back to its checkpoint, and any gaps between the
+    given rows) are fetched with at most two queries in total.
+    """
+    entries = list(entries)
+    if not entries:
+        return entries
+    spec = _spec(model)
+    pk_field = spec.object_pk_field
+    manager = spec.history_model._default_manager
+
+    spans = {}
+    for entry in entries:
+        low, high = spans.get(getattr(entry, pk_field), (entry.id, entry.id))
+        spans[getattr(entry, pk_field)] = (min(low, entry.id), max(high, entry.id))
+    # Chains whose first listed row is already a checkpoint need nothing else
+    first = {pk: low for pk, (low, high) in spans.items()}
+    needed = {
+        getattr(e, pk_field): spans[getattr(e, pk_field)]
+        for e in entries
+        if e.id == first[getattr(e, pk_field)] and not e.is_checkpoint
+    }
+
+    chains = {pk: [] for pk in spans}
+    if needed:
+        starts = dict(
+            manager.filter(
+                reduce(or_, (Q(**{pk_field: pk, 'id__lt': low}) for pk, (low, high) in needed.items())),
+                is_checkpoint=True,
+            ).order_by().values_list(pk_field).annotate(start=Max('id'))
+        )
+        spans.update({
+            pk: (starts[pk], high) for pk, (low, high) in needed.items() if pk in starts
+        })
+    listed = {entry.id for entry in entries}
+    extra = manager.filter(
+        reduce(or_, (Q(**{pk_field: pk, 'id__gte': low, 'id__lte': high}) for pk, (low, high) in spans.items()))
+    ).exclude(id__in=listed).order_by()
+    for entry in entries + list(extra):
+        chains[getattr(entry, pk_field)].append(entry)
+
+    for chain in chains.values():
+        chain.sort(key=lambda e: e.id)
+        state = None
+        for entry in chain:
+            new = _apply(state, entry)
+            old = state or {}
+            entry.state = new
+            entry.changes = [
+                (field, old.get(field), value)
+                for field, value in new.items()
+                if field not in old or old[field] != value
+            ]
+            state = new
+    return entries
+
+
+def _display(field, value, related, date_format):
+    if value is None or value == '':
+        return None
+    if field is None:
+        return value
+    if field.is_relation:
+        obj = related[field.related_model].get(value)
+        return str(obj) if obj is not None else f'#{value}'
+    if isinstance(field, models.DateTimeField):
+        parsed = parse_datetime(value)
+        if parsed is None:
+            return value
+        if timezone.is_aware(parsed):
+            parsed = timezone.localtime(parsed)
+        return date_filter(parsed, date_format)
+    if isinstance(field, models.DateField):
+        parsed = parse_date(value)
+        return date_filter(parsed, date_format.split(' ')[0]) if parsed else value
+    return value
+
+
+def describe_changes(model, entries, date_format='Y-m-d H:i'):
+    """
+    Set `display_changes` on rows annotated by annotate_changes(): a list of
+    (label, old, new) with field verbose names, related objects shown by name
+    instead of id (one query per related model for all the rows) and dates
+    formatted with the `date` filter.
+    """
+    entries = list(entries)
+    fields = {}
+    wanted = {}
+    for entry in entries:
+        for name, old, new in entry.changes:
+            if name not in fields:
+                try:
+                    fields[name] = model._meta.get_field(name)
+                except FieldDoesNotExist:
+                    # A field recorded before it was removed from the model
+                    fields[name] = None
+            field = fields[name]
+            if field is not None and field.is_relation:
+                wanted.setdefault(field.related_model, set()).update(v for v in (old, new) if v is not None)
+    related = {
+        related_model: related_model._base_manager.in_bulk(ids)
+        for related_model, ids in wanted.items()
+    }
+    for entry in entries:
+        entry.display_changes = [
+            (
+                capfirst(fields[name].verbose_name) if fields[name] is not None else capfirst(name),
+                _display(fields[name], old, related, date_format),
+                _display(fields[name], new, related, date_format),
+            )
+            for name, old, new in entry.changes
+        ]
+    return entries
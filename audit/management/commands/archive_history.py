@@ -0,0 +1,53 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from audit import registry
+from audit.archive import archive_history, archive_root
+
+
+class Command(BaseCommand):
+    help = "Move old history rows into gzip JSON-lines files (resumable; see audit/archive.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=None,
+            help="Archive rows older than this many days (default AUDIT_ARCHIVE_AFTER_DAYS)",
+        )
+        parser.add_argument("--model", action="append", help="History model label, e.g. bookings.BookingHistory")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--limit", type=int, default=None, help="Take at most this many rows from each table; finishing an interrupted batch does not count")
+        parser.add_argument("--vacuum", action="store_true", help="Reclaim space and refresh statistics afterwards")
+
+    def handle(self, *args, **options):
+        if options["model"]:
+            try:
+                models = [apps.get_model(label) for label in options["model"]]
+            except (LookupError, ValueError) as exc:
+                raise CommandError(str(exc))
+        else:
+            models = [registry.get_spec(model).history_model for model in registry.registered_models()]
+
+        days = options["days"] if options["days"] is not None else getattr(settings, "AUDIT_ARCHIVE_AFTER_DAYS", 180)
+        for model in models:
+            try:
+                moved = archive_history(model, days=days, batch_size=options["batch_size"], limit=options["limit"])
+            except LookupError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(f"{model._meta.label}: archived {moved} rows older than {days} days")
+
+        if options["vacuum"]:
+            self._vacuum(models)
+        self.stdout.write(self.style.SUCCESS(f"Archive directory: {archive_root()}"))
+
+    def _vacuum(self, models):
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute("VACUUM")
+            elif connection.vendor == "postgresql":
+                for model in models:
+                    cursor.execute(f"VACUUM ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+            else:
+                for model in models:
+                    cursor.execute(f"ANALYZE TABLE {connection.ops.quote_name(model._meta.db_table)}")
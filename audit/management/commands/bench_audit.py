@@ -0,0 +1,250 @@
+import time
+import traceback
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+from django.db.models.signals import post_delete, post_save
+from django.forms.models import model_to_dict
+from django.utils import timezone
+
+from audit import registry
+from bookings.models import Booking
+from menu.models import Restaurant
+
+
+# The receivers below are copied from bookings/signals.py and
+# reviews/signals.py as they were before the audit app, so their cost can be
+# measured against the sender-scoped receivers.
+
+def _safe_get_model(app_label, model_name):
+    try:
+        return apps.get_model(app_label, model_name)
+    except Exception:
+        return None
+
+
+def _legacy_booking_saved(sender, instance, created, **kwargs):
+    Booking = _safe_get_model('bookings', 'Booking')
+    if Booking is None or sender != Booking:
+        return
+
+    BookingHistory = _safe_get_model('bookings', 'BookingHistory')
+    try:
+        data = model_to_dict(instance, fields=['id', 'user', 'restaurant', 'date', 'guests', 'special_requests', 'created_at'])
+        data['user'] = data.get('user') and int(data['user'])
+        data['restaurant'] = data.get('restaurant') and int(data['restaurant'])
+        if data.get('date'):
+            try:
+                data['date'] = instance.date.isoformat()
+            except Exception:
+                pass
+        action = 'created' if created else 'updated'
+        if BookingHistory is not None:
+            try:
+                BookingHistory.objects.create(
+                    booking=instance,
+                    booking_pk=instance.pk,
+                    user=instance.user if hasattr(instance, 'user') else None,
+                    action=action,
+                    data=data,
+                )
+            except Exception:
+                traceback.print_exc()
+    except Exception:
+        traceback.print_exc()
+
+
+def _legacy_booking_deleted(sender, instance, **kwargs):
+    Booking = _safe_get_model('bookings', 'Booking')
+    if Booking is None or sender != Booking:
+        return
+
+    BookingHistory = _safe_get_model('bookings', 'BookingHistory')
+    try:
+        data = model_to_dict(instance, fields=['id', 'user', 'restaurant', 'date', 'guests', 'special_requests', 'created_at'])
+        data['user'] = data.get('user') and int(data['user'])
+        data['restaurant'] = data.get('restaurant') and int(data['restaurant'])
+        if data.get('date'):
+            try:
+                data['date'] = instance.date.isoformat()
+            except Exception:
+                pass
+        if BookingHistory is not None:
+            try:
+                BookingHistory.objects.create(
+                    booking=None,
+                    booking_pk=instance.pk,
+                    user=instance.user if hasattr(instance, 'user') else None,
+                    action='deleted',
+                    data=data,
+                )
+            except Exception:
+                traceback.print_exc()
+    except Exception:
+        traceback.print_exc()
+
+
+def _legacy_sanitize_value(v):
+    if v is None:
+        return None
+    if isinstance(v, (str, int, float, bool)):
+        return v
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    if isinstance(v, Decimal):
+        try:
+            return float(v)
+        except Exception:
+            return str(v)
+    if isinstance(v, FieldFile):
+        try:
+            if v.name:
+                try:
+                    return v.url
+                except Exception:
+                    return v.name
+            return None
+        except Exception:
+            return None
+    try:
+        return str(v)
+    except Exception:
+        return None
+
+
+def _legacy_review_saved(sender, instance, created, **kwargs):
+    if sender.__name__ != 'Review':
+        return
+    try:
+        ReviewHistory = apps.get_model('reviews', 'ReviewHistory')
+        data = model_to_dict(instance, fields=[f.name for f in instance._meta.fields if f.name not in ('id',)])
+        data = {k: _legacy_sanitize_value(v) for k, v in data.items()}
+        ReviewHistory.objects.create(
+            review=instance if created else None,
+            review_pk=instance.pk,
+            user=getattr(instance, 'user', None),
+            action='created' if created else 'updated',
+            data=data,
+        )
+    except Exception:
+        traceback.print_exc()
+
+
+def _legacy_review_deleted(sender, instance, **kwargs):
+    if sender.__name__ != 'Review':
+        return
+    try:
+        ReviewHistory = apps.get_model('reviews', 'ReviewHistory')
+        data = model_to_dict(instance, fields=[f.name for f in instance._meta.fields if f.name not in ('id',)])
+        data = {k: _legacy_sanitize_value(v) for k, v in data.items()}
+        ReviewHistory.objects.create(
+            review=None,
+            review_pk=instance.pk,
+            user=getattr(instance, 'user', None),
+            action='deleted',
+            data=data,
+        )
+    except Exception:
+        traceback.print_exc()
+
+
+LEGACY = [
+    (post_save, _legacy_booking_saved),
+    (post_delete, _legacy_booking_deleted),
+    (post_save, _legacy_review_saved),
+    (post_delete, _legacy_review_deleted),
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measure per-save overhead of history recording: legacy unscoped receivers vs the audit app"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=500)
+
+    def handle(self, *args, **options):
+        n = options["iterations"]
+        results = {}
+        for label, legacy in (("before", True), ("after", False)):
+            self._switch(legacy)
+            try:
+                results[label] = self._measure(n)
+            finally:
+                self._switch(False)
+
+        snapshot = self._measure_snapshot(n * 10)
+
+        self.stdout.write(f"{n} saves per case, times in microseconds per save")
+        self.stdout.write(f"{'case':32} {'before':>10} {'after':>10}")
+        for case in ("unrelated model (session)", "booking (with history row)"):
+            self.stdout.write(f"{case:32} {results['before'][case]:10.1f} {results['after'][case]:10.1f}")
+        self.stdout.write(
+            f"{'snapshot only (no DB)':32} {snapshot['model_to_dict']:10.1f} {snapshot['plan']:10.1f}"
+        )
+
+    def _switch(self, legacy):
+        for model in registry.registered_models():
+            if legacy:
+                registry.disconnect(model)
+            else:
+                registry.connect(model)
+        for signal, receiver in LEGACY:
+            if legacy:
+                signal.connect(receiver, weak=False, dispatch_uid=f"bench.{receiver.__name__}")
+            else:
+                signal.disconnect(dispatch_uid=f"bench.{receiver.__name__}")
+
+    def _measure(self, n):
+        timings = {}
+        try:
+            with transaction.atomic():
+                user = get_user_model().objects.create_user(username="bench-audit-user")
+                restaurant = Restaurant.objects.create(name="Bench", slug="bench-audit")
+                booking = Booking.objects.create(
+                    user=user, restaurant=restaurant, date=timezone.now() + timedelta(days=1), guests=2
+                )
+                session = SessionStore()
+                session["k"] = 1
+                session.create()
+                session_obj = session.model.objects.get(session_key=session.session_key)
+
+                started = time.perf_counter()
+                for _ in range(n):
+                    session_obj.save()
+                timings["unrelated model (session)"] = (time.perf_counter() - started) / n * 1e6
+
+                started = time.perf_counter()
+                for i in range(n):
+                    booking.guests = 2 + i % 3
+                    booking.save()
+                timings["booking (with history row)"] = (time.perf_counter() - started) / n * 1e6
+                raise Rollback
+        except Rollback:
+            pass
+        return timings
+
+    def _measure_snapshot(self, n):
+        booking = Booking(
+            pk=1, user_id=1, restaurant_id=1, date=timezone.now(), guests=2, special_requests="Window"
+        )
+        plan = registry.get_spec(Booking).plan
+        started = time.perf_counter()
+        for _ in range(n):
+            data = model_to_dict(booking, fields=['id', 'user', 'restaurant', 'date', 'guests', 'special_requests', 'created_at'])
+            data['date'] = booking.date.isoformat()
+        legacy = (time.perf_counter() - started) / n * 1e6
+        started = time.perf_counter()
+        for _ in range(n):
+            plan.snapshot(booking)
+        compiled = (time.perf_counter() - started) / n * 1e6
+        return {"model_to_dict": legacy, "plan": compiled}
@@ -0,0 +1,126 @@
+"""QuerySet methods that change many rows and still record history.
+
+Each operation runs one statement for the data (UPDATE, DELETE or INSERT,
+split into batches of PK_BATCH_SIZE rows) plus one bulk insert per history
+model, instead of one save and one history INSERT per object. delete() is
+audited too; the plain QuerySet.update() stays available, unaudited, for
+callers that do not want history.
+"""
+from django.db import connections, models, transaction
+
+from .registry import get_spec, suppressed
+from .writer import history_writer
+
+
+# Primary keys per UPDATE/DELETE, kept under SQLite's bound-parameter limit
+PK_BATCH_SIZE = 900
+
+
+def _pk_batches(objects):
+    pks = [obj.pk for obj in objects]
+    for start in range(0, len(pks), PK_BATCH_SIZE):
+        yield pks[start:start + PK_BATCH_SIZE]
+
+
+class AuditedQuerySet(models.QuerySet):
+    """QuerySet for models registered with audit.register()."""
+
+    def _spec(self):
+        spec = get_spec(self.model)
+        if spec is None:
+            raise LookupError(f'{self.model.__name__} is not registered for auditing')
+        return spec
+
+    def _locked(self):
+        """Return this queryset locked for update where the database supports it."""
+        features = connections[self.db].features
+        if not features.has_select_for_update:
+            return self
+        if features.has_select_for_update_of:
+            # Lock only the audited rows, not rows joined in by select_related()
+            return self.select_for_update(of=('self',))
+        return self.select_for_update()
+
+    def audited_update(self, **kwargs):
+        """
+        Update every matching row with one UPDATE and record 'updated' history.
+
+        Returns the number of rows updated, like update(). Values may be
+        expressions such as F('guests') + 1; the new state is then read back
+        with one extra SELECT.
+        """
+        spec = self._spec()
+        with transaction.atomic(using=self.db):
+            objects = list(self._locked())
+            if not objects:
+                return 0
+            base = self.model._base_manager.using(self.db)
+            count = sum(base.filter(pk__in=pks).update(**kwargs) for pks in _pk_batches(objects))
+            if any(hasattr(value, 'resolve_expression') for value in kwargs.values()):
+                after = base.in_bulk([obj.pk for obj in objects])
+                loaded = {obj.pk: obj._audit_state for obj in objects}
+                updated = [after[obj.pk] for obj in objects if obj.pk in after]
+                # The re-read objects were loaded with the new values; diff against the old
+                previous = [loaded[obj.pk] for obj in updated]
+            else:
+                for obj in objects:
+                    for name, value in kwargs.items():
+                        setattr(obj, name, value)
+                updated = objects
+                previous = None
+            self._after_audited_update(objects, updated)
+            spec.record_many(updated, 'updated', previous=previous)
+        return count
+
+    def _after_audited_update(self, before, after):
+        """
+        Hook for models that keep derived data in step with updates.
+
+        `before` are the objects as loaded (already carrying the new values
+        when no expressions were used), `after` the updated objects.
+        """
+
+    def delete(self):
+        return self.audited_delete()
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def audited_delete(self):
+        """
+        Delete every matching row and record 'deleted' history in one bulk insert.
+
+        The per-instance post_delete history receiver is skipped so each row
+        gets exactly one history entry.
+        """
+        spec = self._spec()
+        with transaction.atomic(using=self.db):
+            objects = list(self._locked())
+            if not objects:
+                return 0, {}
+            entries = [spec.build(obj, 'deleted') for obj in objects]
+            deleted = 0
+            per_model = {}
+            with suppressed(self.model):
+                for pks in _pk_batches(objects):
+                    count, counts = self.model._base_manager.using(self.db).filter(pk__in=pks).delete()
+                    deleted += count
+                    for label, n in counts.items():
+                        per_model[label] = per_model.get(label, 0) + n
+            history_writer.write_many(entries)
+        return deleted, per_model
+
+    def audited_bulk_create(self, objs, **kwargs):
+        """bulk_create() the objects and record 'created' history for each."""
+        spec = self._spec()
+        with transaction.atomic(using=self.db):
+            created = self.bulk_create(objs, **kwargs)
+            missing = [obj for obj in created if obj.pk is None]
+            if missing:
+                raise ValueError('The database did not return primary keys; cannot record history.')
+            self._after_audited_bulk_create(created)
+            spec.record_many(created, 'created')
+        return created
+
+    def _after_audited_bulk_create(self, objs):
+        """Hook for models that keep derived data in step with inserts."""
@@ -0,0 +1,270 @@
+"""Per-model history recording.
+
+A model opts in with one declaration next to its history model:
+
+    audit.register(Booking, BookingHistory, fields=['user', 'restaurant', 'date'])
+
+Receivers are connected with `sender=` the audited model, so saves of any other
+model (sessions, allauth rows, profiles, last_login updates) never reach them.
+The history model is expected to have a nullable foreign key named after the
+audited model (e.g. `booking`), an integer `<name>_pk`, a nullable `user`
+foreign key, and `action`, `data` and `is_checkpoint` fields.
+
+History is delta-encoded: a checkpoint row stores the full snapshot, other
+rows store only the fields that changed. A save is diffed between the row as
+stored and the state the instance was loaded with, or, for models registered
+with `concurrent_saves=True`, the latest recorded state read under the row's
+lock (see AuditSpec.record_update); bulk operations diff against the rows
+they locked.
+A checkpoint is written on create and then every AUDIT_CHECKPOINT_INTERVAL
+rows per object; the chain length is tracked per process, so each process
+also starts an object's chain with a checkpoint.
+See audit.history for rebuilding full states.
+"""
+import threading
+import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.signals import post_delete, post_init, post_save
+
+from .snapshot import SnapshotPlan
+from .writer import SYNC, history_writer
+
+
+class AuditSpec:
+    """How one model's changes are written to its history model."""
+
+    def __init__(self, model, history_model, plan, object_field, user_field, concurrent_saves=False):
+        self.model = model
+        self.history_model = history_model
+        self.plan = plan
+        self.object_field = object_field
+        self.object_pk_field = f'{object_field}_pk'
+        self.concurrent_saves = concurrent_saves
+        # Read the raw id so recording never loads the related user
+        self.user_attname = model._meta.get_field(user_field).attname if user_field else None
+
+    def build(self, instance, action, data=None, previous=None, current=None, force_checkpoint=False):
+        """
+        Return an unsaved history row for `instance`.
+
+        `previous` is the recorded state to diff against; it defaults to the
+        state captured when the instance was loaded or last recorded.
+        `current` is the state to record; it defaults to the instance's.
+        `force_checkpoint` records the full state whatever the chain length.
+        """
+        checkpoint = True
+        if data is None:
+            if current is None:
+                current = self.plan.snapshot(instance)
+            if previous is None:
+                previous = instance.__dict__.get('_audit_state')
+            checkpoint = (
+                force_checkpoint or previous is None or action == 'created'
+                or _chains.is_due(self.model, instance.pk)
+            )
+            if checkpoint:
+                _chains.reset(self.model, instance.pk)
+                data = current
+            else:
+                data = {k: v for k, v in current.items() if k not in previous or previous[k] != v}
+            instance._audit_state = current
+        return self.history_model(**{
+            # The object link is cleared for deletions so the history outlives the row
+            self.object_field: None if action == 'deleted' else instance,
+            self.object_pk_field: instance.pk,
+            'user_id': getattr(instance, self.user_attname) if self.user_attname else None,
+            'action': action,
+            'data': data,
+            'is_checkpoint': checkpoint,
+        })
+
+    def record(self, instance, action, data=None):
+        """Write one history row for `instance`."""
+        entry = self.build(instance, action, data=data)
+        history_writer.write_many([entry])
+        return entry
+
+    def record_update(self, instance):
+        """
+        Write the 'updated' row for an instance that was just saved.
+
+        The row is read back as stored, so update_fields saves record what was
+        written, and diffed against the instance's load-time state. That state
+        is not necessarily what history last recorded: a stale copy saved
+        after another user's save writes back fields that save changed, and
+        the diff would miss them. For models registered with
+        `concurrent_saves=True` the latest recorded state is read instead,
+        under the row's lock so concurrent saves are recorded one after the
+        other. That costs a savepoint, a SELECT FOR UPDATE and the history
+        reads of state_at() on every save, so it is only done in the sync
+        writer mode; the buffered modes batch per transaction level and
+        cannot see rows still waiting to be written.
+        """
+        from .history import state_at
+
+        using = instance._state.db or DEFAULT_DB_ALIAS
+        rows = self.model._base_manager.using(using).filter(pk=instance.pk)
+        if not self.concurrent_saves or history_writer.mode != SYNC:
+            return self._record_stored(instance, rows)
+        with transaction.atomic(using=using):
+            if connections[using].features.has_select_for_update:
+                rows = rows.select_for_update()
+            previous = state_at(self.model, instance.pk)
+            return self._record_stored(instance, rows, previous=previous, force_checkpoint=previous is None)
+
+    def _record_stored(self, instance, rows, previous=None, force_checkpoint=False):
+        stored = rows.values(*self.plan.attnames).first()
+        if stored is None:
+            return None
+        entry = self.build(
+            instance, 'updated', previous=previous, current=self.plan.snapshot_values(stored),
+            force_checkpoint=force_checkpoint,
+        )
+        history_writer.write_many([entry])
+        return entry
+
+    def record_many(self, instances, action, previous=None):
+        """
+        Write history rows for many instances with one bulk insert.
+
+        `previous`, if given, is a list of states to diff each instance against.
+        """
+        previous = previous or [None] * len(instances)
+        entries = [self.build(obj, action, previous=prev) for obj, prev in zip(instances, previous)]
+        history_writer.write_many(entries)
+        return entries
+
+    def on_init(self, sender, instance, **kwargs):
+        # Remember the loaded state so the next save records only what changed
+        instance._audit_state = self.plan.snapshot(instance) if instance.pk is not None else None
+
+    def on_save(self, sender, instance, created, raw=False, **kwargs):
+        if raw or _is_suppressed(sender):
+            # Fixture loading, or a bulk operation that records its own history
+            return
+        try:
+            if created:
+                self.record(instance, 'created')
+            else:
+                self.record_update(instance)
+        except Exception:
+            # don't let history failures break the main save; log to stderr
+            traceback.print_exc()
+
+    def on_delete(self, sender, instance, **kwargs):
+        if _is_suppressed(sender):
+            return
+        try:
+            self.record(instance, 'deleted')
+        except Exception:
+            traceback.print_exc()
+
+
+class _ChainTracker:
+    """Per-process count of delta rows written since each object's last checkpoint."""
+
+    def __init__(self, size=20000):
+        self.size = size
+        self._lock = threading.Lock()
+        self._chains = OrderedDict()
+
+    def is_due(self, model, pk):
+        """Return True if the next row for the object must be a checkpoint."""
+        interval = getattr(settings, 'AUDIT_CHECKPOINT_INTERVAL', 10)
+        key = (model, pk)
+        with self._lock:
+            length = self._chains.pop(key, None)
+            if length is None or length + 1 >= interval:
+                return True
+            self._chains[key] = length + 1
+            return False
+
+    def reset(self, model, pk):
+        with self._lock:
+            self._chains.pop((model, pk), None)
+            self._chains[(model, pk)] = 0
+            while len(self._chains) > self.size:
+                self._chains.popitem(last=False)
+
+
+_chains = _ChainTracker()
+_registry = {}
+_suppressed = threading.local()
+
+
+def _is_suppressed(model):
+    return model in getattr(_suppressed, 'models', ())
+
+
+@contextmanager
+def suppressed(model):
+    """Skip the per-instance receivers for `model` in this thread while active."""
+    previous = getattr(_suppressed, 'models', frozenset())
+    _suppressed.models = previous | {model}
+    try:
+        yield
+    finally:
+        _suppressed.models = previous
+
+
+def register(model, history_model, fields=None, exclude=('id',), object_field=None, user_field='user',
+             concurrent_saves=False):
+    """
+    Start recording history for `model` into `history_model`.
+
+    Pass `concurrent_saves=True` for models whose rows are edited by more than
+    one user at a time, so stale copies are recorded correctly (see
+    AuditSpec.record_update).
+    """
+    spec = AuditSpec(
+        model,
+        history_model,
+        SnapshotPlan(model, fields=fields, exclude=exclude),
+        object_field or model._meta.model_name,
+        user_field,
+        concurrent_saves,
+    )
+    _registry[model] = spec
+    connect(model)
+    return spec
+
+
+def _uid(model, signal_name):
+    return f'audit.{model._meta.label_lower}.{signal_name}'
+
+
+def connect(model):
+    spec = _registry[model]
+    post_init.connect(spec.on_init, sender=model, weak=False, dispatch_uid=_uid(model, 'post_init'))
+    post_save.connect(spec.on_save, sender=model, weak=False, dispatch_uid=_uid(model, 'post_save'))
+    post_delete.connect(spec.on_delete, sender=model, weak=False, dispatch_uid=_uid(model, 'post_delete'))
+
+
+def disconnect(model):
+    """Stop recording for `model` without forgetting its spec (see connect())."""
+    post_init.disconnect(sender=model, dispatch_uid=_uid(model, 'post_init'))
+    post_save.disconnect(sender=model, dispatch_uid=_uid(model, 'post_save'))
+    post_delete.disconnect(sender=model, dispatch_uid=_uid(model, 'post_delete'))
+
+
+def get_spec(model):
+    """Return the AuditSpec for `model` (a class or instance), or None."""
+    if not isinstance(model, type):
+        model = type(model)
+    return _registry.get(model)
+
+
+def registered_models():
+    return list(_registry)
+
+
+def record(instance, action, data=None):
+    """Write a history row for an action the signals do not see, e.g. a soft delete."""
+    spec = get_spec(instance)
+    if spec is None:
+        raise LookupError(f'{type(instance).__name__} is not registered for auditing')
+    return spec.record(instance, action, data=data)
@@ -0,0 +1,94 @@
+import gzip
+import io
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from audit.archive import HistoryArchiver, full_history, read_archive
+from audit.history import state_at
+from bookings.models import Booking, BookingHistory
+from menu.models import Restaurant
+
+
+class HistoryArchiveTests(TestCase):
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir, ignore_errors=True)
+        override = override_settings(AUDIT_ARCHIVE_DIR=Path(self.archive_dir), AUDIT_CHECKPOINT_INTERVAL=10)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        user = get_user_model().objects.create_user(username="diner", password="pass1234")
+        restaurant = Restaurant.objects.create(name="Test Restaurant", slug="test-restaurant")
+        self.booking = Booking.objects.create(
+            user=user, restaurant=restaurant, date=timezone.now() + timedelta(days=1), guests=2
+        )
+        for guests in (3, 4, 5):
+            self.booking.guests = guests
+            self.booking.save()
+        # The created row and the first two updates are a year old
+        self.rows = list(BookingHistory.objects.order_by("id"))
+        old = timezone.now() - timedelta(days=365)
+        BookingHistory.objects.filter(id__in=[r.id for r in self.rows[:3]]).update(timestamp=old)
+        Booking.all_objects.filter(pk=self.booking.pk).update(created_at=old)
+        self.cutoff = timezone.now() - timedelta(days=180)
+
+    def test_command_moves_old_rows_to_gzip_partitions(self):
+        call_command("archive_history", "--model", "bookings.BookingHistory", "--batch-size", "2", stdout=io.StringIO())
+        self.assertEqual(list(BookingHistory.objects.values_list("id", flat=True)), [self.rows[3].id])
+        files = list(Path(self.archive_dir).glob("bookings/bookinghistory/*/*/*.jsonl.gz"))
+        self.assertEqual(len(files), 1)
+        with gzip.open(files[0], "rt") as lines:
+            self.assertEqual([json.loads(line)["id"] for line in lines], [r.id for r in self.rows[:3]])
+
+    def test_remaining_rows_still_rebuild_current_state(self):
+        expected = state_at(Booking, self.booking.pk)
+        HistoryArchiver(BookingHistory).run(self.cutoff)
+        remaining = BookingHistory.objects.get()
+        self.assertTrue(remaining.is_checkpoint)
+        self.assertEqual(state_at(Booking, self.booking.pk), expected)
+
+    def test_read_api_returns_archived_and_live_rows(self):
+        HistoryArchiver(BookingHistory).run(self.cutoff)
+        archived = read_archive(BookingHistory, self.booking.pk)
+        self.assertEqual([e.id for e in archived], [r.id for r in self.rows[:3]])
+        self.assertEqual(archived[0].action, "created")
+        self.assertEqual(archived[1].data, {"guests": 3})
+        self.assertEqual(read_archive(BookingHistory, self.booking.pk + 1), [])
+        self.assertEqual([e.id for e in full_history(Booking, self.booking.pk)], [r.id for r in self.rows])
+
+    def test_interrupted_batch_is_finished_on_resume(self):
+        archiver = HistoryArchiver(BookingHistory, batch_size=2)
+        batch = self.rows[:2]
+        # Simulate a run killed after writing and recording a batch
+        archiver._write(batch)
+        archiver._save_checkpoint(batch[-1].id, self.cutoff)
+        self.assertEqual(archiver.resume(), 2)
+        self.assertFalse(archiver.checkpoint_path.exists())
+        self.assertEqual(BookingHistory.objects.count(), 2)
+        # A batch written again after a crash is not duplicated on read
+        archiver._write(batch)
+        self.assertEqual(archiver.run(self.cutoff), 1)
+        self.assertEqual([e.id for e in read_archive(BookingHistory)], [r.id for r in self.rows[:3]])
+
+    def test_resumed_rows_do_not_count_against_the_limit(self):
+        archiver = HistoryArchiver(BookingHistory, batch_size=2)
+        archiver._write(self.rows[:2])
+        archiver._save_checkpoint(self.rows[1].id, self.cutoff)
+        self.assertEqual(archiver.run(self.cutoff, limit=1), 3)
+        self.assertEqual(list(BookingHistory.objects.values_list("id", flat=True)), [self.rows[3].id])
+
+    def test_full_history_opens_only_partitions_in_the_objects_lifetime(self):
+        HistoryArchiver(BookingHistory).run(self.cutoff)
+        # A partition from before the booking existed is never opened
+        stray = Path(self.archive_dir) / "bookings/bookinghistory/2000/01/2000-01-01.jsonl.gz"
+        stray.parent.mkdir(parents=True)
+        stray.write_bytes(b"not gzip")
+        self.assertEqual([e.id for e in full_history(Booking, self.booking.pk)], [r.id for r in self.rows])
@@ -0,0 +1,147 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from audit.history import annotate_changes, describe_changes, state_at
+from bookings.models import Booking, BookingHistory
+from menu.models import Restaurant
+
+
+@override_settings(AUDIT_CHECKPOINT_INTERVAL=3)
+class DeltaHistoryTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="diner", password="pass1234")
+        self.restaurant = Restaurant.objects.create(name="Test Restaurant", slug="test-restaurant")
+        self.booking = Booking.objects.create(
+            user=self.user, restaurant=self.restaurant, date=timezone.now() + timedelta(days=1), guests=2
+        )
+
+    def rows(self):
+        return list(BookingHistory.objects.filter(booking_pk=self.booking.pk).order_by("id"))
+
+    def test_updates_store_only_changed_fields(self):
+        self.booking.guests = 4
+        self.booking.save()
+        created, updated = self.rows()
+        self.assertTrue(created.is_checkpoint)
+        self.assertIn("restaurant", created.data)
+        self.assertFalse(updated.is_checkpoint)
+        self.assertEqual(updated.data, {"guests": 4})
+
+    def test_reloaded_instance_diffs_against_loaded_state(self):
+        booking = Booking.objects.get(pk=self.booking.pk)
+        booking.special_requests = "Window"
+        booking.save()
+        self.assertEqual(self.rows()[-1].data, {"special_requests": "Window"})
+
+    def test_checkpoint_every_interval(self):
+        for guests in range(3, 8):
+            self.booking.guests = guests
+            self.booking.save()
+        self.assertEqual([r.is_checkpoint for r in self.rows()], [True, False, False, True, False, False])
+
+    def test_state_at_rebuilds_full_snapshots(self):
+        states = [self.booking.history.get().data]
+        for guests in range(3, 8):
+            self.booking.guests = guests
+            self.booking.save()
+            states.append(dict(states[-1], guests=guests))
+        for row, expected in zip(self.rows(), states):
+            self.assertEqual(state_at(Booking, self.booking.pk, until=row.id), expected)
+        self.assertEqual(state_at(Booking, self.booking.pk)["guests"], 7)
+
+    def test_audited_update_with_expression_records_delta(self):
+        Booking.objects.filter(pk=self.booking.pk).audited_update(guests=F("guests") + 1)
+        self.assertEqual(self.rows()[-1].data, {"guests": 3})
+
+    def test_annotate_changes_uses_three_queries(self):
+        for guests in range(3, 8):
+            self.booking.guests = guests
+            self.booking.save()
+        latest = BookingHistory.objects.filter(booking_pk=self.booking.pk).order_by("-id")[:2]
+        with self.assertNumQueries(3):
+            entries = annotate_changes(Booking, latest)
+        self.assertEqual(entries[0].changes, [("guests", 6, 7)])
+        self.assertEqual(entries[0].state["restaurant"], self.restaurant.pk)
+
+    def test_booking_detail_shows_changes(self):
+        self.booking.guests = 5
+        self.booking.save()
+        self.client.login(username="diner", password="pass1234")
+        response = self.client.get(reverse("bookings:booking_detail", args=[self.booking.pk]))
+        self.assertContains(response, "Guests: 2 → 5")
+
+    def test_changes_show_names_and_dates(self):
+        other = Restaurant.objects.create(name="Harbour Grill", slug="harbour-grill")
+        when = timezone.make_aware(timezone.datetime(2099, 10, 19, 19, 0))
+        self.booking.restaurant = other
+        self.booking.date = when
+        self.booking.save()
+        self.client.login(username="diner", password="pass1234")
+        response = self.client.get(reverse("bookings:booking_detail", args=[self.booking.pk]))
+        self.assertContains(response, "Restaurant: Test Restaurant → Harbour Grill")
+        self.assertContains(response, f"→ {timezone.localtime(when):%Y-%m-%d %H:%M}")
+        self.assertNotContains(response, "+00:00")
+
+        profile = self.client.get(reverse("users:profile"))
+        self.assertContains(profile, "Restaurant: Test Restaurant → Harbour Grill")
+        self.assertContains(profile, f"→ {timezone.localtime(when):%d %b %Y, %H:%M}")
+
+    def test_describe_changes_looks_up_each_related_model_once(self):
+        for name in ("One", "Two", "Three"):
+            self.booking.restaurant = Restaurant.objects.create(name=name, slug=name.lower())
+            self.booking.save()
+        entries = annotate_changes(Booking, BookingHistory.objects.filter(action="updated").order_by("id"))
+        with self.assertNumQueries(1):
+            describe_changes(Booking, entries)
+        self.assertEqual([e.display_changes for e in entries][-1], [("Restaurant", "Two", "Three")])
+
+    def test_stale_instances_record_the_stored_row(self):
+        first = Booking.objects.get(pk=self.booking.pk)
+        second = Booking.objects.get(pk=self.booking.pk)
+        first.guests = 4
+        first.save()
+        # A stale copy writes back guests=2 along with its own change
+        second.special_requests = "Window"
+        second.save()
+        stored = Booking.objects.get(pk=self.booking.pk)
+        self.assertEqual((stored.guests, stored.special_requests), (2, "Window"))
+        self.assertEqual(state_at(Booking, self.booking.pk)["guests"], 2)
+        self.assertEqual(self.rows()[-1].data, {"guests": 2, "special_requests": "Window"})
+        self.assertFalse(self.rows()[-1].is_checkpoint)
+
+    def test_update_fields_save_records_the_stored_row(self):
+        stale = Booking.objects.get(pk=self.booking.pk)
+        self.booking.guests = 6
+        self.booking.save()
+        stale.special_requests = "Quiet"
+        stale.save(update_fields=["special_requests"])
+        self.assertEqual(state_at(Booking, self.booking.pk)["guests"], 6)
+        self.assertEqual(self.rows()[-1].data, {"special_requests": "Quiet"})
+
+    @override_settings(AUDIT_HISTORY_MODE="commit")
+    def test_buffered_modes_record_deltas(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.guests = 3
+            self.booking.save()
+            self.booking.special_requests = "Window"
+            self.booking.save()
+        created, first, second = self.rows()
+        self.assertEqual((first.is_checkpoint, first.data), (False, {"guests": 3}))
+        self.assertEqual((second.is_checkpoint, second.data), (False, {"special_requests": "Window"}))
+
+    @override_settings(AUDIT_HISTORY_MODE="commit")
+    def test_buffered_modes_checkpoint_unknown_state(self):
+        booking = Booking.objects.get(pk=self.booking.pk)
+        booking._audit_state = None
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.guests = 3
+            booking.save(update_fields=["guests"])
+        row = self.rows()[-1]
+        self.assertTrue(row.is_checkpoint)
+        self.assertEqual(row.data["guests"], 3)
+        self.assertEqual(row.data["restaurant"], self.restaurant.pk)
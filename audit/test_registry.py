@@ -0,0 +1,69 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from audit import get_spec
+from audit.snapshot import SnapshotPlan
+from bookings.models import Booking, BookingHistory
+from menu.models import MenuCategory, MenuItem, Restaurant
+from reviews.models import Review, ReviewHistory
+from users.models import Profile
+
+
+class AuditRegistryTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="diner", password="pass1234")
+        self.restaurant = Restaurant.objects.create(name="Test Restaurant", slug="test-restaurant")
+
+    def test_receivers_are_scoped_to_audited_models(self):
+        spec = get_spec(Booking)
+        self.assertIn(spec.on_save, post_save._live_receivers(Booking))
+        self.assertNotIn(spec.on_save, post_save._live_receivers(Profile))
+        self.assertNotIn(get_spec(Review).on_save, post_save._live_receivers(Profile))
+
+    def test_snapshot_plan_converts_values_without_queries(self):
+        category = MenuCategory.objects.create(name="Mains", slug="mains")
+        item = MenuItem.objects.create(category=category, name="Soup", slug="soup", price=Decimal("4.50"))
+        item = MenuItem.objects.get(pk=item.pk)
+        plan = SnapshotPlan(MenuItem, fields=["category", "price", "image", "is_active"])
+        with self.assertNumQueries(0):
+            data = plan.snapshot(item)
+        self.assertEqual(data, {"category": category.pk, "price": 4.5, "image": None, "is_active": True})
+
+    def test_booking_history_snapshot_records_booking_fields(self):
+        when = timezone.now() + timedelta(days=1)
+        booking = Booking.objects.create(
+            user=self.user, restaurant=self.restaurant, date=when, guests=2, special_requests="Window"
+        )
+        history = BookingHistory.objects.get(booking_pk=booking.pk, action="created")
+        self.assertEqual(history.booking, booking)
+        self.assertEqual(history.user, self.user)
+        self.assertEqual(history.data, {
+            "user": self.user.pk,
+            "restaurant": self.restaurant.pk,
+            "date": when.isoformat(),
+            "guests": 2,
+            "special_requests": "Window",
+        })
+
+    def test_recording_does_not_load_the_user(self):
+        booking = Booking.objects.create(
+            user=self.user, restaurant=self.restaurant, date=timezone.now() + timedelta(days=1), guests=2
+        )
+        booking = Booking.objects.get(pk=booking.pk)
+        booking.guests = 3
+        with CaptureQueriesContext(connection) as ctx:
+            booking.save()
+        self.assertFalse([q for q in ctx.captured_queries if 'auth_user' in q["sql"]])
+
+    def test_review_history_stores_image_name(self):
+        review = Review.objects.create(guest_name="Walk-in", rating=5, image="reviews/photo.jpg")
+        history = ReviewHistory.objects.get(review_pk=review.pk, action="created")
+        self.assertEqual(history.data["image"], "reviews/photo.jpg")
+        self.assertIsNone(history.user)
@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from audit.writer import history_writer
+from bookings.models import Booking, BookingHistory
+from menu.models import Restaurant
+
+
+class BufferedHistoryTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="diner", password="pass1234")
+        self.restaurant = Restaurant.objects.create(name="Test Restaurant", slug="test-restaurant")
+
+    def _book(self):
+        return Booking.objects.create(
+            user=self.user,
+            restaurant=self.restaurant,
+            date=timezone.now() + timedelta(days=1),
+            guests=2,
+        )
+
+    def test_sync_mode_writes_immediately(self):
+        booking = self._book()
+        self.assertTrue(BookingHistory.objects.filter(booking_pk=booking.pk, action="created").exists())
+
+    @override_settings(AUDIT_HISTORY_MODE="commit")
+    def test_commit_mode_writes_one_batch_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            booking = self._book()
+            booking.guests = 3
+            booking.save()
+            self.assertFalse(BookingHistory.objects.exists())
+        self.assertEqual(len(callbacks), 1)
+        with CaptureQueriesContext(connection) as ctx:
+            callbacks[0]()
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(
+            list(BookingHistory.objects.order_by("id").values_list("action", flat=True)),
+            ["created", "updated"],
+        )
+
+    @override_settings(AUDIT_HISTORY_MODE="commit")
+    def test_commit_mode_drops_events_from_rolled_back_savepoint(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = self._book()
+            try:
+                with transaction.atomic():
+                    booking.guests = 5
+                    booking.save()
+                    raise RuntimeError("abort")
+            except RuntimeError:
+                pass
+        self.assertEqual(list(BookingHistory.objects.values_list("action", flat=True)), ["created"])
+
+    @override_settings(AUDIT_HISTORY_MODE="interval", AUDIT_HISTORY_FLUSH_MS=60000)
+    def test_interval_mode_queues_until_flush(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = self._book()
+        self.assertFalse(BookingHistory.objects.exists())
+        self.assertEqual(history_writer.flush(), 1)
+        self.assertTrue(BookingHistory.objects.filter(booking_pk=booking.pk).exists())
@@ -0,0 +1,152 @@
+"""Buffered writer for history rows.
+
+By default every history event is saved with its own INSERT inside the
+request. Setting AUDIT_HISTORY_MODE lets busy sites batch those INSERTs
+instead:
+
+- 'sync':     one INSERT per event, in the caller's transaction (tests rely on this).
+- 'commit':   events are collected per transaction and written with a single
+              bulk_create per history model once that transaction commits.
+- 'interval': committed events go into an in-process queue that a background
+              thread flushes with bulk_create every AUDIT_HISTORY_FLUSH_MS.
+
+In both buffered modes nothing is written until the surrounding transaction
+commits, so rolled-back work never shows up in history. In 'interval' mode
+the row's `timestamp` is set when it is flushed, so it can lag the change by
+up to one flush interval, and events still queued when a process is killed
+are lost; flush() runs at interpreter exit.
+"""
+import atexit
+import threading
+import traceback
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, transaction
+
+
+SYNC = 'sync'
+COMMIT = 'commit'
+INTERVAL = 'interval'
+MODES = (SYNC, COMMIT, INTERVAL)
+
+
+class HistoryWriter:
+    """Write history rows according to the configured mode."""
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self._lock = threading.Lock()
+        self._queue = []
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @property
+    def mode(self):
+        mode = getattr(settings, 'AUDIT_HISTORY_MODE', SYNC)
+        return mode if mode in MODES else SYNC
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'AUDIT_HISTORY_BATCH_SIZE', 500)
+
+    def write(self, model, **fields):
+        """Record one `model` history row built from `fields`."""
+        entry = model(**fields)
+        self.write_many([entry])
+        return entry
+
+    def write_many(self, entries):
+        """Record unsaved history rows, with one bulk insert per history model."""
+        entries = list(entries)
+        if not entries:
+            return
+        mode = self.mode
+        if mode == SYNC:
+            self._bulk_write(entries, raise_errors=True)
+        elif mode == COMMIT:
+            connection = transaction.get_connection(self.using)
+            if connection.in_atomic_block:
+                self._transaction_batch(connection).extend(entries)
+            else:
+                # Autocommit: the change is already committed, nothing to batch with
+                self._bulk_write(entries, raise_errors=True)
+        else:
+            transaction.on_commit(lambda: self._enqueue(entries), using=self.using)
+
+    def _transaction_batch(self, connection):
+        """
+        Return the list collecting events for the current transaction level.
+
+        Django replaces the connection's pending-hook list on every commit and
+        rollback (including savepoint rollbacks), so a new batch and on_commit
+        hook are started whenever that list changed or a savepoint was entered.
+        A rolled-back savepoint therefore discards exactly the events recorded
+        inside it.
+        """
+        hooks, batches = getattr(self._local, 'batches', (None, None))
+        if hooks is not connection.run_on_commit:
+            batches = {}
+            self._local.batches = (connection.run_on_commit, batches)
+        key = tuple(connection.savepoint_ids)
+        batch = batches.get(key)
+        if batch is None:
+            batch = batches[key] = []
+            transaction.on_commit(lambda: self._bulk_write(batch), using=self.using)
+        return batch
+
+    def _enqueue(self, entries):
+        with self._lock:
+            self._queue.extend(entries)
+            full = len(self._queue) >= self.batch_size
+        self._ensure_flusher()
+        if full:
+            self._wakeup.set()
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='history-flusher', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            interval = getattr(settings, 'AUDIT_HISTORY_FLUSH_MS', 200) / 1000.0
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Keep the flusher alive; the failed batch is logged to stderr
+                traceback.print_exc()
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """Write everything queued so far. Returns the number of rows written."""
+        with self._lock:
+            pending, self._queue = self._queue, []
+        self._bulk_write(pending)
+        return len(pending)
+
+    def _bulk_write(self, entries, raise_errors=False):
+        # Group by history model, keeping the order of events within each one
+        by_model = {}
+        for entry in entries:
+            by_model.setdefault(type(entry), []).append(entry)
+        for model, rows in by_model.items():
+            try:
+                model.objects.using(self.using).bulk_create(rows, batch_size=self.batch_size)
+            except Exception:
+                if raise_errors:
+                    raise
+                # Deferred writes have no caller left to report to; log to stderr
+                traceback.print_exc()
+
+
+history_writer = HistoryWriter()
+atexit.register(history_writer.flush)
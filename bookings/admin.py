@@ -4,7 +4,11 @@ from .models import (
     BookingImage,
     Cancellation,
     BookingHistory,
+    RestaurantCapacity,
+    SlotOccupancy,
+    OutboxMessage,
 )
+from .outbox import requeue_dead
 
 # Register your models here.
 
@@ -13,6 +17,12 @@ class BookingAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "restaurant", "date", "guests")
     list_filter = ("restaurant",)
     search_fields = ("user__username", "restaurant__name")
+    actions = ("cancel_and_notify",)
+
+    @admin.action(description="Cancel selected bookings and email the guests")
+    def cancel_and_notify(self, request, queryset):
+        count = queryset.soft_delete(notify=True)
+        self.message_user(request, f"Cancelled {count} bookings; the emails are queued in the outbox.")
 
 
 @admin.register(BookingImage)
@@ -31,3 +41,27 @@ class BookingHistoryAdmin(admin.ModelAdmin):
     list_filter = ("action", "timestamp")
     readonly_fields = ("booking", "booking_pk", "user", "action", "timestamp", "data")
 
+
+@admin.register(RestaurantCapacity)
+class RestaurantCapacityAdmin(admin.ModelAdmin):
+    list_display = ("restaurant", "covers_per_slot", "slot_minutes", "turn_minutes")
+
+
+@admin.register(SlotOccupancy)
+class SlotOccupancyAdmin(admin.ModelAdmin):
+    list_display = ("restaurant", "slot_start", "covers")
+    list_filter = ("restaurant",)
+    readonly_fields = ("restaurant", "slot_start", "covers")
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "to", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status", "kind")
+    search_fields = ("to",)
+    readonly_fields = ("created_at", "sent_at", "last_error")
+    actions = ("requeue",)
+
+    @admin.action(description="Retry selected dead letters")
+    def requeue(self, request, queryset):
+        self.message_user(request, f"Requeued {requeue_dead(queryset)} messages.")
@@ -0,0 +1,242 @@
+"""Slot-bucketed occupancy index and availability lookups for bookings.
+
+Every restaurant with a RestaurantCapacity row has its time line cut into
+fixed-width slots. A booking holds `guests` covers in each slot between its
+start time and the end of its turn. SlotOccupancy keeps the running total per
+slot, so "how many seats are free between T1 and T2" is a single indexed
+range query instead of a scan over Booking rows.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import F, Max
+
+from .models import Booking, RestaurantCapacity, SlotOccupancy
+
+
+class SlotUnavailable(Exception):
+    """Raised by reserve() when a booking does not fit in its slots."""
+
+
+def get_capacity(restaurant_id):
+    """Return the RestaurantCapacity for a restaurant id, or None if it has no rules."""
+    return RestaurantCapacity.objects.filter(restaurant_id=restaurant_id).first()
+
+
+def floor_to_slot(dt, slot_minutes):
+    """Round an aware datetime down to the start of its slot (UTC aligned)."""
+    width = slot_minutes * 60
+    ts = int(dt.timestamp())
+    return datetime.fromtimestamp(ts - ts % width, tz=dt_timezone.utc)
+
+
+def slot_range(capacity, start, end):
+    """Return the slot starts that overlap the half-open interval [start, end)."""
+    step = timedelta(minutes=capacity.slot_minutes)
+    slot = floor_to_slot(start, capacity.slot_minutes)
+    slots = []
+    while slot < end:
+        slots.append(slot)
+        slot += step
+    return slots
+
+
+def booking_slots(capacity, date):
+    """Return the slot starts held by a booking starting at `date`."""
+    return slot_range(capacity, date, date + timedelta(minutes=capacity.turn_minutes))
+
+
+def seats_free(restaurant, start, end=None):
+    """
+    Return the number of seats free at `restaurant` for the whole of [start, end).
+
+    `end` defaults to one turn after `start`. Returns None when the restaurant
+    has no capacity rules, meaning it is not limited.
+    """
+    restaurant_id = getattr(restaurant, 'pk', restaurant)
+    capacity = get_capacity(restaurant_id)
+    if capacity is None:
+        return None
+    if end is None:
+        end = start + timedelta(minutes=capacity.turn_minutes)
+    busiest = SlotOccupancy.objects.filter(
+        restaurant_id=restaurant_id,
+        slot_start__gte=floor_to_slot(start, capacity.slot_minutes),
+        slot_start__lt=end,
+    ).aggregate(busiest=Max('covers'))['busiest'] or 0
+    return max(capacity.covers_per_slot - busiest, 0)
+
+
+def can_accommodate(restaurant, date, guests, exclude=None):
+    """
+    Return True if `guests` more covers fit at `restaurant` for a booking at `date`.
+
+    `exclude` is a booking being edited; the seats it already holds are not
+    counted against it.
+    """
+    restaurant_id = getattr(restaurant, 'pk', restaurant)
+    capacity = get_capacity(restaurant_id)
+    if capacity is None:
+        return True
+    slots = booking_slots(capacity, date)
+    occupied = dict(
+        SlotOccupancy.objects.filter(
+            restaurant_id=restaurant_id,
+            slot_start__gte=slots[0],
+            slot_start__lte=slots[-1],
+        ).values_list('slot_start', 'covers')
+    )
+    held = getattr(exclude, '_occupancy_key', None)
+    if held and held[0] == restaurant_id:
+        for slot in booking_slots(capacity, held[1]):
+            if slot in occupied:
+                occupied[slot] -= held[2]
+    busiest = max((occupied.get(slot, 0) for slot in slots), default=0)
+    return busiest + guests <= capacity.covers_per_slot
+
+
+def _adjust(restaurant_id, slots, delta):
+    """Add `delta` covers to each of `slots`, creating missing slot rows."""
+    if not slots or not delta:
+        return
+    if delta > 0:
+        SlotOccupancy.objects.bulk_create(
+            [SlotOccupancy(restaurant_id=restaurant_id, slot_start=slot, covers=0) for slot in slots],
+            ignore_conflicts=True,
+        )
+    SlotOccupancy.objects.filter(restaurant_id=restaurant_id, slot_start__in=slots).update(
+        covers=F('covers') + delta
+    )
+
+
+def apply_booking_change(old_key, new_key):
+    """
+    Move a booking's covers in the index from `old_key` to `new_key`.
+
+    Keys are the (restaurant_id, date, guests) tuples returned by
+    Booking.occupancy_key(); None means the booking holds no seats.
+    """
+    if old_key == new_key:
+        return
+    capacities = {}
+    for key in (old_key, new_key):
+        if key and key[0] not in capacities:
+            capacities[key[0]] = get_capacity(key[0])
+    with transaction.atomic():
+        if old_key and capacities[old_key[0]]:
+            _adjust(old_key[0], booking_slots(capacities[old_key[0]], old_key[1]), -old_key[2])
+        if new_key and capacities[new_key[0]]:
+            _adjust(new_key[0], booking_slots(capacities[new_key[0]], new_key[1]), new_key[2])
+
+
+def _claim(capacity, restaurant_id, slots, guests):
+    """
+    Add `guests` covers to each slot only if every slot has room for them.
+
+    Must run inside a transaction. The slot rows are locked with SELECT ...
+    FOR UPDATE (Postgres) and then incremented with a conditional UPDATE, which
+    is itself atomic on SQLite, so two requests racing for the last table
+    cannot both succeed. Only the rows of the requested slots are locked.
+    """
+    SlotOccupancy.objects.bulk_create(
+        [SlotOccupancy(restaurant_id=restaurant_id, slot_start=slot, covers=0) for slot in slots],
+        ignore_conflicts=True,
+    )
+    rows = SlotOccupancy.objects.filter(restaurant_id=restaurant_id, slot_start__in=slots)
+    # Lock in a stable order so overlapping reservations cannot deadlock
+    list(rows.select_for_update().order_by('slot_start').values_list('pk', flat=True))
+    claimed = rows.filter(covers__lte=capacity.covers_per_slot - guests).update(
+        covers=F('covers') + guests
+    )
+    if claimed != len(slots):
+        raise SlotUnavailable('Not enough seats are free at this time.')
+
+
+def reserve(booking):
+    """
+    Save `booking` and hold its seats in one transaction.
+
+    Raises SlotUnavailable, leaving both the booking and the occupancy index
+    untouched, when the new time or party size does not fit. A booking being
+    moved gives up its old seats within the same transaction.
+    """
+    old_key = getattr(booking, '_occupancy_key', None)
+    new_key = booking.occupancy_key()
+    try:
+        with transaction.atomic():
+            if old_key != new_key:
+                old_capacity = None
+                if old_key:
+                    old_capacity = get_capacity(old_key[0])
+                    if old_capacity:
+                        _adjust(old_key[0], booking_slots(old_capacity, old_key[1]), -old_key[2])
+                if new_key:
+                    # A booking moved within one restaurant keeps the same rules
+                    same = old_key and old_key[0] == new_key[0]
+                    capacity = old_capacity if same else get_capacity(new_key[0])
+                    if capacity:
+                        _claim(capacity, new_key[0], booking_slots(capacity, new_key[1]), new_key[2])
+            # The index is already up to date, so the post_save receiver has nothing to do
+            booking._occupancy_key = new_key
+            booking.save()
+    except Exception:
+        booking._occupancy_key = old_key
+        raise
+    return booking
+
+
+def apply_key_changes(changes):
+    """
+    Apply many (old_key, new_key) booking moves to the index at once.
+
+    The per-slot deltas are summed first and slots sharing the same delta are
+    updated together, so thousands of bookings cost a handful of UPDATEs.
+    """
+    changes = [(old, new) for old, new in changes if old != new]
+    restaurant_ids = {key[0] for pair in changes for key in pair if key}
+    if not restaurant_ids:
+        return
+    capacities = {
+        c.restaurant_id: c
+        for c in RestaurantCapacity.objects.filter(restaurant_id__in=restaurant_ids)
+    }
+    deltas = Counter()
+    for old_key, new_key in changes:
+        for key, sign in ((old_key, -1), (new_key, 1)):
+            capacity = capacities.get(key[0]) if key else None
+            if capacity is None:
+                continue
+            for slot in booking_slots(capacity, key[1]):
+                deltas[(key[0], slot)] += sign * key[2]
+    grouped = defaultdict(list)
+    for (restaurant_id, slot), delta in deltas.items():
+        if delta:
+            grouped[(restaurant_id, delta)].append(slot)
+    with transaction.atomic():
+        for (restaurant_id, delta), slots in grouped.items():
+            _adjust(restaurant_id, slots, delta)
+
+
+def rebuild_occupancy(restaurant_id, batch_size=2000):
+    """
+    Recompute the occupancy index for one restaurant from its active bookings.
+
+    Needed after capacity rules change (the slot width may differ) and as a
+    repair tool; normal booking traffic keeps the index current incrementally.
+    """
+    capacity = get_capacity(restaurant_id)
+    totals = Counter()
+    if capacity is not None:
+        bookings = Booking.objects.filter(restaurant_id=restaurant_id).values_list('date', 'guests')
+        for date, guests in bookings.iterator(chunk_size=batch_size):
+            for slot in booking_slots(capacity, date):
+                totals[slot] += guests
+    with transaction.atomic():
+        SlotOccupancy.objects.filter(restaurant_id=restaurant_id).delete()
+        SlotOccupancy.objects.bulk_create(
+            [SlotOccupancy(restaurant_id=restaurant_id, slot_start=slot, covers=covers)
+             for slot, covers in sorted(totals.items())],
+            batch_size=batch_size,
+        )
+    return len(totals)
@@ -1,51 +1,53 @@
-"""Utilities for sending booking-related emails."""
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
+"""Booking-related emails.
+
+Each kind of email is a subject pattern plus a text and an HTML template,
+rendered from a plain context dict. The context is captured when the email is
+queued (see bookings.outbox), so later changes to the booking do not alter a
+notification that is already on its way.
+
+Templates come from the template engine, whose cached loader (TEMPLATE_CACHE)
+compiles each one once per process, so a run sending thousands of reminders
+does not parse them again for every message.
+"""
 from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import get_template
+
+
+EMAIL_KINDS = {
+    'booking_cancellation': {
+        'subject': 'Booking Cancellation Confirmation - {restaurant_name}',
+        'text': 'bookings/email/cancellation_confirmation.txt',
+        'html': 'bookings/email/cancellation_confirmation.html',
+    },
+    'booking_reminder': {
+        'subject': 'Reminder: your table at {restaurant_name}',
+        'text': 'bookings/email/booking_reminder.txt',
+        'html': 'bookings/email/booking_reminder.html',
+    },
+}
+
+
+def booking_context(booking):
+    return {
+        'user_name': booking.user.first_name or booking.user.username,
+        'restaurant_name': booking.restaurant.name,
+        'booking_date': booking.date.strftime('%d %B %Y at %H:%M'),
+        'guests': booking.guests,
+        'special_requests': booking.special_requests or 'None',
+    }
 
 
-def send_booking_cancellation_email(booking):
-    """
-    Send a booking cancellation confirmation email to the user.
-    
-    Args:
-        booking: The Booking object being cancelled
-    """
-    if not booking.user or not booking.user.email:
-        return False
-    
-    try:
-        subject = f"Booking Cancellation Confirmation - {booking.restaurant.name}"
-        
-        context = {
-            'user_name': booking.user.first_name or booking.user.username,
-            'restaurant_name': booking.restaurant.name,
-            'booking_date': booking.date.strftime('%d %B %Y at %H:%M'),
-            'guests': booking.guests,
-            'special_requests': booking.special_requests or 'None',
-        }
-        
-        # Try to use HTML template; fall back to plain text
-        try:
-            html_message = render_to_string('bookings/email/cancellation_confirmation.html', context)
-        except:
-            html_message = None
-        
-        # Plain text version
-        text_message = render_to_string('bookings/email/cancellation_confirmation.txt', context)
-        
-        send_mail(
-            subject,
-            text_message,
-            settings.DEFAULT_FROM_EMAIL,
-            [booking.user.email],
-            html_message=html_message,
-            fail_silently=True,  # Don't crash if email fails
-        )
-        return True
-    except Exception as e:
-        # Log the error but don't prevent booking cancellation
-        print(f"Error sending cancellation email for booking {booking.pk}: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
+def build_message(kind, to, context, connection=None):
+    """Return an EmailMultiAlternatives for one email of `kind`."""
+    spec = EMAIL_KINDS[kind]
+    message = EmailMultiAlternatives(
+        spec['subject'].format(**context),
+        get_template(spec['text']).render(context),
+        settings.DEFAULT_FROM_EMAIL,
+        [to],
+        connection=connection,
+    )
+    if spec.get('html'):
+        message.attach_alternative(get_template(spec['html']).render(context), 'text/html')
+    return message
@@ -4,6 +4,7 @@ from django.forms.widgets import SplitDateTimeWidget
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from .models import Booking, BookingImage
+from .availability import can_accommodate
 
 
 class BookingForm(forms.ModelForm):
@@ -32,6 +33,23 @@ class BookingForm(forms.ModelForm):
             raise ValidationError('Booking date/time cannot be in the past.')
         return dt
 
+    def clean(self):
+        cleaned = super().clean()
+        restaurant = cleaned.get('restaurant')
+        dt = cleaned.get('date')
+        guests = cleaned.get('guests')
+        if restaurant and dt and guests:
+            exclude = self.instance if self.instance.pk else None
+            if not can_accommodate(restaurant, dt, guests, exclude=exclude):
+                self.add_error('date', 'Not enough seats are free at this time. Please choose another time.')
+        return cleaned
+
+    def save(self, commit=True):
+        if 'date' in self.changed_data:
+            # A rescheduled booking gets a reminder for its new time
+            self.instance.reminder_sent_at = None
+        return super().save(commit)
+
 
 class BookingImageForm(forms.ModelForm):
     """
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.outbox import drain, requeue_dead
+
+
+class Command(BaseCommand):
+    help = "Send pending outbox emails in batches over one mail connection"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None, help="Messages per batch (default OUTBOX_BATCH_SIZE)")
+        parser.add_argument("--loop", action="store_true", help="Keep running, polling for new messages")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds between polls with --loop")
+        parser.add_argument("--requeue-dead", action="store_true", help="Retry dead letters before draining")
+
+    def handle(self, *args, **options):
+        if options["requeue_dead"]:
+            self.stdout.write(f"Requeued {requeue_dead()} dead letters")
+        while True:
+            sent, failed = drain(batch_size=options["batch_size"])
+            if sent or failed or not options["loop"]:
+                self.stdout.write(f"Sent {sent} emails, {failed} failed")
+            if not options["loop"]:
+                break
+            try:
+                time.sleep(options["interval"])
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from menu.models import Restaurant
+from bookings.availability import rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = "Rebuild the slot occupancy index from active bookings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--restaurant", help="Slug of a single restaurant to rebuild")
+
+    def handle(self, *args, **options):
+        restaurants = Restaurant.objects.all()
+        if options["restaurant"]:
+            restaurants = restaurants.filter(slug=options["restaurant"])
+        total = 0
+        for restaurant in restaurants:
+            total += rebuild_occupancy(restaurant.pk)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} occupancy slots"))
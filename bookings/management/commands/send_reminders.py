@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.outbox import drain
+from bookings.reminders import queue_reminders
+
+
+class Command(BaseCommand):
+    help = "Queue reminder emails for bookings starting soon (each booking is reminded once)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=float, default=None, help="Look-ahead window (default REMINDER_HOURS_AHEAD)")
+        parser.add_argument("--chunk-size", type=int, default=None, help="Bookings per INSERT (default REMINDER_CHUNK_SIZE)")
+        parser.add_argument("--send", action="store_true", help="Drain the outbox after queueing")
+        parser.add_argument("--loop", action="store_true", help="Keep running, queueing reminders every --interval seconds")
+        parser.add_argument("--interval", type=float, default=300.0, help="Seconds between runs with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            claimed, queued = queue_reminders(hours=options["hours"], chunk_size=options["chunk_size"])
+            if claimed or not options["loop"]:
+                self.stdout.write(f"Queued {queued} reminders for {claimed} bookings")
+            if options["send"]:
+                sent, failed = drain()
+                self.stdout.write(f"Sent {sent} emails, {failed} failed")
+            if not options["loop"]:
+                break
+            try:
+                time.sleep(options["interval"])
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,124 @@
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from bookings.availability import SlotUnavailable, reserve
+from bookings.models import Booking, RestaurantCapacity, SlotOccupancy
+from menu.models import Restaurant
+
+
+STRESS_SLUG = "stress-test-restaurant"
+MAX_RETRIES = 20
+
+
+def run_stress(threads, attempts, covers, guests):
+    """
+    Fire `threads` x `attempts` concurrent reservations at one slot and return stats.
+
+    Every thread uses its own database connection, like a separate request.
+    """
+    User = get_user_model()
+    user, _ = User.objects.get_or_create(username="stress-test-user")
+    restaurant, _ = Restaurant.objects.get_or_create(slug=STRESS_SLUG, defaults={"name": "Stress Test"})
+    RestaurantCapacity.objects.update_or_create(
+        restaurant=restaurant,
+        defaults={"covers_per_slot": covers, "slot_minutes": 15, "turn_minutes": 60},
+    )
+    when = datetime(2099, 1, 1, 19, 0, tzinfo=dt_timezone.utc)
+    results = {"booked": 0, "conflicts": 0, "errors": 0, "retries": 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        outcome = {"booked": 0, "conflicts": 0, "errors": 0, "retries": 0}
+        try:
+            barrier.wait()
+            for _ in range(attempts):
+                for retry in range(MAX_RETRIES + 1):
+                    booking = Booking(user=user, restaurant=restaurant, date=when, guests=guests)
+                    try:
+                        reserve(booking)
+                        outcome["booked"] += 1
+                    except SlotUnavailable:
+                        outcome["conflicts"] += 1
+                    except OperationalError:
+                        # SQLite reports "database is locked" instead of waiting
+                        # when another connection holds the write lock
+                        if retry == MAX_RETRIES:
+                            outcome["errors"] += 1
+                            break
+                        outcome["retries"] += 1
+                        time.sleep(0.001 * 2 ** min(retry, 6))
+                        continue
+                    break
+        finally:
+            connection.close()
+            with lock:
+                for key, value in outcome.items():
+                    results[key] += value
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    total = threads * attempts
+    results.update({
+        "attempts": total,
+        "seconds": elapsed,
+        "throughput": total / elapsed if elapsed else 0.0,
+        "conflict_rate": results["conflicts"] / total if total else 0.0,
+        "booked_covers": sum(
+            Booking.objects.filter(restaurant=restaurant, date=when).values_list("guests", flat=True)
+        ),
+        "max_slot_covers": max(
+            SlotOccupancy.objects.filter(restaurant=restaurant).values_list("covers", flat=True),
+            default=0,
+        ),
+    })
+    return results
+
+
+def cleanup():
+    Booking.all_objects.filter(restaurant__slug=STRESS_SLUG).hard_delete()
+    Restaurant.objects.filter(slug=STRESS_SLUG).delete()
+    get_user_model().objects.filter(username="stress-test-user").delete()
+
+
+class Command(BaseCommand):
+    help = "Fire parallel reservations at one slot and report throughput and conflict rate"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--attempts", type=int, default=10, help="Reservations per thread")
+        parser.add_argument("--covers", type=int, default=20, help="Covers per slot for the test restaurant")
+        parser.add_argument("--guests", type=int, default=2)
+        parser.add_argument("--keep", action="store_true", help="Keep the generated rows")
+
+    def handle(self, *args, **options):
+        try:
+            stats = run_stress(options["threads"], options["attempts"], options["covers"], options["guests"])
+        finally:
+            if not options["keep"]:
+                cleanup()
+        self.stdout.write(
+            f"{stats['attempts']} attempts in {stats['seconds']:.2f}s "
+            f"({stats['throughput']:.1f}/s): {stats['booked']} booked, "
+            f"{stats['conflicts']} conflicts ({stats['conflict_rate']:.1%}), "
+            f"{stats['retries']} lock retries, {stats['errors']} errors"
+        )
+        self.stdout.write(
+            f"Booked covers {stats['booked_covers']} / capacity {options['covers']}, "
+            f"busiest slot {stats['max_slot_covers']}"
+        )
+        if stats["booked_covers"] > options["covers"] or stats["max_slot_covers"] > options["covers"]:
+            self.stdout.write(self.style.ERROR("Overbooked!"))
+        else:
+            self.stdout.write(self.style.SUCCESS("No overbooking"))
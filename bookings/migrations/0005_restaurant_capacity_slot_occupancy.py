@@ -0,0 +1,45 @@
+# Generated by Django 4.2.25 on 2026-10-18 00:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0003_menucategory_description'),
+        ('bookings', '0004_remove_cancellationpolicy_restaurant_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot_start', models.DateTimeField()),
+                ('covers', models.IntegerField(default=0)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_occupancy', to='menu.restaurant')),
+            ],
+            options={
+                'ordering': ['restaurant', 'slot_start'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RestaurantCapacity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('covers_per_slot', models.PositiveIntegerField(default=40)),
+                ('slot_minutes', models.PositiveIntegerField(default=15)),
+                ('turn_minutes', models.PositiveIntegerField(default=90)),
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='capacity', to='menu.restaurant')),
+            ],
+            options={
+                'verbose_name': 'Restaurant capacity',
+                'verbose_name_plural': 'Restaurant capacities',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='slotoccupancy',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'slot_start'), name='unique_slot_per_restaurant'),
+        ),
+    ]
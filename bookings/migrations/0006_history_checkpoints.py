@@ -0,0 +1,22 @@
+# Generated by Django 4.2.25 on 2026-10-18 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_restaurant_capacity_slot_occupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookinghistory',
+            name='is_checkpoint',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='bookinghistory',
+            index=models.Index(fields=['booking_pk', 'id'], name='bookinghist_pk_id_idx'),
+        ),
+    ]
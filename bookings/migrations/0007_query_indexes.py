@@ -0,0 +1,37 @@
+# Generated by Django 4.2.25 on 2026-10-18 00:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_history_checkpoints'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'date'], name='booking_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', '-created_at'], name='booking_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['user', 'date'], name='booking_active_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['restaurant', 'date'], name='booking_active_rest_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookinghistory',
+            index=models.Index(fields=['booking_pk', 'user', '-timestamp', '-id'], name='bookinghist_pk_user_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookinghistory',
+            index=models.Index(fields=['user', '-timestamp', '-id'], name='bookinghist_user_ts_idx'),
+        ),
+    ]
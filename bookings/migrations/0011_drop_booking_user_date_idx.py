@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0010_booking_reminders'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_user_date_idx',
+        ),
+    ]
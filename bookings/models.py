@@ -1,22 +1,74 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
-from django.forms.models import model_to_dict
-from django.apps import apps
 from cloudinary.models import CloudinaryField
 
+import audit
+from audit.querysets import AuditedQuerySet, PK_BATCH_SIZE
+
 # Create your models here.
 
-class BookingQuerySet(models.QuerySet):
+class BookingQuerySet(AuditedQuerySet):
     """
     Custom QuerySet to handle soft-deleted bookings.
-    Overrides delete() to perform soft-delete.
+    Overrides delete() to perform an audited soft-delete.
     """
     def delete(self):
         # Soft-delete: mark as deleted and set deleted_at
-        return self.update(is_deleted=True, deleted_at=timezone.now())
+        return self.soft_delete()
+
+    def soft_delete(self, notify=False):
+        """
+        Soft-delete every matching booking with one UPDATE.
+
+        Records one 'deleted' BookingHistory row per booking in a single bulk
+        insert and releases the seats they held. With notify=True a
+        cancellation email per guest is queued in the outbox in the same
+        transaction. Returns the number of bookings cancelled.
+        """
+        from .availability import apply_key_changes
+        from .outbox import enqueue_cancellations
+
+        with transaction.atomic(using=self.db):
+            active = self.filter(is_deleted=False)
+            if notify:
+                active = active.select_related('user', 'restaurant')
+            bookings = list(active._locked())
+            if not bookings:
+                return 0
+            now = timezone.now()
+            base = self.model._base_manager.using(self.db)
+            count = 0
+            for start in range(0, len(bookings), PK_BATCH_SIZE):
+                pks = [b.pk for b in bookings[start:start + PK_BATCH_SIZE]]
+                count += base.filter(pk__in=pks).update(is_deleted=True, deleted_at=now)
+            apply_key_changes((b._occupancy_key, None) for b in bookings)
+            for booking in bookings:
+                booking.is_deleted = True
+                booking.deleted_at = now
+                booking._occupancy_key = None
+            audit.get_spec(Booking).record_many(bookings, 'deleted')
+            if notify:
+                enqueue_cancellations(bookings)
+        return count
 
     def hard_delete(self):
-        return super().delete()
+        return super(AuditedQuerySet, self).delete()
+
+    def _after_audited_update(self, before, after):
+        # Keep the occupancy index in step when dates, party sizes or
+        # restaurants change in bulk
+        from .availability import apply_key_changes
+
+        apply_key_changes((b._occupancy_key, a.occupancy_key()) for b, a in zip(before, after))
+        for booking in after:
+            booking._occupancy_key = booking.occupancy_key()
+
+    def _after_audited_bulk_create(self, objs):
+        from .availability import apply_key_changes
+
+        apply_key_changes((None, b.occupancy_key()) for b in objs)
+        for booking in objs:
+            booking._occupancy_key = booking.occupancy_key()
 
 
 class BookingManager(models.Manager):
@@ -26,7 +78,14 @@ class BookingManager(models.Manager):
     def all_objects(self):
         return BookingQuerySet(self.model, using=self._db)
 
+    def audited_bulk_create(self, objs, **kwargs):
+        return self.get_queryset().audited_bulk_create(objs, **kwargs)
+
  
+# The columns Booking.occupancy_key() is computed from
+OCCUPANCY_ATTNAMES = ('is_deleted', 'restaurant_id', 'date', 'guests')
+
+
 class Booking(models.Model):
     """
     user is a ForeignKey to the User model.
@@ -35,6 +94,7 @@ class Booking(models.Model):
     guests is a PositiveIntegerField representing number of guests.
     special_requests is an optional TextField for any special requests.
     created_at is a DateTimeField automatically set on creation.
+    reminder_sent_at marks bookings whose reminder has been queued (see bookings.reminders).
     """
     user = models.ForeignKey('auth.User', on_delete=models.CASCADE)
     restaurant = models.ForeignKey('menu.Restaurant', on_delete=models.CASCADE)
@@ -44,6 +104,8 @@ class Booking(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_deleted = models.BooleanField(default=False)
     deleted_at = models.DateTimeField(null=True, blank=True)
+    # Set when the reminder email was queued, so each booking gets one reminder
+    reminder_sent_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     # managers
     objects = BookingManager()
@@ -58,10 +120,47 @@ class Booking(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # A user's bookings newest first, soft-deleted ones included (profile)
+            models.Index(fields=['user', '-created_at', '-id'], name='booking_user_created_idx'),
+            # A user's active bookings by date (booking list)
+            models.Index(
+                fields=['user', 'date'], condition=models.Q(is_deleted=False), name='booking_active_user_date_idx'
+            ),
+            # Active bookings of one restaurant, for occupancy rebuilds and reports
+            models.Index(
+                fields=['restaurant', 'date'], condition=models.Q(is_deleted=False), name='booking_active_rest_date_idx'
+            ),
+            # Active bookings in a time window, for the reminder run
+            models.Index(fields=['date'], condition=models.Q(is_deleted=False), name='booking_active_date_idx'),
+        ]
 
     def __str__(self):
         return f"Booking for {self.guests} at {self.restaurant} on {self.date}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what this booking held in the occupancy index when it was
+        # loaded so moves can be applied as a delta on save.
+        if instance.get_deferred_fields().isdisjoint(OCCUPANCY_ATTNAMES):
+            instance._occupancy_key = instance.occupancy_key()
+        else:
+            # Read the deferred columns directly: loading them through the
+            # descriptors would come back through from_db().
+            stored = cls._base_manager.db_manager(db).filter(pk=instance.pk).values(*OCCUPANCY_ATTNAMES).first()
+            instance._occupancy_key = stored and cls(**stored).occupancy_key()
+        return instance
+
+    def occupancy_key(self):
+        """
+        Return (restaurant_id, date, guests) for an active booking, or None
+        for a soft-deleted or incomplete one.
+        """
+        if self.is_deleted or not self.restaurant_id or not self.date or not self.guests:
+            return None
+        return (self.restaurant_id, self.date, self.guests)
+
     def delete(self, using=None, keep_parents=False):
         """
         Soft-delete the booking and record a BookingHistory 'deleted' event.
@@ -70,34 +169,17 @@ class Booking(models.Model):
         bookings. If history creation fails we log but still mark the booking as deleted.
         """
         try:
-            BookingHistory = apps.get_model('bookings', 'BookingHistory')
-            # snapshot relevant fields
-            data = model_to_dict(self, fields=['id', 'user', 'restaurant', 'date', 'guests', 'special_requests', 'created_at'])
-            data['user'] = data.get('user') and int(data['user'])
-            data['restaurant'] = data.get('restaurant') and int(data['restaurant'])
-            if data.get('date') and hasattr(self, 'date'):
-                try:
-                    data['date'] = self.date.isoformat()
-                except Exception:
-                    pass
             # mark soft-delete
             self.is_deleted = True
             self.deleted_at = timezone.now()
             self.save(update_fields=['is_deleted', 'deleted_at'])
             # create history record
-            if BookingHistory is not None:
-                try:
-                    BookingHistory.objects.create(
-                        booking=None,
-                        booking_pk=self.pk,
-                        user=self.user if hasattr(self, 'user') else None,
-                        action='deleted',
-                        data=data,
-                    )
-                except Exception:
-                    import traceback
-
-                    traceback.print_exc()
+            try:
+                audit.record(self, 'deleted')
+            except Exception:
+                import traceback
+
+                traceback.print_exc()
         except Exception:
             import traceback
 
@@ -145,10 +227,108 @@ class BookingHistory(models.Model):
     action = models.CharField(max_length=10, choices=ACTIONS)
     timestamp = models.DateTimeField(auto_now_add=True)
     data = models.JSONField(null=True, blank=True)
+    # Full snapshot; other rows hold only the fields that changed (see audit.history)
+    is_checkpoint = models.BooleanField(default=True)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['booking_pk', 'id'], name='bookinghist_pk_id_idx'),
+            # Booking detail page: one booking's rows by one user, newest first
+            models.Index(fields=['booking_pk', 'user', '-timestamp', '-id'], name='bookinghist_pk_user_ts_idx'),
+            # Profile page: a user's rows newest first
+            models.Index(fields=['user', '-timestamp', '-id'], name='bookinghist_user_ts_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_action_display()} booking {self.booking_pk} at {self.timestamp.isoformat()}"
-    
+
+
+class RestaurantCapacity(models.Model):
+    """
+    Seating rules for a restaurant.
+    covers_per_slot is the number of guests that can be seated during one slot.
+    slot_minutes is the width of a slot in the occupancy index.
+    turn_minutes is how long a booking holds its seats.
+    Restaurants without a RestaurantCapacity row accept any number of bookings.
+    """
+    restaurant = models.OneToOneField('menu.Restaurant', related_name='capacity', on_delete=models.CASCADE)
+    covers_per_slot = models.PositiveIntegerField(default=40)
+    slot_minutes = models.PositiveIntegerField(default=15)
+    turn_minutes = models.PositiveIntegerField(default=90)
+
+    class Meta:
+        verbose_name = 'Restaurant capacity'
+        verbose_name_plural = 'Restaurant capacities'
+
+    def __str__(self):
+        return f"{self.covers_per_slot} covers per {self.slot_minutes} min at {self.restaurant}"
+
+
+class SlotOccupancy(models.Model):
+    """
+    Number of seated guests at a restaurant during one slot.
+
+    Maintained incrementally from Booking saves and deletes (see
+    bookings.availability); rebuild with `manage.py rebuild_slot_occupancy`.
+    """
+    restaurant = models.ForeignKey('menu.Restaurant', related_name='slot_occupancy', on_delete=models.CASCADE)
+    slot_start = models.DateTimeField()
+    covers = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['restaurant', 'slot_start']
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'slot_start'], name='unique_slot_per_restaurant'),
+        ]
+
+    def __str__(self):
+        return f"{self.covers} covers at {self.restaurant} from {self.slot_start}"
+
+
+class OutboxMessage(models.Model):
+    """
+    An email waiting to be sent, written in the same transaction as the
+    change it reports. `manage.py drain_outbox` renders and sends pending
+    messages in batches (see bookings.outbox).
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    DEAD = 'dead'
+    STATUSES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (DEAD, 'Dead letter'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    to = models.EmailField()
+    context = models.JSONField(default=dict)
+    booking = models.ForeignKey(Booking, null=True, blank=True, on_delete=models.SET_NULL, related_name='emails')
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The worker's queue: pending messages that are due
+            models.Index(
+                fields=['next_attempt_at', 'id'], condition=models.Q(status='pending'), name='outbox_pending_due_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} to {self.to} ({self.status})"
+
+
+audit.register(
+    Booking,
+    BookingHistory,
+    fields=['user', 'restaurant', 'date', 'guests', 'special_requests'],
+    # Edited by the diner and by staff in the admin
+    concurrent_saves=True,
+)
@@ -0,0 +1,157 @@
+"""Transactional email outbox.
+
+Views and bulk operations never talk to the mail server. They add an
+OutboxMessage row inside the transaction that changes the booking, so the
+email exists if and only if the change commits. `manage.py drain_outbox`
+then sends due messages in batches over one reused mail connection:
+
+- a message that fails is retried after OUTBOX_BACKOFF_SECONDS, doubling on
+  each attempt up to OUTBOX_BACKOFF_MAX_SECONDS;
+- after OUTBOX_MAX_ATTEMPTS failures it becomes a dead letter, kept for
+  inspection and requeued from the admin or with `drain_outbox --requeue-dead`.
+
+A batch is claimed by pushing its next_attempt_at past OUTBOX_LEASE_SECONDS
+before sending, so several workers (or a crashed one) never send the same
+message twice within the lease.
+"""
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import connection as db_connection, transaction
+from django.utils import timezone
+
+from .email_utils import build_message, booking_context
+from .models import OutboxMessage
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def cancellation_email(booking):
+    """Return an unsaved outbox row for a booking's cancellation, or None if the guest has no email."""
+    if not booking.user or not booking.user.email:
+        return None
+    return OutboxMessage(
+        kind='booking_cancellation',
+        to=booking.user.email,
+        context=booking_context(booking),
+        booking=booking,
+    )
+
+
+def enqueue(messages):
+    """Save unsaved outbox rows (None entries are skipped) with one INSERT. Returns the saved rows."""
+    messages = [m for m in messages if m is not None]
+    if messages:
+        OutboxMessage.objects.bulk_create(messages)
+    return messages
+
+
+def enqueue_cancellations(bookings):
+    return enqueue(cancellation_email(booking) for booking in bookings)
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying a message that has failed `attempts` times."""
+    base = _setting('OUTBOX_BACKOFF_SECONDS', 30)
+    delay = min(base * 2 ** (attempts - 1), _setting('OUTBOX_BACKOFF_MAX_SECONDS', 3600))
+    # Jitter so messages that failed together do not retry together
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim(batch_size):
+    """Lease up to `batch_size` due messages to this worker and return them."""
+    now = timezone.now()
+    with transaction.atomic():
+        due = OutboxMessage.objects.filter(status=OutboxMessage.PENDING, next_attempt_at__lte=now)
+        if db_connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        batch = list(due.order_by('next_attempt_at', 'id')[:batch_size])
+        if batch:
+            lease = now + timedelta(seconds=_setting('OUTBOX_LEASE_SECONDS', 300))
+            OutboxMessage.objects.filter(pk__in=[m.pk for m in batch]).update(next_attempt_at=lease)
+    return batch
+
+
+def send_batch(batch, mail_connection):
+    """Send claimed messages over an open mail connection and record each outcome."""
+    sent, failed = [], []
+    for message in batch:
+        try:
+            email = build_message(message.kind, message.to, message.context, mail_connection)
+            if not mail_connection.send_messages([email]):
+                raise RuntimeError('The mail backend did not accept the message')
+            sent.append(message)
+        except Exception as exc:
+            failed.append((message, exc))
+            # The session may be broken; start a fresh one for the next message
+            mail_connection.close()
+    _record(sent, failed)
+    return len(sent), len(failed)
+
+
+def _record(sent, failed):
+    now = timezone.now()
+    max_attempts = _setting('OUTBOX_MAX_ATTEMPTS', 6)
+    for message in sent:
+        message.status = OutboxMessage.SENT
+        message.sent_at = now
+        message.attempts += 1
+        message.last_error = ''
+    for message, exc in failed:
+        message.attempts += 1
+        message.last_error = f'{type(exc).__name__}: {exc}'
+        if message.attempts >= max_attempts:
+            message.status = OutboxMessage.DEAD
+        else:
+            message.next_attempt_at = now + timedelta(seconds=backoff(message.attempts))
+    if failed:
+        # Log the first failure of the batch to stderr; every row keeps its own last_error
+        traceback.print_exception(failed[0][1])
+    OutboxMessage.objects.bulk_update(
+        sent + [m for m, _ in failed],
+        ['status', 'sent_at', 'attempts', 'last_error', 'next_attempt_at'],
+    )
+
+
+def drain(batch_size=None, max_batches=None, mail_connection=None):
+    """
+    Send due messages over one mail connection until none are left (or
+    `max_batches` were sent). Returns (sent, failed) totals.
+
+    Nothing is claimed while the mail server cannot be reached, so an outage
+    does not use up the messages' attempts.
+    """
+    batch_size = batch_size or _setting('OUTBOX_BATCH_SIZE', 100)
+    mail_connection = mail_connection or get_connection()
+    totals = [0, 0]
+    batches = 0
+    try:
+        mail_connection.open()
+    except Exception:
+        traceback.print_exc()
+        return tuple(totals)
+    try:
+        while max_batches is None or batches < max_batches:
+            batch = claim(batch_size)
+            if not batch:
+                break
+            sent, failed = send_batch(batch, mail_connection)
+            totals[0] += sent
+            totals[1] += failed
+            batches += 1
+    finally:
+        mail_connection.close()
+    return tuple(totals)
+
+
+def requeue_dead(queryset=None):
+    """Give dead letters a fresh set of attempts. Returns the number requeued."""
+    queryset = queryset if queryset is not None else OutboxMessage.objects.all()
+    return queryset.filter(status=OutboxMessage.DEAD).update(
+        status=OutboxMessage.PENDING, attempts=0, next_attempt_at=timezone.now()
+    )
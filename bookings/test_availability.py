@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from bookings.availability import can_accommodate, rebuild_occupancy, seats_free
+from bookings.forms import BookingForm
+from bookings.models import Booking, RestaurantCapacity, SlotOccupancy
+from menu.models import Restaurant
+
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="diner", password="pass1234")
+        self.restaurant = Restaurant.objects.create(name="Small Room", slug="small-room")
+        self.capacity = RestaurantCapacity.objects.create(
+            restaurant=self.restaurant, covers_per_slot=10, slot_minutes=15, turn_minutes=60
+        )
+        # A slot-aligned time well in the future
+        self.when = datetime(2099, 6, 1, 19, 0, tzinfo=dt_timezone.utc)
+
+    def _book(self, guests, when=None):
+        return Booking.objects.create(
+            user=self.user, restaurant=self.restaurant, date=when or self.when, guests=guests
+        )
+
+    def test_restaurant_without_rules_is_unlimited(self):
+        other = Restaurant.objects.create(name="Big Hall", slug="big-hall")
+        self.assertIsNone(seats_free(other, self.when))
+        self.assertTrue(can_accommodate(other, self.when, 500))
+
+    def test_create_fills_every_slot_of_the_turn(self):
+        self._book(4)
+        slots = SlotOccupancy.objects.filter(restaurant=self.restaurant)
+        self.assertEqual(slots.count(), 4)
+        self.assertEqual(set(slots.values_list("covers", flat=True)), {4})
+        self.assertEqual(seats_free(self.restaurant, self.when), 6)
+        # A window that only overlaps the last slot of the turn
+        self.assertEqual(seats_free(self.restaurant, self.when + timedelta(minutes=50)), 6)
+        self.assertEqual(seats_free(self.restaurant, self.when + timedelta(minutes=60)), 10)
+
+    def test_move_and_soft_delete_update_index_incrementally(self):
+        booking = self._book(4)
+        booking = Booking.objects.get(pk=booking.pk)
+        booking.date = self.when + timedelta(hours=2)
+        booking.save()
+        self.assertEqual(seats_free(self.restaurant, self.when), 10)
+        self.assertEqual(seats_free(self.restaurant, booking.date), 6)
+
+        booking.delete()
+        self.assertEqual(seats_free(self.restaurant, booking.date), 10)
+
+    def test_deferred_load_moves_seats(self):
+        booking = self._book(4)
+        booking = Booking.objects.only("pk").get(pk=booking.pk)
+        booking.guests = 6
+        booking.save()
+        self.assertEqual(seats_free(self.restaurant, self.when), 4)
+
+    def test_queryset_soft_delete_releases_seats(self):
+        self._book(3)
+        self._book(5)
+        self.assertEqual(seats_free(self.restaurant, self.when), 2)
+        Booking.objects.filter(restaurant=self.restaurant).delete()
+        self.assertEqual(seats_free(self.restaurant, self.when), 10)
+
+    def test_rebuild_matches_incremental_index(self):
+        self._book(3)
+        self._book(2, when=self.when + timedelta(minutes=30))
+        before = list(SlotOccupancy.objects.values_list("slot_start", "covers"))
+        rebuild_occupancy(self.restaurant.pk)
+        self.assertEqual(list(SlotOccupancy.objects.values_list("slot_start", "covers")), before)
+
+    def test_form_rejects_overbooking_but_allows_editing_own_booking(self):
+        booking = self._book(8)
+        data = {
+            "restaurant": self.restaurant.id,
+            "date": self.when.strftime("%Y-%m-%dT%H:%M"),
+            "guests": 4,
+            "special_requests": "",
+        }
+        form = BookingForm(data=data)
+        self.assertFalse(form.is_valid())
+        self.assertIn("date", form.errors)
+
+        # Growing the existing booking from 8 to 10 still fits
+        form = BookingForm(data=dict(data, guests=10), instance=Booking.objects.get(pk=booking.pk))
+        self.assertTrue(form.is_valid(), msg=form.errors)
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from bookings.availability import seats_free
+from bookings.models import Booking, BookingHistory, OutboxMessage, RestaurantCapacity
+from bookings.outbox import drain
+from menu.models import Restaurant
+
+
+class AuditedBulkOperationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="diner", password="pass1234", email="diner@example.com"
+        )
+        self.restaurant = Restaurant.objects.create(name="Small Room", slug="small-room")
+        RestaurantCapacity.objects.create(
+            restaurant=self.restaurant, covers_per_slot=50, slot_minutes=15, turn_minutes=60
+        )
+        self.when = datetime(2099, 6, 1, 19, 0, tzinfo=dt_timezone.utc)
+        for guests in (2, 3, 4):
+            Booking.objects.create(user=self.user, restaurant=self.restaurant, date=self.when, guests=guests)
+        BookingHistory.objects.all().delete()
+
+    def test_soft_delete_records_history_in_few_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            count = Booking.objects.filter(restaurant=self.restaurant).delete()
+        statements = [q["sql"] for q in ctx.captured_queries if "SAVEPOINT" not in q["sql"]]
+        # SELECT, UPDATE, capacity lookup, occupancy UPDATE, history INSERT
+        self.assertEqual(len(statements), 5, statements)
+        self.assertEqual(count, 3)
+        self.assertEqual(Booking.all_objects.filter(is_deleted=False).count(), 0)
+        self.assertEqual(BookingHistory.objects.filter(action="deleted").count(), 3)
+        self.assertEqual(seats_free(self.restaurant, self.when), 50)
+
+    def test_soft_delete_with_notify_queues_emails_for_the_outbox(self):
+        Booking.objects.filter(restaurant=self.restaurant).soft_delete(notify=True)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxMessage.objects.filter(kind="booking_cancellation").count(), 3)
+        self.assertEqual(drain(), (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn("Small Room", mail.outbox[0].subject)
+
+    def test_audited_update_records_history_and_moves_seats(self):
+        later = self.when + timedelta(hours=3)
+        updated = Booking.objects.filter(restaurant=self.restaurant).audited_update(date=later)
+        self.assertEqual(updated, 3)
+        history = BookingHistory.objects.filter(action="updated")
+        self.assertEqual(history.count(), 3)
+        self.assertTrue(all(h.data["date"] == later.isoformat() for h in history))
+        self.assertEqual(seats_free(self.restaurant, self.when), 50)
+        self.assertEqual(seats_free(self.restaurant, later), 41)
+
+    def test_audited_update_with_expression_reads_back_new_values(self):
+        Booking.objects.filter(restaurant=self.restaurant).audited_update(guests=F("guests") + 1)
+        recorded = sorted(h.data["guests"] for h in BookingHistory.objects.filter(action="updated"))
+        self.assertEqual(recorded, [3, 4, 5])
+        self.assertEqual(seats_free(self.restaurant, self.when), 38)
+
+    def test_audited_bulk_create_records_history_and_fills_seats(self):
+        new = [
+            Booking(user=self.user, restaurant=self.restaurant, date=self.when, guests=5)
+            for _ in range(2)
+        ]
+        Booking.objects.audited_bulk_create(new)
+        self.assertEqual(BookingHistory.objects.filter(action="created").count(), 2)
+        self.assertEqual(seats_free(self.restaurant, self.when), 31)
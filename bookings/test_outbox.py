@@ -0,0 +1,101 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from bookings.models import Booking, OutboxMessage
+from bookings.outbox import drain, requeue_dead
+from menu.models import Restaurant
+
+
+class FailingConnection:
+    """Mail connection whose sends always fail."""
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise ConnectionError("mail server said no")
+
+
+@override_settings(OUTBOX_MAX_ATTEMPTS=3, OUTBOX_BACKOFF_SECONDS=60)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="diner", password="pass1234", email="diner@example.com"
+        )
+        self.restaurant = Restaurant.objects.create(name="Test Restaurant", slug="test-restaurant")
+        self.booking = Booking.objects.create(
+            user=self.user, restaurant=self.restaurant, date=timezone.now() + timedelta(days=1), guests=2
+        )
+        self.client.login(username="diner", password="pass1234")
+
+    def cancel(self):
+        return self.client.post(reverse("bookings:booking_delete", args=[self.booking.pk]))
+
+    def test_cancel_queues_email_instead_of_sending(self):
+        response = self.cancel()
+        self.assertRedirects(response, reverse("bookings:booking_list"))
+        self.assertEqual(len(mail.outbox), 0)
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.kind, message.to, message.status), ("booking_cancellation", "diner@example.com", "pending"))
+        self.assertEqual(message.context["restaurant_name"], "Test Restaurant")
+        self.assertTrue(Booking.all_objects.all_objects().get(pk=self.booking.pk).is_deleted)
+
+    def test_drain_sends_batches_over_one_connection(self):
+        for _ in range(4):
+            self.booking.pk = None
+            self.booking.save()
+        Booking.objects.all().soft_delete(notify=True)
+        with mock.patch("django.core.mail.backends.locmem.EmailBackend.open") as opened:
+            self.assertEqual(drain(batch_size=2), (5, 0))
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], "text/html")
+        self.assertFalse(OutboxMessage.objects.exclude(status="sent").exists())
+        self.assertEqual(drain(), (0, 0))
+
+    @mock.patch("bookings.outbox.traceback.print_exception")
+    def test_failures_back_off_then_become_dead_letters(self, print_exception):
+        self.cancel()
+        connection = FailingConnection()
+        self.assertEqual(drain(mail_connection=connection), (0, 1))
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ("pending", 1))
+        self.assertIn("mail server said no", message.last_error)
+        self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=40))
+        # Not due yet
+        self.assertEqual(drain(mail_connection=connection), (0, 0))
+
+        for _ in range(2):
+            OutboxMessage.objects.update(next_attempt_at=timezone.now())
+            drain(mail_connection=connection)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ("dead", 3))
+
+        self.assertEqual(requeue_dead(), 1)
+        self.assertEqual(drain(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_rolled_back_cancellation_queues_nothing(self):
+        with mock.patch("bookings.views.enqueue", side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                self.cancel()
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertFalse(Booking.all_objects.all_objects().get(pk=self.booking.pk).is_deleted)
+
+    def test_command_drains_the_outbox(self):
+        self.cancel()
+        out = io.StringIO()
+        call_command("drain_outbox", stdout=out)
+        self.assertIn("Sent 1 emails, 0 failed", out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
@@ -0,0 +1,106 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from bookings.models import Booking, BookingHistory, OutboxMessage
+from bookings.outbox import drain
+from bookings.reminders import queue_reminders
+from menu.models import Restaurant
+
+
+class ReminderTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            username="diner", password="pass1234", email="diner@example.com", first_name="Dana"
+        )
+        self.restaurant = Restaurant.objects.create(name="Test Restaurant", slug="test-restaurant")
+        self.now = timezone.now()
+
+    def book(self, hours, user=None, **kwargs):
+        return Booking.objects.create(
+            user=user or self.user, restaurant=self.restaurant,
+            date=self.now + timedelta(hours=hours), guests=2, **kwargs
+        )
+
+    def test_only_bookings_in_the_window_are_reminded_once(self):
+        soon = self.book(3)
+        self.book(30)  # outside the window
+        self.book(-1)  # already started
+        self.book(5, is_deleted=True)
+
+        self.assertEqual(queue_reminders(now=self.now, hours=24), (1, 1))
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.kind, message.to, message.booking_id), ("booking_reminder", "diner@example.com", soon.pk))
+        self.assertEqual(message.context["user_name"], "Dana")
+        soon.refresh_from_db()
+        self.assertEqual(soon.reminder_sent_at, self.now)
+
+        # A second run, even a later one, finds nothing left to remind
+        self.assertEqual(queue_reminders(now=self.now + timedelta(minutes=5), hours=24), (0, 0))
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+        self.assertEqual(drain(), (1, 0))
+        self.assertEqual(mail.outbox[0].subject, "Reminder: your table at Test Restaurant")
+        self.assertIn("Dana", mail.outbox[0].body)
+
+    def test_marker_is_not_recorded_as_history(self):
+        self.book(3)
+        before = BookingHistory.objects.count()
+        queue_reminders(now=self.now)
+        self.assertEqual(BookingHistory.objects.count(), before)
+
+    def test_queries_do_not_grow_with_bookings(self):
+        User = get_user_model()
+        for i in range(7):
+            guest = User.objects.create_user(username=f"guest{i}", email=f"guest{i}@example.com")
+            self.book(i + 1, user=guest)
+        no_email = User.objects.create_user(username="noemail")
+        self.book(2, user=no_email)
+
+        with CaptureQueriesContext(connection) as queries:
+            claimed, queued = queue_reminders(now=self.now, chunk_size=3)
+        self.assertEqual((claimed, queued), (8, 7))
+        statements = [q["sql"] for q in queries.captured_queries if not q["sql"].startswith(("SAVEPOINT", "RELEASE"))]
+        # One UPDATE, one streamed SELECT and one INSERT per chunk
+        self.assertEqual(len(statements), 1 + 1 + 3, "\n".join(statements))
+
+    def test_rescheduling_clears_the_marker(self):
+        booking = self.book(3)
+        queue_reminders(now=self.now)
+        self.client.login(username="diner", password="pass1234")
+        new_date = timezone.localtime(self.now + timedelta(days=3)).strftime("%Y-%m-%dT%H:%M")
+        self.client.post(
+            reverse("bookings:booking_update", args=[booking.pk]),
+            {"restaurant": self.restaurant.pk, "date": new_date, "guests": 2},
+        )
+        booking.refresh_from_db()
+        self.assertIsNone(booking.reminder_sent_at)
+
+    def test_command_queues_and_sends(self):
+        self.book(3)
+        out = io.StringIO()
+        call_command("send_reminders", "--hours", "6", "--send", stdout=out)
+        self.assertIn("Queued 1 reminders for 1 bookings", out.getvalue())
+        self.assertIn("Sent 1 emails, 0 failed", out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_command_loops_until_interrupted(self):
+        self.book(3)
+        out = io.StringIO()
+        sleep = "bookings.management.commands.send_reminders.time.sleep"
+        with mock.patch(sleep, side_effect=[None, KeyboardInterrupt]) as sleeps:
+            call_command("send_reminders", "--hours", "6", "--loop", "--interval", "60", stdout=out)
+        # The second and third runs find nothing new and stay quiet
+        self.assertEqual(out.getvalue().count("Queued"), 1)
+        self.assertEqual(sleeps.call_count, 2)
+        self.assertEqual(OutboxMessage.objects.count(), 1)
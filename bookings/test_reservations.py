@@ -0,0 +1,72 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from bookings.availability import SlotUnavailable, reserve, seats_free
+from bookings.management.commands.stress_bookings import run_stress
+from bookings.models import Booking, RestaurantCapacity
+from menu.models import Restaurant
+
+
+class ReserveTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="diner", password="pass1234")
+        self.restaurant = Restaurant.objects.create(name="Small Room", slug="small-room")
+        RestaurantCapacity.objects.create(
+            restaurant=self.restaurant, covers_per_slot=4, slot_minutes=15, turn_minutes=60
+        )
+        self.when = datetime(2099, 6, 1, 19, 0, tzinfo=dt_timezone.utc)
+
+    def test_reserve_rejects_booking_that_does_not_fit(self):
+        reserve(Booking(user=self.user, restaurant=self.restaurant, date=self.when, guests=3))
+        with self.assertRaises(SlotUnavailable):
+            reserve(Booking(user=self.user, restaurant=self.restaurant, date=self.when, guests=2))
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(seats_free(self.restaurant, self.when), 1)
+
+    def test_reserve_move_keeps_index_consistent(self):
+        booking = reserve(Booking(user=self.user, restaurant=self.restaurant, date=self.when, guests=4))
+        booking.guests = 3
+        reserve(booking)
+        self.assertEqual(seats_free(self.restaurant, self.when), 1)
+
+    def test_create_view_reports_conflict_as_form_error(self):
+        reserve(Booking(user=self.user, restaurant=self.restaurant, date=self.when, guests=4))
+        self.client.login(username="diner", password="pass1234")
+        # Bypass the form-level check to simulate losing the race after validation
+        from bookings import forms
+
+        original = forms.can_accommodate
+        forms.can_accommodate = lambda *args, **kwargs: True
+        try:
+            response = self.client.post(
+                reverse("bookings:booking_create"),
+                {
+                    "restaurant": self.restaurant.id,
+                    "date": self.when.strftime("%Y-%m-%dT%H:%M"),
+                    "guests": 2,
+                    "special_requests": "",
+                },
+            )
+        finally:
+            forms.can_accommodate = original
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Not enough seats")
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class ConcurrentReserveTests(TransactionTestCase):
+    def test_parallel_reservations_never_overbook(self):
+        stats = run_stress(threads=6, attempts=5, covers=10, guests=2)
+        self.assertLessEqual(stats["booked_covers"], 10)
+        self.assertLessEqual(stats["max_slot_covers"], 10)
+        self.assertEqual(stats["booked_covers"], stats["max_slot_covers"])
+        self.assertEqual(stats["errors"], 0)
+        # 30 attempts of 2 covers against 10 covers: exactly 5 can win
+        self.assertEqual(stats["booked"], 5)
+        self.assertEqual(stats["conflicts"], 25)
+        self.assertEqual(stats["attempts"], 30)
+        self.assertAlmostEqual(stats["conflict_rate"], 25 / 30)
+        self.assertGreater(stats["throughput"], 0)
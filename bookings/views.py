@@ -1,50 +1,56 @@
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
-from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib import messages
-from django.http import Http404
+from django.db import transaction
+from django.http import Http404, HttpResponseRedirect
 from django.views.generic import TemplateView
 from .models import Booking, BookingHistory
 from .forms import BookingForm
-from .email_utils import send_booking_cancellation_email
+from .outbox import cancellation_email, enqueue
+from .availability import reserve, SlotUnavailable
+from audit.history import annotate_changes, describe_changes
+from yourtable.mixins import OwnerRequiredMixin
+from yourtable.pagination import KeysetListMixin
 
 # Create your views here.
-class BookingListView(LoginRequiredMixin, ListView):
+class BookingListView(LoginRequiredMixin, KeysetListMixin, ListView):
     """
     Display a list of bookings for the logged-in user, including soft-deleted ones.
     Once booking is deleted, it remains visible in the list with an "Already deleted" note.
     Use the `all_objects` manager
     when available, otherwise fall back to default.
+    Bookings are shown by date, a page at a time with a "Load more" button.
     """
     model = Booking
     template_name = "bookings/booking_list.html"
+    query_budget = {'GET': 3}
+    fragment_template_name = "bookings/_booking_items.html"
     context_object_name = "bookings"
+    keyset_ordering = ("date", "id")
 
     def get_queryset(self):
         # Include soft-deleted bookings in the list so users can see "Already deleted"
         # Use the `all_objects` manager when available, otherwise fall back to default.
         base_manager = getattr(Booking, 'all_objects', Booking.objects)
-        return base_manager.filter(user=self.request.user).order_by("date")
+        return base_manager.filter(user=self.request.user).select_related("restaurant")
 
 
-class BookingDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+class BookingDetailView(LoginRequiredMixin, OwnerRequiredMixin, DetailView):
     """
     Display details of a single booking, including soft-deleted ones.
     Use the `all_objects` manager when available, otherwise fall back to default.
     """
     model = Booking
     template_name = "bookings/booking_detail.html"
+    query_budget = {'GET': 7}
     context_object_name = "booking"
 
     def get_queryset(self):
         """Include soft-deleted bookings so users can view history of cancelled bookings."""
         base_manager = getattr(Booking, 'all_objects', Booking.objects)
-        return base_manager.all()
-
-    def test_func(self):
-        booking = self.get_object()
-        return booking.user == self.request.user
+        return base_manager.select_related('restaurant')
 
     def get(self, request, *args, **kwargs):
         """If the booking doesn't exist, redirect to booking list with a friendly message."""
@@ -62,21 +68,10 @@ class BookingDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
             qs = BookingHistory.objects.filter(
                 booking_pk=self.object.pk,
                 user=self.request.user
-            ).order_by('-timestamp')[:25]
-            import json
-            from django.utils.html import escape
-
-            for h in qs:
-                # prepare a pretty JSON string for the template (template will escape it)
-                pretty = ''
-                if h.data:
-                    try:
-                        pretty = json.dumps(h.data, indent=2, ensure_ascii=False, default=str)
-                    except Exception:
-                        try:
-                            pretty = str(h.data)
-                        except Exception:
-                            pretty = ''
+            ).select_related('user').order_by('-timestamp', '-id')[:25]
+
+            # history rows store only what changed; rebuild the old -> new values
+            for h in describe_changes(Booking, annotate_changes(Booking, qs)):
                 username = None
                 try:
                     username = h.user.username if h.user else None
@@ -85,7 +80,7 @@ class BookingDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
                 history_items.append({
                     'action_display': h.get_action_display(),
                     'timestamp': h.timestamp,
-                    'data_pretty': pretty,
+                    'changes': h.display_changes if h.action == 'updated' else [],
                     'username': username,
                 })
         except Exception:
@@ -102,6 +97,7 @@ class BookingCreateView(CreateView):
     """
     model = Booking
     template_name = "bookings/create_booking.html"
+    query_budget = {'GET': 3, 'POST': 12}
     form_class = BookingForm
     success_url = reverse_lazy("bookings:booking_success")
 
@@ -116,66 +112,71 @@ class BookingCreateView(CreateView):
     def form_valid(self, form):
         # At this point user is authenticated (POST was allowed), attach user
         form.instance.user = self.request.user
-        resp = super().form_valid(form)
+        try:
+            self.object = reserve(form.save(commit=False))
+        except SlotUnavailable as exc:
+            # Someone else took the last seats after the form was validated
+            form.add_error('date', str(exc))
+            return self.form_invalid(form)
         messages.success(self.request, "Booking created successfully.")
-        return resp
+        return HttpResponseRedirect(self.get_success_url())
     
 
-class BookingUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class BookingUpdateView(LoginRequiredMixin, OwnerRequiredMixin, UpdateView):
     """
     Allow users to update their own bookings.
     update is not allowed for soft-deleted bookings.
     """
     model = Booking
     template_name = "bookings/create_booking.html"
+    query_budget = {'GET': 4, 'POST': 16}
     form_class = BookingForm
 
-    def test_func(self):
-        booking = self.get_object()
-        return booking.user == self.request.user
-
     def get_success_url(self):
         return reverse_lazy("bookings:booking_detail", kwargs={"pk": self.object.pk})
 
     def form_valid(self, form):
-        resp = super().form_valid(form)
+        try:
+            self.object = reserve(form.save(commit=False))
+        except SlotUnavailable as exc:
+            form.add_error('date', str(exc))
+            return self.form_invalid(form)
         messages.success(self.request, "Your booking was updated.")
-        return resp
+        return HttpResponseRedirect(self.get_success_url())
 
 
-class BookingDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class BookingDeleteView(LoginRequiredMixin, OwnerRequiredMixin, DeleteView):
     """
     Allow users to delete their own bookings.
     Deletion is implemented as a soft-delete.
     """
     model = Booking
     template_name = "bookings/booking_delete.html"
+    query_budget = {'GET': 3, 'POST': 10}
     success_url = reverse_lazy("bookings:booking_list")
 
-    def test_func(self):
-        booking = self.get_object()
-        return booking.user == self.request.user
-    
     def get_queryset(self):
         # Use the full queryset (including soft-deleted records) so the view
         # can locate the booking object even if it's been soft-deleted earlier.
         try:
-            return Booking.all_objects.all()
+            queryset = Booking.all_objects.all()
         except Exception:
             # Fallback to default manager if all_objects is not available
-            return Booking.objects.all()
-
-    def delete(self, request, *args, **kwargs):
-        # Get booking before deletion to send email
-        booking = self.get_object()
-        # Perform delete (soft-delete implemented on model) and show confirmation
-        resp = super().delete(request, *args, **kwargs)
-        # Send cancellation email
-        if send_booking_cancellation_email(booking):
-            messages.success(request, "Booking cancelled successfully. A confirmation email has been sent.")
+            queryset = Booking.objects.all()
+        # The cancellation email needs the guest and the restaurant
+        return queryset.select_related('user', 'restaurant')
+
+    def form_valid(self, form):
+        # Soft-delete and queue the confirmation email in one transaction;
+        # `manage.py drain_outbox` sends it, so the mail server never slows this request
+        with transaction.atomic():
+            self.object.delete()
+            queued = enqueue([cancellation_email(self.object)])
+        if queued:
+            messages.success(self.request, "Booking cancelled successfully. A confirmation email is on its way.")
         else:
-            messages.success(request, "Booking cancelled successfully.")
-        return resp
+            messages.success(self.request, "Booking cancelled successfully.")
+        return HttpResponseRedirect(self.get_success_url())
  
  
 class BookingSuccessView(LoginRequiredMixin, TemplateView):
@@ -184,6 +185,7 @@ class BookingSuccessView(LoginRequiredMixin, TemplateView):
     using LoginRequiredMixin to ensure only logged-in users can see it.
     """
     template_name = "bookings/success.html"
+    query_budget = {'GET': 2}
 
 
 
@@ -1,5 +1,26 @@
 from django.contrib import admin
-from .models import MenuCategory, MenuItem, Restaurant
+from django.db.models.expressions import RawSQL
+
+from . import search
+from .models import Allergen, MenuCategory, MenuItem, Restaurant
+
+
+class FullTextSearchMixin:
+    """
+    Answer the changelist search box from the full-text index (menu.search)
+    rather than icontains scans; search_fields is still used on databases
+    without one. Every match is listed: the index is joined as a subquery.
+    """
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        backend = search.backend(queryset.db)
+        if not search_term or not backend.available:
+            return super().get_search_results(request, queryset, search_term)
+        matches = backend.match_sql(search_term, self.search_kind)
+        if matches is None:
+            return queryset.none(), False
+        return queryset.filter(pk__in=RawSQL(*matches)), False
 
 
 @admin.register(MenuCategory)
@@ -8,12 +29,28 @@ class MenuCategoryAdmin(admin.ModelAdmin):
     list_display = ("name",)
 
 
+@admin.register(Allergen)
+class AllergenAdmin(admin.ModelAdmin):
+    """
+    Allergens are created from menu items' allergen lists, so they are
+    renamed by editing those lists; a name changed here alone would be
+    created again the next time an item listing it is saved.
+    """
+    list_display = ("name", "slug")
+    search_fields = ("name",)
+    readonly_fields = ("name", "slug")
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(MenuItem)
-class MenuItemAdmin(admin.ModelAdmin):
+class MenuItemAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ("name", "category", "price", "is_active", "allergens")
-    list_filter = ("category", "is_active")
+    list_filter = ("category", "is_active", "allergen_tags")
     prepopulated_fields = {"slug": ("name",)}
     search_fields = ("name", "description", "allergens")
+    search_kind = "item"
     fieldsets = (
         (None, {
             'fields': ('name', 'slug', 'category', 'description', 'price', 'image', 'allergens', 'is_active')
@@ -22,7 +59,8 @@ class MenuItemAdmin(admin.ModelAdmin):
 
 
 @admin.register(Restaurant)
-class RestaurantAdmin(admin.ModelAdmin):
+class RestaurantAdmin(FullTextSearchMixin, admin.ModelAdmin):
     prepopulated_fields = {"slug": ("name",)}
     list_display = ("name", "phone", "website")
     search_fields = ("name", "address")
+    search_kind = "restaurant"
@@ -7,3 +7,7 @@ class MenuConfig(AppConfig):
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'menu'
+
+    def ready(self):
+        # Search index signal handlers
+        from . import signals  # noqa: F401
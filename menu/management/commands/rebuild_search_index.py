@@ -0,0 +1,43 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from menu import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of menu items and restaurants"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Documents per INSERT")
+        parser.add_argument(
+            "--benchmark", metavar="QUERY", nargs="*",
+            help="Afterwards, time typeahead lookups for these queries (or a built-in set)",
+        )
+        parser.add_argument("--skip-rebuild", action="store_true", help="Only run the benchmark")
+
+    def handle(self, *args, **options):
+        if not search.backend().available:
+            self.stdout.write("This database has no full-text search; searches use icontains lookups")
+            return
+        if not options["skip_rebuild"]:
+            started = time.perf_counter()
+            count = search.rebuild(batch_size=options["batch_size"])
+            self.stdout.write(f"Indexed {count} documents in {time.perf_counter() - started:.1f}s")
+        if options["benchmark"] is not None:
+            self.benchmark(options["benchmark"] or ["sa", "sal", "salm", "chick", "gr sal", "vegan cu", "spicy duck tru"])
+
+    def benchmark(self, queries, rounds=20):
+        timings = []
+        for _ in range(rounds):
+            for query in queries:
+                started = time.perf_counter()
+                search.suggest(query)
+                timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(
+            f"{len(timings)} lookups: median {statistics.median(timings):.2f} ms, "
+            f"p95 {p95:.2f} ms, max {timings[-1]:.2f} ms"
+        )
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.25 on 2026-10-18 01:12
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def link_allergens(apps, schema_editor):
+    """Create Allergen rows from the existing comma-separated strings."""
+    MenuItem = apps.get_model('menu', 'MenuItem')
+    Allergen = apps.get_model('menu', 'Allergen')
+    allergens = {}
+    for item in MenuItem.objects.exclude(allergens=''):
+        raw = item.allergens.strip()
+        if raw.lower() == 'none':
+            continue
+        names = {' '.join(part.split()).lower() for part in raw.split(',')} - {''}
+        slugs = set()
+        for name in names:
+            # Keyed on the slug, as in menu.models.allergen_slug()
+            slug = slugify(name)[:50].strip('-') or slugify(name, allow_unicode=True)[:50].strip('-')
+            if not slug:
+                # Left in the item's allergens text for staff to correct
+                continue
+            if slug not in allergens:
+                allergens[slug] = Allergen.objects.get_or_create(slug=slug, defaults={'name': name[:100]})[0]
+            slugs.add(slug)
+        item.allergen_tags.set([allergens[slug] for slug in slugs])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0003_menucategory_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Allergen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('slug', models.SlugField(unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='allergen_tags',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='menu_items', to='menu.allergen'),
+        ),
+        migrations.RunPython(link_allergens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    """Create the full-text search table for this database and fill it."""
+    from menu import search
+
+    search.rebuild(
+        apps.get_model('menu', 'MenuItem'),
+        apps.get_model('menu', 'Restaurant'),
+        connection=schema_editor.connection,
+    )
+
+
+def drop_index(apps, schema_editor):
+    from menu import search
+
+    search.backend(connection=schema_editor.connection).drop()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0004_allergens'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
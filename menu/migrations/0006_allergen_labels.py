@@ -0,0 +1,22 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0005_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='allergen',
+            options={'ordering': ['name'], 'verbose_name': 'Allergen', 'verbose_name_plural': 'Allergens'},
+        ),
+        migrations.AlterField(
+            model_name='menuitem',
+            name='allergen_tags',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='menu_items', to='menu.allergen', verbose_name='allergens'),
+        ),
+    ]
@@ -1,5 +1,10 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Q
 from django.urls import reverse
+from django.utils.text import slugify
+
+from yourtable import caching
 
 
 class MenuCategory(models.Model):
@@ -18,10 +23,56 @@ class MenuCategory(models.Model):
         return self.name
 
 
+class Allergen(models.Model):
+    """
+    One allergen, e.g. "nuts". Created from MenuItem.allergens when an item is
+    saved, so the menu can be filtered with an indexed join instead of
+    splitting strings.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    slug = models.SlugField(unique=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Allergen'
+        verbose_name_plural = 'Allergens'
+
+    def __str__(self):
+        return self.name
+
+
+def parse_allergens(raw):
+    """Split a comma-separated allergens string into lower-case names; "none" means no allergens."""
+    raw = (raw or '').strip()
+    if raw.lower() == 'none':
+        return []
+    names = []
+    for part in raw.split(','):
+        name = ' '.join(part.split()).lower()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def allergen_slug(name):
+    """
+    Return the slug that identifies allergen `name`. Names that differ only in
+    punctuation, e.g. "tree-nuts" and "tree nuts", are the same allergen.
+    """
+    max_length = Allergen._meta.get_field('slug').max_length
+    for allow_unicode in (False, True):
+        slug = slugify(name, allow_unicode=allow_unicode)[:max_length].strip('-')
+        if slug:
+            return slug
+    return ''
+
+
 class MenuItem(models.Model):
     """
     Represents a single item on the menu.
     Fields include name, description, price, image, allergens, and active status.
+    `allergens` is what staff type in; saving the item keeps `allergen_tags`
+    in step with it.
     """
     category = models.ForeignKey(MenuCategory, related_name='items', on_delete=models.CASCADE)
     name = models.CharField(max_length=200)
@@ -31,10 +82,52 @@ class MenuItem(models.Model):
     image = models.ImageField(upload_to='menu/', blank=True, null=True)
     allergens = models.CharField(max_length=255, blank=True, help_text='Optional comma-separated list of allergens, e.g. "nuts, dairy, soy"')
     is_active = models.BooleanField(default=True)
+    allergen_tags = models.ManyToManyField(
+        Allergen, related_name='menu_items', blank=True, editable=False, verbose_name='allergens'
+    )
 
     def get_absolute_url(self):
         return reverse('menu:menu_item_detail', args=[self.slug])
 
+    def clean(self):
+        super().clean()
+        unusable = [name for name in parse_allergens(self.allergens) if not allergen_slug(name)]
+        if unusable:
+            raise ValidationError({'allergens': f'Not an allergen name: {", ".join(unusable)}'})
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if update_fields is None or 'allergens' in update_fields:
+                self.allergen_tags.set(self._ensure_allergens())
+
+    def _ensure_allergens(self):
+        """Return the Allergen rows listed in `allergens`, creating missing ones."""
+        wanted = {}
+        for name in parse_allergens(self.allergens):
+            slug = allergen_slug(name)
+            if not slug:
+                raise ValueError(f'Not an allergen name: {name!r}')
+            wanted.setdefault(slug, name[:Allergen._meta.get_field('name').max_length])
+        if not wanted:
+            return []
+        # Rows are matched on slug; the name catches rows whose slug was made
+        # before slugs were truncated, which would otherwise clash on name.
+        rows = list(Allergen.objects.filter(Q(slug__in=wanted) | Q(name__in=wanted.values())))
+        by_slug = {allergen.slug: allergen for allergen in rows}
+        by_name = {allergen.name: allergen for allergen in rows}
+        return [
+            by_slug.get(slug) or by_name.get(name)
+            or Allergen.objects.get_or_create(slug=slug, defaults={'name': name})[0]
+            for slug, name in wanted.items()
+        ]
+
+    @property
+    def allergens_list(self):
+        """Allergen names, from prefetched allergen_tags when available."""
+        return [allergen.name for allergen in self.allergen_tags.all()]
+
     def __str__(self):
         return self.name
 
@@ -63,3 +156,10 @@ class Restaurant(models.Model):
     def get_absolute_url(self):
         from django.urls import reverse
         return reverse('menu:restaurant_detail', args=[self.slug])
+
+
+# Cached pages and fragments depend on these tags (see yourtable.caching)
+caching.register(Allergen, tags=['menu'])
+caching.register(MenuCategory, tags=['menu'])
+caching.register(MenuItem, tags=['menu'])
+caching.register(Restaurant, tags=['restaurants'])
@@ -0,0 +1,370 @@
+"""Full-text search over menu items and restaurants.
+
+Every MenuItem and Restaurant has one document in the `menu_search` table:
+a title (the name, weighted highest) and a body (description, category,
+allergens, address). The table depends on the database:
+
+- SQLite: an FTS5 virtual table with prefix indexes for 2 and 3 characters,
+  ranked by bm25();
+- PostgreSQL: a table with a weighted, generated tsvector column and a GIN
+  index, ranked by ts_rank().
+
+Other databases have no search table and fall back to icontains lookups.
+
+Every word of a query is matched as a prefix, so "grill sal" finds "Grilled
+Salmon" while it is being typed. search() ranks every match by relevance.
+suggest(), used for typeahead, only looks at names and ranks at most
+SUGGEST_CANDIDATES matches (names starting with the query first, then the
+shortest), so its cost stays flat however many documents a short prefix
+matches. Results carry the kind, id, title and slug stored in the index, so
+neither touches the model tables. match_sql() gives the ids of every match as
+a subquery, for filtering a queryset (the admin search box) without a limit.
+Documents are rewritten by the save/delete signals in menu.signals;
+`manage.py rebuild_search_index` rebuilds the whole table.
+"""
+import re
+
+from django.db import connections
+from django.urls import reverse
+
+
+TABLE = 'menu_search'
+# A document's row id is pk * len(KINDS) + the kind's position, so it can be
+# replaced without a lookup on an unindexed column
+KINDS = ('item', 'restaurant')
+MAX_TERMS = 8
+# Matches ranked per typeahead lookup
+SUGGEST_CANDIDATES = 200
+# Shorter queries get no suggestions; a one-letter prefix matches most of the catalogue
+SUGGEST_MIN_CHARS = 2
+
+
+def terms(query):
+    """Split a query into at most MAX_TERMS lower-case words, dropping punctuation and operators."""
+    return re.findall(r'\w+', (query or '').lower())[:MAX_TERMS]
+
+
+def doc_id(kind, pk):
+    return pk * len(KINDS) + KINDS.index(kind)
+
+
+def item_document(item):
+    body = [item.description, item.category.name, item.allergens]
+    return {'title': item.name, 'body': ' '.join(filter(None, body)), 'slug': item.slug, 'active': item.is_active}
+
+
+def restaurant_document(restaurant):
+    body = [restaurant.description, restaurant.address]
+    return {'title': restaurant.name, 'body': ' '.join(filter(None, body)), 'slug': restaurant.slug, 'active': True}
+
+
+def result_url(kind, slug):
+    if kind == 'item':
+        return reverse('menu:menu_item_detail', args=[slug])
+    # Restaurants have no page of their own yet; send guests to the booking form
+    return reverse('bookings:booking_create')
+
+
+class FallbackBackend:
+    """Databases without full-text search: no index, icontains on the model tables."""
+    available = False
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def create(self):
+        pass
+
+    def drop(self):
+        pass
+
+    def clear(self):
+        pass
+
+    def upsert(self, kind, pk, document):
+        pass
+
+    def insert_many(self, documents):
+        pass
+
+    def delete(self, kind, pk):
+        pass
+
+    def search(self, query, limit=10, kinds=KINDS, active_only=True):
+        from django.db.models import Q
+
+        from .models import MenuItem, Restaurant
+
+        results = []
+        words = terms(query)
+        if not words:
+            return results
+        for kind, model in (('item', MenuItem), ('restaurant', Restaurant)):
+            if kind not in kinds:
+                continue
+            qs = model.objects.using(self.connection.alias)
+            for word in words:
+                qs = qs.filter(Q(name__icontains=word) | Q(description__icontains=word))
+            if kind == 'item' and active_only:
+                qs = qs.filter(is_active=True)
+            for pk, name, slug in qs.values_list('pk', 'name', 'slug')[:limit]:
+                results.append({'kind': kind, 'id': pk, 'title': name, 'slug': slug})
+        return results[:limit]
+
+    def suggest(self, query, limit=8, active_only=True):
+        return self.search(query, limit=limit, active_only=active_only)
+
+    def match_sql(self, query, kind):
+        """
+        (sql, params) selecting the primary keys of every `kind` matching
+        `query`, or None without words or without an index.
+        """
+        return None
+
+
+class SQLiteBackend(FallbackBackend):
+    available = True
+
+    def create(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+                "title, body, slug UNINDEXED, active UNINDEXED, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+
+    def drop(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+
+    def upsert(self, kind, pk, document):
+        self.delete(kind, pk)
+        self.insert_many([(kind, pk, document)])
+
+    def insert_many(self, documents):
+        if not documents:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (rowid, title, body, slug, active) VALUES (%s, %s, %s, %s, %s)',
+                [(doc_id(kind, pk), d['title'], d['body'], d['slug'], int(d['active'])) for kind, pk, d in documents],
+            )
+
+    def delete(self, kind, pk):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [doc_id(kind, pk)])
+
+    def search(self, query, limit=10, kinds=KINDS, active_only=True):
+        words = terms(query)
+        if not words:
+            return []
+        # Each word quoted (so it cannot be read as an FTS5 operator) and matched as a prefix
+        match = ' '.join(f'"{word}"*' for word in words)
+        sql = f'SELECT rowid, title, slug FROM {TABLE} WHERE {TABLE} MATCH %s'
+        params = [match]
+        if active_only:
+            sql += ' AND active = 1'
+        if set(kinds) != set(KINDS):
+            sql += ' AND rowid %% %s IN (' + ', '.join(['%s'] * len(kinds)) + ')'
+            params += [len(KINDS), *(KINDS.index(kind) for kind in kinds)]
+        # bm25 weights follow the column order: title ten times the body
+        sql += f' ORDER BY bm25({TABLE}, 10.0, 1.0) LIMIT %s'
+        params.append(limit)
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return [
+            {'kind': KINDS[rowid % len(KINDS)], 'id': rowid // len(KINDS), 'title': title, 'slug': slug}
+            for rowid, title, slug in rows
+        ]
+
+    def suggest(self, query, limit=8, active_only=True):
+        words = terms(query)
+        if not words:
+            return []
+        match = 'title: (' + ' '.join(f'"{word}"*' for word in words) + ')'
+        # Without ORDER BY the MATCH stops after SUGGEST_CANDIDATES rows, so
+        # inactive rows are filtered inside it rather than after the LIMIT
+        sql = (
+            f'SELECT rowid, title, slug FROM {TABLE} WHERE rowid IN '
+            f'(SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s'
+            + (' AND active = 1' if active_only else '')
+            + ' LIMIT %s) ORDER BY lower(title) LIKE %s DESC, length(title), title LIMIT %s'
+        )
+        params = [match, SUGGEST_CANDIDATES, words[0] + '%', limit]
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return [
+            {'kind': KINDS[rowid % len(KINDS)], 'id': rowid // len(KINDS), 'title': title, 'slug': slug}
+            for rowid, title, slug in rows
+        ]
+
+    def match_sql(self, query, kind):
+        words = terms(query)
+        if not words:
+            return None
+        sql = f'SELECT rowid / %s FROM {TABLE} WHERE {TABLE} MATCH %s AND rowid %% %s = %s'
+        return sql, [len(KINDS), ' '.join(f'"{word}"*' for word in words), len(KINDS), KINDS.index(kind)]
+
+
+class PostgresBackend(FallbackBackend):
+    available = True
+
+    def create(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+                "id bigint PRIMARY KEY, title text NOT NULL, body text NOT NULL, "
+                "slug varchar(50) NOT NULL, active boolean NOT NULL, "
+                "document tsvector GENERATED ALWAYS AS ("
+                "setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', body), 'B')"
+                ") STORED)"
+            )
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {TABLE}_document_idx ON {TABLE} USING GIN (document)')
+
+    def drop(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {TABLE}')
+
+    def upsert(self, kind, pk, document):
+        self.insert_many([(kind, pk, document)])
+
+    def insert_many(self, documents):
+        if not documents:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (id, title, body, slug, active) VALUES (%s, %s, %s, %s, %s) '
+                'ON CONFLICT (id) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body, '
+                'slug = EXCLUDED.slug, active = EXCLUDED.active',
+                [(doc_id(kind, pk), d['title'], d['body'], d['slug'], d['active']) for kind, pk, d in documents],
+            )
+
+    def delete(self, kind, pk):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE} WHERE id = %s', [doc_id(kind, pk)])
+
+    def search(self, query, limit=10, kinds=KINDS, active_only=True):
+        words = terms(query)
+        if not words:
+            return []
+        sql = (
+            f"SELECT id, title, slug FROM {TABLE}, to_tsquery('simple', %s) query "
+            'WHERE document @@ query'
+        )
+        params = [' & '.join(f'{word}:*' for word in words)]
+        if active_only:
+            sql += ' AND active'
+        if set(kinds) != set(KINDS):
+            sql += ' AND id %% %s = ANY(%s)'
+            params += [len(KINDS), [KINDS.index(kind) for kind in kinds]]
+        sql += ' ORDER BY ts_rank(document, query) DESC, id LIMIT %s'
+        params.append(limit)
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return [
+            {'kind': KINDS[pk % len(KINDS)], 'id': pk // len(KINDS), 'title': title, 'slug': slug}
+            for pk, title, slug in rows
+        ]
+
+    def suggest(self, query, limit=8, active_only=True):
+        words = terms(query)
+        if not words:
+            return []
+        # :*A restricts each prefix to the title, which carries weight A
+        sql = (
+            f"SELECT id, title, slug FROM (SELECT id, title, slug FROM {TABLE} "
+            "WHERE document @@ to_tsquery('simple', %s)"
+            + (' AND active' if active_only else '')
+            + ' LIMIT %s) candidates ORDER BY lower(title) LIKE %s DESC, length(title), title LIMIT %s'
+        )
+        params = [' & '.join(f'{word}:*A' for word in words), SUGGEST_CANDIDATES, words[0] + '%', limit]
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return [
+            {'kind': KINDS[pk % len(KINDS)], 'id': pk // len(KINDS), 'title': title, 'slug': slug}
+            for pk, title, slug in rows
+        ]
+
+    def match_sql(self, query, kind):
+        words = terms(query)
+        if not words:
+            return None
+        sql = f"SELECT id / %s FROM {TABLE} WHERE document @@ to_tsquery('simple', %s) AND id %% %s = %s"
+        return sql, [len(KINDS), ' & '.join(f'{word}:*' for word in words), len(KINDS), KINDS.index(kind)]
+
+
+BACKENDS = {'sqlite': SQLiteBackend, 'postgresql': PostgresBackend}
+
+
+def backend(using='default', connection=None):
+    connection = connection or connections[using]
+    return BACKENDS.get(connection.vendor, FallbackBackend)(connection)
+
+
+def search(query, limit=10, kinds=KINDS, active_only=True, using='default'):
+    """Return up to `limit` ranked matches as dicts with kind, id, title, slug and url."""
+    results = backend(using).search(query, limit=limit, kinds=kinds, active_only=active_only)
+    for result in results:
+        result['url'] = result_url(result['kind'], result['slug'])
+    return results
+
+
+def suggest(query, limit=8, using='default'):
+    """Return up to `limit` active items and restaurants whose names match a partial query."""
+    if len(''.join(terms(query))) < SUGGEST_MIN_CHARS:
+        return []
+    results = backend(using).suggest(query, limit=limit)
+    for result in results:
+        result['url'] = result_url(result['kind'], result['slug'])
+    return results
+
+
+def index_item(item, using='default'):
+    backend(using).upsert('item', item.pk, item_document(item))
+
+
+def index_restaurant(restaurant, using='default'):
+    backend(using).upsert('restaurant', restaurant.pk, restaurant_document(restaurant))
+
+
+def rebuild(item_model=None, restaurant_model=None, using='default', connection=None, batch_size=1000):
+    """
+    Recreate the search table from the model tables and return the number of
+    documents. The model arguments let migrations pass historical models.
+    """
+    if item_model is None:
+        from .models import MenuItem as item_model, Restaurant as restaurant_model
+    search_backend = backend(using, connection)
+    if not search_backend.available:
+        return 0
+    alias = search_backend.connection.alias
+    search_backend.create()
+    search_backend.clear()
+    sources = [
+        ('item', item_document, item_model.objects.using(alias).select_related('category')),
+        ('restaurant', restaurant_document, restaurant_model.objects.using(alias).all()),
+    ]
+    count = 0
+    for kind, document, queryset in sources:
+        batch = []
+        for obj in queryset.order_by('pk').iterator(chunk_size=batch_size):
+            batch.append((kind, obj.pk, document(obj)))
+            if len(batch) >= batch_size:
+                search_backend.insert_many(batch)
+                count += len(batch)
+                batch = []
+        search_backend.insert_many(batch)
+        count += len(batch)
+    return count
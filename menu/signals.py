@@ -0,0 +1,36 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import search
+
+# Keep the full-text search table (menu.search) in step with the catalogue.
+
+
+@receiver(post_save, sender='menu.MenuItem')
+def menu_item_saved(sender, instance, using, **kwargs):
+    search.index_item(instance, using=using)
+
+
+@receiver(post_delete, sender='menu.MenuItem')
+def menu_item_deleted(sender, instance, using, **kwargs):
+    search.backend(using).delete('item', instance.pk)
+
+
+@receiver(post_save, sender='menu.MenuCategory')
+def menu_category_saved(sender, instance, using, created, **kwargs):
+    """The category name is part of each item's document."""
+    if created:
+        return
+    search_backend = search.backend(using)
+    for item in instance.items.using(using).select_related('category'):
+        search_backend.upsert('item', item.pk, search.item_document(item))
+
+
+@receiver(post_save, sender='menu.Restaurant')
+def restaurant_saved(sender, instance, using, **kwargs):
+    search.index_restaurant(instance, using=using)
+
+
+@receiver(post_delete, sender='menu.Restaurant')
+def restaurant_deleted(sender, instance, using, **kwargs):
+    search.backend(using).delete('restaurant', instance.pk)
@@ -0,0 +1,127 @@
+import io
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models.expressions import RawSQL
+from django.test import TestCase
+from django.urls import reverse
+
+from menu import search
+from menu.models import MenuCategory, MenuItem, Restaurant
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.mains = MenuCategory.objects.create(name="Mains", slug="mains")
+        self.salmon = MenuItem.objects.create(
+            category=self.mains, name="Grilled Salmon", slug="grilled-salmon",
+            description="Chargrilled fillet with lemon", price=Decimal("18.50"), allergens="fish",
+        )
+        self.salad = MenuItem.objects.create(
+            category=self.mains, name="Caesar Salad", slug="caesar-salad",
+            description="Romaine, parmesan and a salmon-free dressing", price=Decimal("9.00"),
+        )
+        self.restaurant = Restaurant.objects.create(
+            name="Salty Dog", slug="salty-dog", address="1 Harbour Road"
+        )
+
+    def titles(self, query, **kwargs):
+        return [result["title"] for result in search.search(query, **kwargs)]
+
+    def test_prefix_matching_and_ranking(self):
+        # A name match outranks a match in the description
+        self.assertEqual(self.titles("salm"), ["Grilled Salmon", "Caesar Salad"])
+        self.assertEqual(self.titles("grill sal"), ["Grilled Salmon"])
+        self.assertEqual(set(self.titles("sal")), {"Grilled Salmon", "Caesar Salad", "Salty Dog"})
+        self.assertEqual(self.titles("harbour"), ["Salty Dog"])
+        self.assertEqual(self.titles("sal", kinds=("restaurant",)), ["Salty Dog"])
+
+    def test_suggest_matches_names_only(self):
+        titles = [result["title"] for result in search.suggest("sal")]
+        # Names starting with the query first, then the shortest
+        self.assertEqual(titles, ["Salty Dog", "Caesar Salad", "Grilled Salmon"])
+        self.assertEqual(search.suggest("lemon"), [])
+        self.assertEqual(search.suggest("s"), [])
+        self.salad.is_active = False
+        self.salad.save()
+        self.assertEqual([result["title"] for result in search.suggest("sal")], ["Salty Dog", "Grilled Salmon"])
+
+    def test_suggest_skips_inactive_rows_before_the_candidate_limit(self):
+        for n in range(search.SUGGEST_CANDIDATES + 50):
+            MenuItem.objects.create(
+                category=self.mains, name=f"Old Salmon {n}", slug=f"old-salmon-{n}", price=Decimal("1.00"),
+                is_active=False,
+            )
+        MenuItem.objects.create(category=self.mains, name="Salmon", slug="salmon", price=Decimal("12.00"))
+        self.assertIn("Salmon", [result["title"] for result in search.suggest("salm")])
+
+    def test_queries_cannot_inject_fts_syntax(self):
+        for query in ['"', 'sal*', 'salmon OR', 'NEAR(', "a'b", "-", "^sal"]:
+            with self.subTest(query=query):
+                search.search(query)
+                search.suggest(query)
+        self.assertEqual(self.titles("  "), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.salmon.name = "Seared Trout"
+        self.salmon.save()
+        self.assertEqual(self.titles("trout"), ["Seared Trout"])
+        self.assertEqual(self.titles("grilled"), [])
+
+        # The category is part of each item's document
+        self.mains.name = "Specials"
+        self.mains.save()
+        self.assertEqual(len(self.titles("special")), 2)
+
+        self.salad.is_active = False
+        self.salad.save()
+        self.assertEqual(self.titles("caesar"), [])
+        self.assertEqual(self.titles("caesar", active_only=False), ["Caesar Salad"])
+
+        self.restaurant.delete()
+        self.assertEqual(self.titles("salty"), [])
+
+    def test_rebuild(self):
+        search.backend().clear()
+        self.assertEqual(self.titles("salmon"), [])
+        out = io.StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("Indexed 3 documents", out.getvalue())
+        self.assertEqual(self.titles("salmon"), ["Grilled Salmon", "Caesar Salad"])
+
+    def test_suggest_endpoint(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("menu:search_suggest"), {"q": "grilled sa"})
+        self.assertEqual(response.json(), {
+            "query": "grilled sa",
+            "results": [{
+                "kind": "item", "id": self.salmon.pk, "title": "Grilled Salmon",
+                "slug": "grilled-salmon", "url": "/menu/grilled-salmon/",
+            }],
+        })
+        self.assertEqual(self.client.get(reverse("menu:search_suggest")).json()["results"], [])
+
+    def test_search_page_and_admin(self):
+        response = self.client.get(reverse("menu:search"), {"q": "salmon"})
+        self.assertContains(response, "Grilled Salmon")
+        self.assertContains(response, "/menu/grilled-salmon/")
+
+        get_user_model().objects.create_superuser("admin", "admin@example.com", "pass1234")
+        self.client.login(username="admin", password="pass1234")
+        response = self.client.get(reverse("admin:menu_menuitem_changelist"), {"q": "lemon"})
+        self.assertEqual([item.name for item in response.context["cl"].result_list], ["Grilled Salmon"])
+        response = self.client.get(reverse("admin:menu_restaurant_changelist"), {"q": "harbour"})
+        self.assertEqual([r.name for r in response.context["cl"].result_list], ["Salty Dog"])
+
+    def test_match_sql_selects_every_match(self):
+        MenuItem.objects.bulk_create([
+            MenuItem(category=self.mains, name=f"Salmon {i}", slug=f"salmon-{i}", price=Decimal("9.00"))
+            for i in range(30)
+        ])
+        call_command("rebuild_search_index", stdout=io.StringIO())
+        sql, params = search.backend().match_sql("salmon", "item")
+        matched = MenuItem.objects.filter(pk__in=RawSQL(sql, params))
+        # The new items, Grilled Salmon, and the salad whose description mentions salmon
+        self.assertEqual(matched.count(), 32)
+        self.assertIsNone(search.backend().match_sql("!!", "item"))
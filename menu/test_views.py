@@ -0,0 +1,126 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from django.core.exceptions import ValidationError
+
+from menu.models import Allergen, MenuCategory, MenuItem, parse_allergens
+
+
+class AllergenTests(TestCase):
+    def setUp(self):
+        self.category = MenuCategory.objects.create(name="Mains", slug="mains")
+
+    def test_parse_allergens(self):
+        self.assertEqual(parse_allergens(" Nuts, dairy ,,  tree   nuts, nuts"), ["nuts", "dairy", "tree nuts"])
+        self.assertEqual(parse_allergens("None"), [])
+        self.assertEqual(parse_allergens(""), [])
+
+    def test_saving_an_item_links_its_allergens(self):
+        item = MenuItem.objects.create(
+            category=self.category, name="Satay", slug="satay", price=Decimal("8.00"), allergens="Nuts, Soy"
+        )
+        self.assertEqual(sorted(item.allergens_list), ["nuts", "soy"])
+        self.assertEqual(Allergen.objects.get(name="nuts").slug, "nuts")
+
+        item.allergens = "soy, sesame"
+        item.save()
+        self.assertEqual(sorted(item.allergens_list), ["sesame", "soy"])
+        # Allergens are shared between items
+        MenuItem.objects.create(category=self.category, name="Tofu", slug="tofu", price=Decimal("7.00"), allergens="soy")
+        self.assertEqual(Allergen.objects.filter(name="soy").count(), 1)
+
+    def test_names_with_the_same_slug_are_one_allergen(self):
+        MenuItem.objects.create(
+            category=self.category, name="Praline", slug="praline", price=Decimal("5.00"), allergens="tree nuts"
+        )
+        item = MenuItem.objects.create(
+            category=self.category, name="Torte", slug="torte", price=Decimal("6.00"),
+            allergens="tree-nuts, dairy, Tree Nuts!",
+        )
+        self.assertEqual(sorted(item.allergens_list), ["dairy", "tree nuts"])
+        self.assertEqual(Allergen.objects.filter(slug="tree-nuts").count(), 1)
+
+    def test_long_names_get_bounded_slugs(self):
+        name = "traces of " + "very " * 20 + "small seeds"
+        item = MenuItem.objects.create(
+            category=self.category, name="Loaf", slug="loaf", price=Decimal("4.00"), allergens=name
+        )
+        allergen = item.allergen_tags.get()
+        self.assertLessEqual(len(allergen.slug), 50)
+        self.assertLessEqual(len(allergen.name), 100)
+
+    def test_names_without_a_slug_are_rejected(self):
+        item = MenuItem(category=self.category, name="Mystery", slug="mystery", price=Decimal("4.00"), allergens="nuts, ***")
+        with self.assertRaises(ValidationError):
+            item.full_clean()
+        with self.assertRaises(ValueError):
+            item.save()
+
+
+class MenuListViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = MenuCategory.objects.create(name="Mains", slug="mains")
+        self.satay = MenuItem.objects.create(
+            category=self.category, name="Satay", slug="satay", price=Decimal("8.00"), allergens="nuts, soy"
+        )
+        self.risotto = MenuItem.objects.create(
+            category=self.category, name="Risotto", slug="risotto", price=Decimal("12.00"), allergens="dairy"
+        )
+        self.salad = MenuItem.objects.create(
+            category=self.category, name="Salad", slug="salad", price=Decimal("6.00"), allergens="none"
+        )
+        MenuItem.objects.create(
+            category=self.category, name="Old Special", slug="old-special", price=Decimal("5.00"), is_active=False
+        )
+        self.url = reverse("menu:menu_list")
+
+    def test_only_active_items_are_listed(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, "Satay")
+        self.assertContains(response, "Salad")
+        self.assertNotContains(response, "Old Special")
+
+    def test_cache_hit_runs_no_queries(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, "Risotto")
+
+    def test_menu_edits_invalidate_the_cached_page(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.risotto.name = "Mushroom Risotto"
+            self.risotto.save()
+        self.assertContains(self.client.get(self.url), "Mushroom Risotto")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.satay.is_active = False
+            self.satay.save()
+        self.assertNotContains(self.client.get(self.url), "Satay")
+
+    def test_free_from_filter(self):
+        response = self.client.get(self.url, {"free_from": ["nuts", "dairy"]})
+        self.assertContains(response, "Salad")
+        self.assertNotContains(response, "Satay")
+        self.assertNotContains(response, "Risotto")
+        # Unknown allergens filter nothing out
+        self.assertContains(self.client.get(self.url, {"free_from": "gluten"}), "Satay")
+
+    def test_repeat_visits_are_not_modified_until_the_menu_changes(self):
+        response = self.client.get(self.url)
+        self.assertIn("public", response["Cache-Control"])
+        with self.assertNumQueries(0):
+            again = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+        # Each filter is its own page
+        filtered = self.client.get(self.url, {"free_from": "nuts"}, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(filtered.status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salad.price = Decimal("6.50")
+            self.salad.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
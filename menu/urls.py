@@ -5,5 +5,7 @@ app_name = 'menu'
 
 urlpatterns = [
     path('', views.MenuListView.as_view(), name='menu_list'),
+    path('search/', views.SearchView.as_view(), name='search'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
     path('<slug:slug>/', views.MenuItemDetailView.as_view(), name='menu_item_detail'),
 ]
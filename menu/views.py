@@ -1,49 +1,103 @@
-from django.views.generic import ListView, DetailView
-from .models import MenuCategory, MenuItem
+from django.db.models import Prefetch
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.utils.text import slugify
+from django.views.generic import DetailView, TemplateView
 
+from perf.budgets import query_budget
+from yourtable import caching
+from yourtable.mixins import ConditionalGetMixin
+from . import search
+from .models import Allergen, MenuCategory, MenuItem
 
-class MenuListView(ListView):
+
+class MenuListView(ConditionalGetMixin, TemplateView):
     """
-    Display all menu categories and their associated items.
-    Each menu item includes parsed allergy information.
+    Display all menu categories and their active items.
+
+    The menu is rendered once into a fragment that stays cached until a
+    category, item or allergen changes, so a cached page runs no queries.
+    The fragment's cache key doubles as the page's ETag, so repeat visitors
+    get a 304 without anything being rendered.
+    `?free_from=nuts&free_from=dairy` leaves out items with those allergens,
+    using the indexed allergen join rather than string matching.
     """
     template_name = 'menu/menu_list.html'
-    context_object_name = 'categories'
+    fragment_template_name = 'menu/_menu_body.html'
+    query_budget = {'GET': 6}
+    max_filters = 10
 
-    def get_queryset(self):
-        return MenuCategory.objects.prefetch_related('items').all()
+    def get_free_from(self):
+        slugs = {slugify(value) for value in self.request.GET.getlist('free_from')[:self.max_filters]}
+        return sorted(slugs - {''})
+
+    def get_content_version(self):
+        return caching.make_key('menu-list', *self.get_free_from(), tags=['menu'])
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-
-            # Parse allergens for each menu item
-        for cat in ctx.get('categories', []):
-            for item in getattr(cat, 'items', []).all():
-                raw = (getattr(item, 'allergens', '') or '').strip()
-                if not raw or raw.lower() == 'none':
-                    item.allergens_list = []
-                else:
-                    item.allergens_list = [p.strip() for p in raw.split(',') if p.strip()]
-
+        free_from = self.get_free_from()
+        html = caching.get_or_set(
+            'menu-list', lambda: self.render_menu(free_from), *free_from, tags=['menu']
+        )
+        ctx['menu_html'] = mark_safe(html)
         return ctx
 
+    def render_menu(self, free_from):
+        items = MenuItem.objects.filter(is_active=True).prefetch_related('allergen_tags').order_by('id')
+        if free_from:
+            items = items.exclude(allergen_tags__slug__in=free_from)
+        categories = MenuCategory.objects.prefetch_related(
+            Prefetch('items', queryset=items, to_attr='active_items')
+        ).order_by('id')
+        return render_to_string(self.fragment_template_name, {
+            'categories': categories,
+            'allergens': Allergen.objects.all(),
+            'free_from': free_from,
+        })
+
 
 class MenuItemDetailView(DetailView):
     """
     Display details for a single menu item, including allergy information.
     """
-    model = MenuItem
+    queryset = MenuItem.objects.select_related('category').prefetch_related('allergen_tags')
     template_name = 'menu/menu_item_detail.html'
+    query_budget = {'GET': 4}
     context_object_name = "item"
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        allergens = (self.object.allergens or '').strip()
+        ctx['allergens'] = self.object.allergens_list
+        ctx['allergy_note'] = ', '.join(ctx['allergens']) or None
+        return ctx
 
-        if allergens.lower() in ('none', ''):
-            ctx['allergy_note'] = None
-        else:
-            ctx['allergy_note'] = allergens
 
+class SearchView(TemplateView):
+    """
+    Search active menu items and restaurants by name, description, category
+    and allergens, best matches first.
+    """
+    template_name = 'menu/search.html'
+    query_budget = {'GET': 3}
+    max_results = 50
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        ctx['query'] = query
+        ctx['results'] = search.search(query, limit=self.max_results) if query else []
         return ctx
 
+
+@query_budget({'GET': 1})
+def search_suggest(request):
+    """Typeahead suggestions for a partial query, as JSON, answered from the search index alone."""
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), 20)
+    except ValueError:
+        limit = 8
+    query = request.GET.get('q', '').strip()
+    results = search.suggest(query, limit=limit) if query else []
+    return JsonResponse({'query': query, 'results': results})
@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from . import profiling
+from .models import RequestProfile
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """
+    Recent on-demand profiles (perf.profiling). They are made by requesting a
+    page with a profiling token, never from here; the changelist shows a
+    fresh token for the current user.
+    """
+    list_display = ("created_at", "method", "path", "view_name", "status_code", "duration", "mode", "user", "download")
+    list_filter = ("mode", "view_name")
+    search_fields = ("path", "view_name")
+    readonly_fields = ("created_at", "user", "method", "path", "view_name", "status_code", "duration_ms", "mode", "download", "summary_text")
+    exclude = ("filename", "summary")
+    list_select_related = ("user",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Duration", ordering="duration_ms")
+    def duration(self, obj):
+        return f"{obj.duration_ms:.0f} ms"
+
+    @admin.display(description="File")
+    def download(self, obj):
+        url = reverse("admin:perf_requestprofile_download", args=[obj.pk])
+        return format_html('<a href="{}">{}</a>', url, obj.filename)
+
+    @admin.display(description="Summary")
+    def summary_text(self, obj):
+        return format_html('<pre style="white-space: pre; overflow-x: auto;">{}</pre>', obj.summary)
+
+    def get_urls(self):
+        urls = [
+            path("<int:pk>/download/", self.admin_site.admin_view(self.download_view), name="perf_requestprofile_download"),
+        ]
+        return urls + super().get_urls()
+
+    def download_view(self, request, pk):
+        if not self.has_view_permission(request):
+            raise Http404
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        if not profile.path_on_disk.exists():
+            raise Http404("The profile file has been removed")
+        return FileResponse(profile.path_on_disk.open("rb"), as_attachment=True, filename=profile.filename)
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {**(extra_context or {}), "title": "Request profiles"}
+        token = profiling.make_token(request.user)
+        self.message_user(
+            request,
+            format_html(
+                "Profile a page by adding <code>?{}={}</code> to its URL (valid for {} minutes); "
+                "add <code>&amp;{}=sample</code> for stack samples.",
+                profiling.TOKEN_PARAM, token, settings.PERF_PROFILE_TOKEN_MAX_AGE // 60, profiling.MODE_PARAM,
+            ),
+        )
+        return super().changelist_view(request, extra_context)
@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class PerfConfig(AppConfig):
+    """
+    Configuration for the perf app (query plans, budgets and other performance tooling).
+    """
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'perf'
+
+    def ready(self):
+        # Time template rendering and Cloudinary URLs for Server-Timing (see perf/timing.py)
+        from perf import timing
+        timing.instrument()
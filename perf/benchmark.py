@@ -0,0 +1,218 @@
+"""HTTP benchmarks of the main pages (`manage.py benchmark`).
+
+Each route in ROUTES is requested a number of times, after a few warm-up
+requests, and reported as p50/p95/p99 and mean latency, requests per second
+and SQL statements per request. Public pages are requested anonymously,
+the others as the user with the most bookings (the heaviest case), so run
+it against a database loaded with `manage.py generate_scale_data`.
+
+Two targets give the same report:
+
+* InProcessTarget sends requests through Django's test client, with no
+  network or server in the way. It is good for comparing code changes.
+* HttpTarget sends real HTTP requests to a running server, such as a local
+  gunicorn started by the command. It can use several threads at once.
+
+Query counts come from the Server-Timing header that
+perf.timing.RequestTimingMiddleware adds; both targets send a timing token
+to get it, so they count the same way. With PERF_TIMING off the count is
+null.
+
+Reports are JSON. compare() checks a report against a baseline, so a
+deploy can be stopped when a route got slower or runs more queries.
+"""
+import re
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from bookings.models import Booking
+from menu.models import MenuItem
+from perf import timing
+
+
+# (report key, URL name, needs a login)
+ROUTES = [
+    ('home', 'home', False),
+    ('menu_list', 'menu:menu_list', False),
+    ('menu_item_detail', 'menu:menu_item_detail', False),
+    ('review_list', 'reviews:review_list', False),
+    ('login', 'account_login', False),
+    ('booking_list', 'bookings:booking_list', True),
+    ('booking_detail', 'bookings:booking_detail', True),
+    ('booking_create', 'bookings:booking_create', True),
+    ('profile', 'users:profile', True),
+]
+PERCENTILES = (50, 95, 99)
+QUERIES_RE = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def benchmark_user(username=None):
+    """The named user, or the one with the most active bookings."""
+    User = get_user_model()
+    if username:
+        return User.objects.filter(username=username).first()
+    busiest = Booking.objects.values('user').annotate(bookings=Count('pk')).order_by('-bookings', 'user')[:1]
+    return User.objects.filter(pk__in=busiest.values('user')).first()
+
+
+def route_paths(user):
+    """
+    {key: (path, login)} for every route that can be benchmarked with
+    `user` (None: public pages only). Public pages are requested anonymously.
+    """
+    item = MenuItem.objects.filter(is_active=True).order_by('pk').only('slug').first()
+    booking = Booking.objects.filter(user=user).order_by('-date').first() if user else None
+    kwargs = {
+        'menu_item_detail': {'slug': item.slug} if item else None,
+        'booking_detail': {'pk': booking.pk} if booking else None,
+    }
+    paths = {}
+    for key, url_name, login in ROUTES:
+        if (login and user is None) or (key in kwargs and kwargs[key] is None):
+            continue
+        paths[key] = (reverse(url_name, kwargs=kwargs.get(key)), login)
+    return paths
+
+
+def queries(server_timing):
+    match = QUERIES_RE.search(server_timing or '')
+    return int(match.group(1)) if match else None
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of `values`."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[rank - 1]
+
+
+class InProcessTarget:
+    name = 'in-process'
+    max_concurrency = 1
+
+    def __init__(self, user=None):
+        headers = {'X-Server-Timing': timing.make_token()}
+        self.anonymous = Client(headers=headers)
+        self.client = Client(headers=headers)
+        if user is not None:
+            self.client.force_login(user)
+
+    def get(self, path, login=False):
+        """(status, seconds, queries) of one GET, as the user or anonymously."""
+        client = self.client if login else self.anonymous
+        started = time.perf_counter()
+        response = client.get(path)
+        return response.status_code, time.perf_counter() - started, queries(response.get('Server-Timing'))
+
+
+class HttpTarget:
+    max_concurrency = None
+
+    def __init__(self, base_url, user=None, timeout=30):
+        self.name = self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.timing_token = timing.make_token()
+        self.cookies = {}
+        self.local = threading.local()
+        self.login_client = None
+        if user is not None:
+            # A session the server finds in the shared database
+            self.login_client = Client()
+            self.login_client.force_login(user)
+            self.cookies = {settings.SESSION_COOKIE_NAME: self.login_client.cookies[settings.SESSION_COOKIE_NAME].value}
+
+    def get(self, path, login=False):
+        # One connection pool per thread and kind of visitor
+        sessions = getattr(self.local, 'sessions', None)
+        if sessions is None:
+            sessions = self.local.sessions = {False: requests.Session(), True: requests.Session()}
+            for session in sessions.values():
+                session.headers['X-Server-Timing'] = self.timing_token
+            sessions[True].cookies.update(self.cookies)
+        session = sessions[login]
+        started = time.perf_counter()
+        response = session.get(self.base_url + path, timeout=self.timeout, allow_redirects=False)
+        return response.status_code, time.perf_counter() - started, queries(response.headers.get('Server-Timing'))
+
+    def close(self):
+        if self.login_client is not None:
+            self.login_client.logout()
+
+
+def measure(target, path, login=False, count=100, concurrency=1, warmup=5):
+    """Benchmark one path; returns its report entry."""
+    for _ in range(warmup):
+        target.get(path, login)
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(lambda _: target.get(path, login), range(count)))
+    else:
+        results = [target.get(path, login) for _ in range(count)]
+    elapsed = time.perf_counter() - started
+
+    latencies = [seconds * 1000 for _status, seconds, _queries in results]
+    counts = [number for _status, _seconds, number in results if number is not None]
+    statuses = {}
+    for status, _seconds, _queries in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    entry = {'path': path, 'login': login, 'requests': count, 'statuses': statuses}
+    entry.update({f'p{percent}_ms': round(percentile(latencies, percent), 3) for percent in PERCENTILES})
+    entry['mean_ms'] = round(statistics.fmean(latencies), 3)
+    entry['rps'] = round(count / elapsed, 1) if elapsed else None
+    entry['queries'] = max(counts) if counts else None
+    return entry
+
+
+def run(target, paths, count=100, concurrency=1, warmup=5, log=None):
+    """Benchmark every route in `paths` ({key: (path, login)}); returns the JSON-ready report."""
+    if target.max_concurrency and concurrency > target.max_concurrency:
+        raise ValueError(f'{target.name} runs at most {target.max_concurrency} request(s) at a time')
+    report = {
+        'meta': {
+            'target': target.name,
+            'started': timezone.now().isoformat(),
+            'requests': count,
+            'concurrency': concurrency,
+            'warmup': warmup,
+        },
+        'routes': {},
+    }
+    for key, (path, login) in paths.items():
+        report['routes'][key] = entry = measure(target, path, login, count, concurrency, warmup)
+        if log:
+            log(key, entry)
+    return report
+
+
+def compare(baseline, current, max_regression=10.0):
+    """
+    Compare two reports route by route. Returns (rows, regressions): rows
+    are (key, metric, old, new, percent change) for p95 and queries;
+    regressions are the rows where p95 grew by more than `max_regression`
+    percent or the query count went up.
+    """
+    rows, regressions = [], []
+    for key, new in current['routes'].items():
+        old = baseline['routes'].get(key)
+        if old is None:
+            continue
+        for metric in ('p95_ms', 'queries'):
+            if old.get(metric) is None or new.get(metric) is None:
+                continue
+            change = (new[metric] - old[metric]) * 100 / old[metric] if old[metric] else 0.0
+            row = (key, metric, old[metric], new[metric], change)
+            rows.append(row)
+            if (metric == 'p95_ms' and change > max_regression) or (metric == 'queries' and new[metric] > old[metric]):
+                regressions.append(row)
+    return rows, regressions
@@ -0,0 +1,166 @@
+"""Per-view query budgets and N+1 detection.
+
+A view declares how many SQL statements one request may run:
+
+    @query_budget(6)
+    def profile_view(request): ...
+
+    class BookingListView(ListView):
+        query_budget = {'GET': 4}
+
+A budget is either a number for every method or a dict keyed by method;
+methods left out of the dict are not checked.
+
+QueryBudgetMiddleware records every statement of the request. When the
+request goes over its budget, or the same statement (ignoring parameter
+values and IN-list lengths) runs N+1 times, it logs a warning to
+`perf.budgets`. In tests, QueryBudgetTestMixin.assertWithinBudget() turns
+those findings into failures.
+
+Recording is enabled by PERF_QUERY_BUDGETS (defaults to DEBUG).
+Transaction control statements such as SAVEPOINT are not counted.
+"""
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_LIST = re.compile(r'\((?:%s, )*%s\)')
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+UNCOUNTED = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT', 'BEGIN', 'COMMIT', 'ROLLBACK')
+
+
+def query_budget(limit):
+    """Declare the query budget of a function view."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def budget_for(view_func, method):
+    """Return the budget a resolved view function declares for `method`, or None."""
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None:
+        budget = getattr(getattr(view_func, 'view_class', None), 'query_budget', None)
+    if isinstance(budget, dict):
+        return budget.get(method)
+    return budget
+
+
+def normalize(sql):
+    """Reduce a statement to its shape, so N+1 repeats compare equal."""
+    return LITERAL.sub('?', PLACEHOLDER_LIST.sub('(...)', sql))
+
+
+class QueryReport:
+    """The statements one request ran, checked against its budget."""
+
+    def __init__(self, budget=None, threshold=None):
+        self.budget = budget
+        self.threshold = threshold or getattr(settings, 'PERF_NPLUSONE_THRESHOLD', 3)
+        self.statements = []
+
+    def record(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(UNCOUNTED):
+            self.statements.append(sql)
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.count > self.budget
+
+    def repeated(self):
+        """Return [(statement, times)] for statements run `threshold` or more times."""
+        counts = Counter(normalize(sql) for sql in self.statements)
+        return [(sql, n) for sql, n in counts.most_common() if n >= self.threshold]
+
+    def problems(self):
+        found = []
+        if self.over_budget:
+            found.append(f'{self.count} queries, budget {self.budget}')
+        found.extend(f'N+1: {n} x {sql[:200]}' for sql, n in self.repeated())
+        return found
+
+
+class recording:
+    """Context manager that records statements on every database connection into `report`."""
+
+    def __init__(self, report):
+        self.report = report
+        self._stack = ExitStack()
+
+    def __enter__(self):
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self.report.record))
+        return self.report
+
+    def __exit__(self, *exc_info):
+        return self._stack.__exit__(*exc_info)
+
+
+class QueryBudgetMiddleware:
+    """Record each request's SQL and report budget overruns and N+1 patterns."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'PERF_QUERY_BUDGETS', settings.DEBUG):
+            return self.get_response(request)
+        report = request.query_report = QueryReport()
+        with recording(report):
+            response = self.get_response(request)
+        problems = report.problems()
+        if problems:
+            logger.warning('%s %s: %s', request.method, request.path, '; '.join(problems))
+        response['X-Query-Count'] = str(report.count)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        report = getattr(request, 'query_report', None)
+        if report is not None:
+            report.budget = budget_for(view_func, request.method)
+
+
+class QueryBudgetTestMixin:
+    """
+    TestCase mixin that records queries for client requests and checks budgets.
+
+        response = self.client.get(url)
+        self.assertWithinBudget(response)
+    """
+
+    def setUp(self):
+        super().setUp()
+        from django.test import override_settings
+
+        override = override_settings(PERF_QUERY_BUDGETS=True)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def assertWithinBudget(self, response, budget=None):
+        """Fail if the request behind `response` exceeded its budget or ran an N+1."""
+        report = getattr(response.wsgi_request, 'query_report', None)
+        if report is None:
+            self.fail('No query report; is perf.budgets.QueryBudgetMiddleware installed?')
+        if budget is not None:
+            report.budget = budget
+        if report.budget is None:
+            self.fail(f'{response.wsgi_request.path} declares no query budget')
+        problems = report.problems()
+        if problems:
+            self.fail(
+                f'{response.wsgi_request.path}: ' + '; '.join(problems)
+                + '\n' + '\n'.join(f'  {sql}' for sql in report.statements)
+            )
@@ -0,0 +1,267 @@
+"""Record production traffic and replay it locally (`manage.py replay_traffic`).
+
+With PERF_CAPTURE on, TrafficCaptureMiddleware writes one JSON line per
+request (or per PERF_CAPTURE_SAMPLE_RATE of them) to
+PERF_CAPTURE_DIR/traffic-<pid>.jsonl, rotated at PERF_CAPTURE_MAX_BYTES
+with PERF_CAPTURE_BACKUPS old files kept. Each gunicorn worker writes
+its own file, so workers never rotate a file under each other:
+
+    {"ts": "2026-10-18T12:00:00.123456+00:00", "method": "GET",
+     "route": "bookings:booking_detail", "kwargs": {"pk": 42},
+     "query": {"page": ["2"]}, "form": [], "auth": "user",
+     "status": 200, "duration_ms": 12.4, "queries": 5}
+
+Only metadata is kept, with these limits:
+- No paths, cookies or user ids are written. Requests that resolve to no
+  route, such as static files, are not recorded. Page cache hits are
+  recorded under the route of the page.
+- Query parameters whose names look secret are dropped. Of the rest, only
+  the site's own paging and filter parameters (KEPT_PARAMS) are kept as
+  sent; free text such as a search query `q` is replaced by a keyed hash,
+  so repeats of one value still replay as repeats without revealing it.
+- URL arguments are kept when they are integers, such as primary keys, or
+  public slugs (KEPT_KWARGS). Others, such as the keys in allauth's email
+  confirmation and password reset links, are hashed the same way.
+- For form posts only the field names are kept.
+- auth is 'anonymous', 'user' or 'staff'.
+
+replay() plays a log back against a running instance, keeping the
+recorded gaps between requests, divided by `speed`. Up to `concurrency`
+requests are in flight at once. Only GET and HEAD requests are replayed,
+as GETs. Each auth class is sent with its own session: the busiest user
+for 'user' and a staff member for 'staff'. URL arguments are replayed as
+recorded, so pages for objects missing locally, or reached through a
+hashed key, answer 404, which shows in the statuses.
+
+The report compares replayed and recorded latency per route (drift). It
+also gives how far the replay fell behind the recorded schedule (lag);
+a large lag means the concurrency was too low for the speed.
+"""
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import NoReverseMatch, Resolver404, resolve, reverse
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from perf.benchmark import percentile
+
+
+SECRET_PARAM_RE = re.compile(r'pass|token|secret|key|csrf|sig|code|email|_profile', re.IGNORECASE)
+REPLAYED_METHODS = ('GET', 'HEAD')
+# Parameters whose values are structural rather than typed by the visitor
+KEPT_PARAMS = frozenset({'page', 'cursor', 'bookings_cursor', 'history_cursor', 'format', 'free_from', 'limit'})
+# Non-integer URL arguments that name public pages rather than carry a token
+KEPT_KWARGS = frozenset({'slug'})
+
+
+def capture_dir():
+    path = Path(settings.PERF_CAPTURE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def auth_class(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return 'anonymous'
+    return 'staff' if user.is_staff else 'user'
+
+
+def redacted(value):
+    return 'h-' + salted_hmac('perf.capture', value).hexdigest()[:16]
+
+
+def sanitized_query(query_dict):
+    return {
+        key: query_dict.getlist(key) if key in KEPT_PARAMS else [redacted(value) for value in query_dict.getlist(key)]
+        for key in sorted(query_dict) if not SECRET_PARAM_RE.search(key)
+    }
+
+
+def sanitized_kwargs(kwargs):
+    return {
+        key: value if isinstance(value, int) or key in KEPT_KWARGS else redacted(str(value))
+        for key, value in sorted(kwargs.items())
+    }
+
+
+class TrafficCaptureMiddleware:
+    """Append sanitized metadata about each request to a rotating JSONL log."""
+
+    def __init__(self, get_response):
+        if not settings.PERF_CAPTURE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        handler = RotatingFileHandler(
+            capture_dir() / f'traffic-{os.getpid()}.jsonl',
+            maxBytes=settings.PERF_CAPTURE_MAX_BYTES, backupCount=settings.PERF_CAPTURE_BACKUPS,
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        # Not registered with logging, so nothing propagates to the site's loggers
+        self.logger = logging.Logger('perf.capture')
+        self.logger.addHandler(handler)
+
+    def __call__(self, request):
+        if random.random() >= settings.PERF_CAPTURE_SAMPLE_RATE:
+            return self.get_response(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            # Answered before URL resolution, e.g. by the page cache
+            try:
+                match = resolve(request.path_info)
+            except Resolver404:
+                return response
+        if match.view_name:
+            self.logger.info(json.dumps(self.entry(request, response, match, duration), separators=(',', ':'), default=str))
+        return response
+
+    def entry(self, request, response, match, duration):
+        form = sorted(request.POST) if request.method == 'POST' else []
+        timings = getattr(request, 'perf_timings', None)
+        return {
+            'ts': timezone.now().isoformat(),
+            'method': request.method,
+            'route': match.view_name,
+            'kwargs': sanitized_kwargs(match.kwargs),
+            'query': sanitized_query(request.GET),
+            'form': form,
+            'auth': auth_class(request),
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'queries': timings.calls('db') if timings is not None else None,
+        }
+
+
+def log_files(directory=None):
+    """Every capture log in `directory` (default PERF_CAPTURE_DIR), rotated ones included."""
+    directory = Path(directory or settings.PERF_CAPTURE_DIR)
+    return sorted(directory.glob('traffic-*.jsonl*')) if directory.is_dir() else []
+
+
+def read_log(paths):
+    """Entries from the given log files in time order; unreadable lines are skipped."""
+    entries = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    entry['at'] = datetime.fromisoformat(entry['ts']).timestamp()
+                except (ValueError, KeyError, TypeError):
+                    continue
+                entries.append(entry)
+    entries.sort(key=lambda entry: entry['at'])
+    return entries
+
+
+def entry_path(entry):
+    path = reverse(entry['route'], kwargs=entry.get('kwargs') or None)
+    query = urlencode(entry.get('query') or {}, doseq=True)
+    return f'{path}?{query}' if query else path
+
+
+def replay(entries, targets, speed=1.0, concurrency=4, log=None):
+    """
+    Play `entries` (from read_log) against `targets`, {auth class: (target,
+    login)} with perf.benchmark targets, and return the JSON-ready report.
+    `speed` divides the recorded gaps; 0 sends requests as fast as
+    `concurrency` allows.
+    """
+    skipped = {}
+    plan = []
+    for entry in entries:
+        reason = None
+        if entry.get('method') not in REPLAYED_METHODS:
+            reason = f"method {entry.get('method')}"
+        elif entry.get('auth') not in targets:
+            reason = f"no {entry.get('auth')} session"
+        else:
+            try:
+                plan.append((entry, entry_path(entry)))
+            except NoReverseMatch:
+                reason = 'unknown route'
+        if reason:
+            skipped[reason] = skipped.get(reason, 0) + 1
+
+    results = []
+    lock = threading.Lock()
+    first = plan[0][0]['at'] if plan else 0
+    started = time.monotonic()
+
+    def play(entry, path, due):
+        lag = time.monotonic() - started - due
+        target, login = targets[entry['auth']]
+        status, seconds, count = target.get(path, login)
+        with lock:
+            results.append((entry, status, seconds * 1000, count, lag * 1000))
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        futures = []
+        for entry, path in plan:
+            due = (entry['at'] - first) / speed if speed else 0
+            wait = due - (time.monotonic() - started)
+            if wait > 0:
+                time.sleep(wait)
+            futures.append(pool.submit(play, entry, path, due))
+        for future in futures:
+            future.result()
+    elapsed = time.monotonic() - started
+
+    by_route = {}
+    for entry, status, ms, count, lag in results:
+        by_route.setdefault(entry['route'], []).append((entry, status, ms, count))
+    routes = {}
+    for route, rows in sorted(by_route.items()):
+        recorded = [entry['duration_ms'] for entry, _status, _ms, _count in rows]
+        replayed = [ms for _entry, _status, ms, _count in rows]
+        statuses = {}
+        for _entry, status, _ms, _count in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        routes[route] = item = {'requests': len(rows), 'statuses': statuses}
+        for percent in (50, 95):
+            old, new = percentile(recorded, percent), percentile(replayed, percent)
+            item[f'recorded_p{percent}_ms'] = round(old, 3)
+            item[f'replayed_p{percent}_ms'] = round(new, 3)
+            item[f'drift_p{percent}_pct'] = round((new - old) * 100 / old, 1) if old else None
+        recorded_queries = [entry['queries'] for entry, _status, _ms, _count in rows if entry.get('queries') is not None]
+        replayed_queries = [count for _entry, _status, _ms, count in rows if count is not None]
+        item['recorded_queries'] = max(recorded_queries) if recorded_queries else None
+        item['replayed_queries'] = max(replayed_queries) if replayed_queries else None
+        if log:
+            log(route, item)
+
+    lags = [lag for *_rest, lag in results]
+    recorded_span = (plan[-1][0]['at'] - first) if plan else 0
+    return {
+        'meta': {
+            'started': timezone.now().isoformat(),
+            'speed': speed,
+            'concurrency': concurrency,
+            'replayed': len(results),
+            'skipped': skipped,
+            'recorded_seconds': round(recorded_span, 3),
+            'replay_seconds': round(elapsed, 3),
+            'lag_p95_ms': round(percentile(lags, 95), 3) if lags else None,
+            'mean_drift_ms': round(statistics.fmean(
+                ms - entry['duration_ms'] for entry, _status, ms, _count, _lag in results
+            ), 3) if results else None,
+        },
+        'routes': routes,
+    }
@@ -0,0 +1,87 @@
+"""Capture the SELECTs a piece of code runs and check their query plans.
+
+Used by `manage.py index_advisor`. On SQLite the plan comes from EXPLAIN
+QUERY PLAN; a step reading `SCAN <table>` without an index is a full table
+scan. On PostgreSQL the plan comes from EXPLAIN with sequential scans
+disabled for the transaction, so a `Seq Scan` that survives means no index
+can serve the query at all (small tables are otherwise always seq-scanned).
+Sorts that no index provides are reported too.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connection as default_connection, transaction
+
+
+SQLITE_SCAN = re.compile(r'^SCAN (\S+)(?:\s+AS \S+)?$')
+SQLITE_SORT = re.compile(r'^USE TEMP B-TREE FOR (?:(?:RIGHT PART OF |LAST TERM OF )?ORDER BY)')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\S+)')
+POSTGRES_SORT = re.compile(r'^(?:->\s+)?Sort\s+\(')
+
+
+@contextmanager
+def capture_selects(connection=default_connection):
+    """Collect (sql, params) for every SELECT run while the block is active."""
+    queries = []
+
+    def wrapper(execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT') and not many:
+            queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield queries
+
+
+def explain(sql, params, connection=default_connection):
+    """Return the query plan of `sql` as a list of text lines."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+        with transaction.atomic(using=connection.alias):
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}', params)
+            return [row[0] for row in cursor.fetchall()]
+
+
+def problems(plan, vendor):
+    """Return the full table scans and index-less sorts found in `plan`."""
+    found = []
+    for line in plan:
+        step = line.strip()
+        if vendor == 'sqlite':
+            scan = SQLITE_SCAN.match(step)
+            if scan:
+                found.append(f'full scan of {scan.group(1)}')
+            elif SQLITE_SORT.match(step):
+                found.append('sort without an index')
+        else:
+            scan = POSTGRES_SCAN.search(step)
+            if scan:
+                found.append(f'full scan of {scan.group(1)}')
+            elif POSTGRES_SORT.search(step):
+                found.append('sort without an index')
+    return found
+
+
+def check(queries, connection=default_connection, ignore_tables=()):
+    """
+    Explain each distinct query and return a list of (sql, plan, problems).
+
+    Problems on tables in `ignore_tables` (e.g. tiny lookup tables) are dropped.
+    """
+    results = []
+    seen = set()
+    for sql, params in queries:
+        if sql in seen:
+            continue
+        seen.add(sql)
+        plan = explain(sql, params, connection)
+        issues = [
+            issue for issue in problems(plan, connection.vendor)
+            if not any(issue.endswith(f' {table}') or issue.endswith(f' "{table}"') for table in ignore_tables)
+        ]
+        results.append((sql, plan, issues))
+    return results
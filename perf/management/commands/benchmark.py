@@ -0,0 +1,158 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from perf.benchmark import HttpTarget, InProcessTarget, benchmark_user, compare, route_paths, run
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark the main pages in-process or over HTTP and report p50/p95/p99 latency, throughput and queries per route as JSON"
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group()
+        target.add_argument("--url", help="Benchmark a running server at this base URL instead of in-process")
+        target.add_argument("--gunicorn", action="store_true", help="Start a local gunicorn on a free port and benchmark it")
+        parser.add_argument("--workers", type=int, default=2, help="gunicorn workers with --gunicorn (default: 2)")
+        parser.add_argument("--requests", type=int, default=100, help="Measured requests per route (default: 100)")
+        parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per route first (default: 5)")
+        parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight at once, over HTTP only (default: 1)")
+        parser.add_argument("--user", help="Username for the pages behind a login (default: the user with the most bookings)")
+        parser.add_argument("--route", action="append", dest="routes", help="Only this route; may be repeated")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of standard output")
+        parser.add_argument("--compare", help="Compare with this earlier JSON report")
+        parser.add_argument("--max-regression", type=float, default=10.0, help="With --compare, fail if a route's p95 grew by more than this percent (default: 10)")
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1:
+            raise CommandError("--requests must be at least 1")
+        if options["concurrency"] > 1 and not (options["url"] or options["gunicorn"]):
+            raise CommandError("--concurrency needs --url or --gunicorn; the in-process client runs one request at a time")
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+
+        user = benchmark_user(options["user"])
+        if options["user"] and user is None:
+            raise CommandError(f"No user named {options['user']!r}")
+        if user is None:
+            self.stderr.write(self.style.WARNING("No bookings; benchmarking the public pages only. Load data with generate_scale_data."))
+        paths = route_paths(user)
+        if options["routes"]:
+            unknown = set(options["routes"]) - set(paths)
+            if unknown:
+                raise CommandError(f"Unknown or unavailable routes: {', '.join(sorted(unknown))}. Available: {', '.join(paths)}")
+            paths = {key: path for key, path in paths.items() if key in options["routes"]}
+
+        run_options = {"count": options["requests"], "concurrency": options["concurrency"], "warmup": options["warmup"], "log": self._log}
+        self.stderr.write(f"{'route':<18}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'queries':>9}  statuses")
+        if options["url"]:
+            report = self._over_http(options["url"], user, paths, run_options)
+        elif options["gunicorn"]:
+            with self._gunicorn(options["workers"]) as url:
+                report = self._over_http(url, user, paths, run_options)
+            report["meta"]["workers"] = options["workers"]
+        else:
+            # Logging in writes a session row; keep the database as it was
+            try:
+                with transaction.atomic(), override_settings(ALLOWED_HOSTS=["testserver"]):
+                    report = run(InProcessTarget(user), paths, **run_options)
+                    raise Rollback
+            except Rollback:
+                pass
+
+        report["meta"].update({
+            "user": user.username if user else None,
+            "database": connection.vendor,
+            "revision": self._revision(),
+            "settings": {name: getattr(settings, name) for name in ("PAGE_CACHE", "TEMPLATE_CACHE", "FRAGMENT_CACHE", "PERF_TIMING")},
+        })
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            self._compare(baseline, report, options["max_regression"])
+
+    def _log(self, key, entry):
+        statuses = " ".join(f"{status}x{count}" for status, count in sorted(entry["statuses"].items()))
+        queries = entry["queries"] if entry["queries"] is not None else "-"
+        self.stderr.write(
+            f"{key:<18}{entry['p50_ms']:>9.2f}{entry['p95_ms']:>9.2f}{entry['p99_ms']:>9.2f}{entry['rps']:>9.1f}{queries:>9}  {statuses}"
+        )
+
+    def _over_http(self, url, user, paths, run_options):
+        target = HttpTarget(url, user)
+        try:
+            return run(target, paths, **run_options)
+        except requests.RequestException as exc:
+            raise CommandError(f"Request to {url} failed: {exc}")
+        finally:
+            target.close()
+
+    @contextmanager
+    def _gunicorn(self, workers):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        process = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "yourtable.wsgi", "--bind", f"127.0.0.1:{port}",
+             "--workers", str(workers), "--log-level", "warning"],
+            cwd=settings.BASE_DIR, env=os.environ.copy(),
+        )
+        url = f"http://127.0.0.1:{port}"
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                if process.poll() is not None:
+                    raise CommandError(f"gunicorn exited with status {process.returncode}")
+                try:
+                    requests.get(url + "/", timeout=(1, 30))
+                    break
+                except requests.ConnectionError:
+                    if time.monotonic() > deadline:
+                        raise CommandError("gunicorn did not start within 30 seconds")
+                    time.sleep(0.2)
+            self.stderr.write(f"gunicorn with {workers} workers on {url}")
+            yield url
+        finally:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def _revision(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _compare(self, baseline, report, max_regression):
+        rows, regressions = compare(baseline, report, max_regression)
+        self.stderr.write(f"\nCompared with {baseline['meta'].get('revision') or 'the baseline'} ({baseline['meta'].get('started', '?')})")
+        for key, metric, old, new, change in rows:
+            line = f"{key:<18}{metric:<9}{old:>10}{new:>10}{change:>+9.1f}%"
+            self.stderr.write(self.style.ERROR(line) if (key, metric, old, new, change) in regressions else line)
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s) beyond {max_regression}% p95 or in query counts")
@@ -0,0 +1,49 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from perf.scaledata import DEFAULT_COUNTS, PASSWORD, generate
+
+
+class Command(BaseCommand):
+    help = "Load production-scale users, restaurants, menu items, bookings, reviews and their history for benchmarks"
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_COUNTS.items():
+            flag = name.replace("_", "-")
+            parser.add_argument(f"--{flag}", type=int, default=default, help=f"Number of {name.replace('_', ' ')} (default: {default:,})")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed, anchor and counts give the same data (default: 0)")
+        parser.add_argument("--anchor", help="Day standing in for today, as YYYY-MM-DD (default: today)")
+        parser.add_argument("--prefix", default="scale", help="Prefix for usernames and slugs (default: scale)")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk_create (default: 5000)")
+        parser.add_argument("--deleted-fraction", type=float, default=0.1, help="Share of soft-deleted bookings (default: 0.1)")
+        parser.add_argument("--updated-fraction", type=float, default=0.2, help="Share of bookings edited after creation; half as many reviews (default: 0.2)")
+
+    def handle(self, *args, **options):
+        try:
+            anchor = date.fromisoformat(options["anchor"]) if options["anchor"] else None
+        except ValueError:
+            raise CommandError(f"--anchor must be YYYY-MM-DD, not {options['anchor']!r}")
+        counts = {name: options[name] for name in DEFAULT_COUNTS}
+        if any(count < 0 for count in counts.values()):
+            raise CommandError("Counts cannot be negative")
+        if counts["bookings"] and not (counts["users"] and counts["restaurants"]):
+            raise CommandError("Bookings need at least one user and one restaurant")
+        if counts["reviews"] and not counts["users"]:
+            raise CommandError("Reviews need at least one user")
+        for name in ("deleted_fraction", "updated_fraction"):
+            if not 0 <= options[name] <= 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be between 0 and 1")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        if get_user_model().objects.filter(username__startswith=f"{options['prefix']}-user-").exists():
+            raise CommandError(f"Data with the prefix {options['prefix']!r} already exists; pick another --prefix")
+
+        totals = generate(
+            counts, seed=options["seed"], anchor=anchor, prefix=options["prefix"],
+            batch_size=options["batch_size"], deleted_fraction=options["deleted_fraction"],
+            updated_fraction=options["updated_fraction"], log=self.stdout.write,
+        )
+        rows = sum(count for label, count in totals.items() if label != "search index")
+        self.stdout.write(self.style.SUCCESS(f"Generated {rows:,} rows. Users log in with the password {PASSWORD!r}."))
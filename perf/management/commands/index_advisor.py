@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from bookings.models import Booking
+from perf.explain import capture_selects, check
+
+
+# Small lookup tables that are cheaper to scan than to index
+IGNORED_TABLES = ("django_site", "django_content_type", "menu_menucategory")
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Request the main pages, EXPLAIN every SELECT they run and flag full table scans and index-less sorts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Username to browse as (default: the user with the most bookings)")
+        parser.add_argument("--url", action="append", default=[], help="Extra path to check; may be repeated")
+        parser.add_argument("--all", action="store_true", help="Print the plan of every query, not only flagged ones")
+        parser.add_argument("--fail", action="store_true", help="Exit with an error if anything is flagged")
+
+    def handle(self, *args, **options):
+        user = self._user(options["user"])
+        flagged = 0
+        # Logging in writes a session row; keep the database as it was
+        try:
+            with transaction.atomic(), override_settings(ALLOWED_HOSTS=["testserver"]):
+                client = Client()
+                if user is not None:
+                    client.force_login(user)
+                for path in self._paths(user) + options["url"]:
+                    flagged += self._check(client, path, options["all"])
+                raise Rollback
+        except Rollback:
+            pass
+
+        if flagged:
+            message = f"{flagged} queries flagged on {connection.vendor}"
+            if options["fail"]:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"No full scans or index-less sorts on {connection.vendor}"))
+
+    def _user(self, username):
+        User = get_user_model()
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {username!r}")
+        busiest = (
+            Booking.all_objects.all_objects()
+            .order_by()
+            .values("user")
+            .annotate(n=Count("pk"))
+            .order_by("-n")
+            .values_list("user", flat=True)
+            .first()
+        )
+        return User.objects.filter(pk=busiest).first() if busiest else User.objects.first()
+
+    def _paths(self, user):
+        paths = [reverse("menu:menu_list"), reverse("reviews:review_list")]
+        if user is None:
+            return paths
+        paths += [reverse("bookings:booking_list"), reverse("users:profile")]
+        booking = Booking.all_objects.all_objects().filter(user=user).order_by("-pk").first()
+        if booking is not None:
+            paths.append(reverse("bookings:booking_detail", args=[booking.pk]))
+        return paths
+
+    def _check(self, client, path, show_all):
+        with capture_selects() as queries:
+            response = client.get(path)
+        results = check(queries, ignore_tables=IGNORED_TABLES)
+        self.stdout.write(f"GET {path} -> {response.status_code}, {len(queries)} SELECTs, {len(results)} distinct")
+        flagged = 0
+        for sql, plan, issues in results:
+            if not issues and not show_all:
+                continue
+            flagged += bool(issues)
+            label = self.style.ERROR("FLAG") if issues else "ok  "
+            self.stdout.write(f"  {label} {sql[:160]}")
+            for line in plan:
+                self.stdout.write(f"         {line}")
+            for issue in issues:
+                self.stdout.write(f"         -> {issue}")
+        return flagged
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from perf import profiling
+
+
+class Command(BaseCommand):
+    help = "Print a signed token that makes requests profiled (see perf/profiling.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="Staff user the token is made for")
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(username=options["username"]).first()
+        if user is None:
+            raise CommandError(f"No user named {options['username']!r}")
+        if not (user.is_active and user.is_staff):
+            raise CommandError(f"{user} is not an active staff user")
+        token = profiling.make_token(user)
+        minutes = settings.PERF_PROFILE_TOKEN_MAX_AGE // 60
+        self.stdout.write(token)
+        self.stderr.write(
+            f"Valid for {minutes} minutes: add ?{profiling.TOKEN_PARAM}={token} to a URL or send X-Profile: {token}; "
+            f"{profiling.MODE_PARAM}=sample or X-Profile-Mode: sample for stack samples."
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from yourtable import pagecache
+
+
+class Command(BaseCommand):
+    help = "Drop the anonymous full-page cache, or only the pages depending on the given cache tags"
+
+    def add_arguments(self, parser):
+        parser.add_argument("tags", nargs="*", help="Cache tags to purge, e.g. menu (default: every page)")
+
+    def handle(self, *args, **options):
+        tags = options["tags"] or [pagecache.PAGES_TAG]
+        pagecache.purge(*tags)
+        self.stdout.write(self.style.SUCCESS(f"Purged cached pages tagged {', '.join(tags)}"))
@@ -0,0 +1,88 @@
+import json
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from perf.benchmark import HttpTarget, benchmark_user
+from perf.capture import log_files, read_log, replay
+
+
+class Command(BaseCommand):
+    help = "Replay captured traffic against a running instance and report latency drift against the recorded timings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("logs", nargs="*", help="Capture logs to replay (default: every log in PERF_CAPTURE_DIR)")
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the instance (default: http://127.0.0.1:8000)")
+        parser.add_argument("--speed", type=float, default=1.0, help="Replay speed: 1 keeps the recorded pace, 10 is ten times faster, 0 is as fast as possible (default: 1)")
+        parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at most (default: 4)")
+        parser.add_argument("--user", help="Username for signed-in requests (default: the user with the most bookings)")
+        parser.add_argument("--staff-user", help="Username for staff requests (default: the first active staff member)")
+        parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of standard output")
+
+    def handle(self, *args, **options):
+        if options["speed"] < 0:
+            raise CommandError("--speed cannot be negative")
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1")
+        paths = options["logs"] or log_files()
+        if not paths:
+            raise CommandError("No capture logs; turn on PERF_CAPTURE or pass log files")
+        entries = read_log(paths)[:options["limit"]]
+        if not entries:
+            raise CommandError("The capture logs hold no requests")
+
+        user = benchmark_user(options["user"])
+        if options["user"] and user is None:
+            raise CommandError(f"No user named {options['user']!r}")
+        staff = get_user_model().objects.filter(is_staff=True, is_active=True)
+        staff = staff.filter(username=options["staff_user"]).first() if options["staff_user"] else staff.order_by("pk").first()
+        if options["staff_user"] and staff is None:
+            raise CommandError(f"No active staff member named {options['staff_user']!r}")
+
+        opened = [HttpTarget(options["url"])]
+        targets = {"anonymous": (opened[0], False)}
+        for auth, account in (("user", user), ("staff", staff)):
+            if account is None:
+                self.stderr.write(self.style.WARNING(f"No account for {auth} requests; they are skipped"))
+                continue
+            opened.append(HttpTarget(options["url"], account))
+            targets[auth] = (opened[-1], True)
+
+        self.stderr.write(f"Replaying {len(entries)} requests from {len(paths)} log(s) at {options['speed'] or 'full'}x speed")
+        self.stderr.write(f"{'route':<28}{'count':>7}{'rec p50':>9}{'p50':>9}{'drift':>8}{'rec p95':>9}{'p95':>9}{'drift':>8}  statuses")
+        try:
+            report = replay(entries, targets, options["speed"], options["concurrency"], log=self._log)
+        except requests.RequestException as exc:
+            raise CommandError(f"Request to {options['url']} failed: {exc}")
+        finally:
+            for target in opened:
+                target.close()
+
+        meta = report["meta"]
+        meta.update({"url": options["url"], "logs": [str(path) for path in paths]})
+        self.stderr.write(
+            f"\n{meta['replayed']} requests in {meta['replay_seconds']:.1f}s (recorded over {meta['recorded_seconds']:.1f}s), "
+            f"p95 lag {meta['lag_p95_ms'] or 0:.1f} ms, mean drift {meta['mean_drift_ms'] or 0:+.1f} ms"
+        )
+        for reason, count in sorted(meta["skipped"].items()):
+            self.stderr.write(f"Skipped {count}: {reason}")
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(output)
+
+    def _log(self, route, item):
+        def drift(value):
+            return f"{value:+.0f}%" if value is not None else "-"
+
+        statuses = " ".join(f"{status}x{count}" for status, count in sorted(item["statuses"].items()))
+        self.stderr.write(
+            f"{route:<28}{item['requests']:>7}{item['recorded_p50_ms']:>9.1f}{item['replayed_p50_ms']:>9.1f}"
+            f"{drift(item['drift_p50_pct']):>8}{item['recorded_p95_ms']:>9.1f}{item['replayed_p95_ms']:>9.1f}"
+            f"{drift(item['drift_p95_pct']):>8}  {statuses}"
+        )
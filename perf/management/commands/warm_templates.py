@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from perf.templates import REPORT_MODES, render_report, template_cache, template_names, warm_up
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compile every project and app template, and optionally time page renders with and without the template caches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--report", action="store_true", help="Time the home, menu, booking and profile pages with and without the cached loader and fragment cache")
+        parser.add_argument("--rounds", type=int, default=50, help="Requests per page and mode (default: 50)")
+        parser.add_argument("--user", help="Username for the profile page (default: the first user)")
+        parser.add_argument("--fail", action="store_true", help="Exit with an error if a template does not compile")
+
+    def handle(self, *args, **options):
+        # Compile into a fresh cached loader even when TEMPLATE_CACHE is off, to check every template
+        with template_cache(True):
+            compiled, errors, seconds = warm_up()
+        total = len(template_names())
+        self.stdout.write(f"Compiled {compiled} of {total} templates in {seconds * 1000:.0f} ms")
+        for name, message in errors:
+            self.stdout.write(self.style.WARNING(f"  {name}: {message}"))
+        if errors and options["fail"]:
+            raise CommandError(f"{len(errors)} templates do not compile")
+
+        if options["report"]:
+            self._report(options["rounds"], options["user"])
+
+    def _report(self, rounds, username):
+        User = get_user_model()
+        user = User.objects.filter(username=username).first() if username else User.objects.order_by("pk").first()
+        if username and user is None:
+            raise CommandError(f"No user named {username!r}")
+        paths = [reverse("home"), reverse("menu:menu_list"), reverse("bookings:booking_create")]
+        if user is not None:
+            paths.append(reverse("users:profile"))
+        else:
+            self.stdout.write(self.style.WARNING("No users, skipping the profile page"))
+
+        # Logging in writes a session row; keep the database as it was
+        try:
+            with transaction.atomic(), override_settings(ALLOWED_HOSTS=["testserver"]):
+                client = Client()
+                if user is not None:
+                    client.force_login(user)
+                rows = render_report(client, paths, rounds)
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(f"\nAverage render time in ms over {rounds} requests")
+        labels = [label for label, _loader, _fragments in REPORT_MODES]
+        self.stdout.write(f"{'page':<20}" + "".join(f"{label:>15}" for label in labels) + f"{'speedup':>9}")
+        for path, timings in rows:
+            speedup = timings[0] / timings[-1] if timings[-1] else 0
+            self.stdout.write(f"{path:<20}" + "".join(f"{ms:>15.2f}" for ms in timings) + f"{speedup:>8.1f}x")
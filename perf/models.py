@@ -0,0 +1,33 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    """
+    A request profiled on demand by perf.profiling.ProfilingMiddleware.
+    The profile itself is a file in PERF_PROFILE_DIR.
+    """
+    MODES = [('cprofile', 'cProfile'), ('sample', 'Stack samples')]
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, on_delete=models.SET_NULL, related_name='+')
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    mode = models.CharField(max_length=10, choices=MODES)
+    filename = models.CharField(max_length=255, unique=True)
+    summary = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.duration_ms:.0f} ms)'
+
+    @property
+    def path_on_disk(self):
+        return Path(settings.PERF_PROFILE_DIR) / self.filename
@@ -0,0 +1,187 @@
+"""On-demand profiling of single requests, for staff.
+
+A staff member asks for a token (`manage.py profile_token <username>`, or
+the link on the admin's Request profiles page) and repeats the slow request
+with it, as a query parameter or a header:
+
+    /users/profile/?_profile=<token>
+    curl -H 'X-Profile: <token>' https://.../users/profile/
+
+ProfilingMiddleware then runs that request under cProfile and saves a
+`.prof` file (snakeviz, `python -m pstats`), or, with `_profile_mode=sample`
+or `X-Profile-Mode: sample`, under a stack sampler that writes collapsed
+stacks (`.folded`, for flamegraph.pl or speedscope). The mode used is sent
+back in an X-Profile-Mode header. Each profile is listed in the admin with
+its top functions; only the newest PERF_PROFILE_MAX_FILES are kept in
+PERF_PROFILE_DIR.
+
+On Python 3.12 cProfile hooks the whole process (sys.monitoring): a second
+profiler cannot start while one runs, and calls made by other threads
+during the request show up in its profile. So one request at a time is
+profiled with cProfile; another asking for it meanwhile is stack-sampled
+instead, as the sampler only looks at its own thread.
+
+Tokens are signed with SECRET_KEY, name the staff user who made them and
+expire after PERF_PROFILE_TOKEN_MAX_AGE seconds. Requests without one pay
+two substring checks; with PERF_PROFILING off the middleware is not loaded.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+from django.utils.text import slugify
+
+from perf.models import RequestProfile
+
+
+TOKEN_PARAM = '_profile'
+MODE_PARAM = '_profile_mode'
+TOKEN_HEADER = 'HTTP_X_PROFILE'
+MODE_HEADER = 'HTTP_X_PROFILE_MODE'
+SALT = 'perf.profiling'
+SUMMARY_LINES = 40
+
+_cprofile_lock = threading.Lock()
+
+
+def make_token(user):
+    return signing.TimestampSigner(salt=SALT).sign(str(user.pk))
+
+
+def token_user(token):
+    """The active staff user a valid, unexpired token was made for, or None."""
+    try:
+        pk = signing.TimestampSigner(salt=SALT).unsign(token, max_age=settings.PERF_PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return get_user_model().objects.filter(pk=pk, is_active=True, is_staff=True).first()
+
+
+def profile_dir():
+    path = Path(settings.PERF_PROFILE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+class StackSampler:
+    """Sample the calling thread's stack every `interval` seconds while running a function."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+
+    def run(self, func, *args):
+        thread_id = threading.get_ident()
+        # Frames above this one belong to the server, not the request
+        outer = 0
+        frame = sys._getframe()
+        while frame is not None:
+            outer += 1
+            frame = frame.f_back
+        stop = threading.Event()
+
+        def sample():
+            while not stop.wait(self.interval):
+                frame = sys._current_frames().get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                stack.reverse()
+                if len(stack) > outer:
+                    self.stacks[';'.join(stack[outer:])] += 1
+
+        sampler = threading.Thread(target=sample, name='perf-stack-sampler', daemon=True)
+        sampler.start()
+        try:
+            return func(*args)
+        finally:
+            stop.set()
+            sampler.join()
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def cprofile_summary(profile):
+    out = io.StringIO()
+    pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(SUMMARY_LINES)
+    return out.getvalue()
+
+
+def prune(keep):
+    """Delete all but the newest `keep` profiles, with their files."""
+    old = list(RequestProfile.objects.order_by('-created_at', '-pk')[keep:])
+    for profile in old:
+        profile.path_on_disk.unlink(missing_ok=True)
+    RequestProfile.objects.filter(pk__in=[profile.pk for profile in old]).delete()
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PERF_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if TOKEN_HEADER not in request.META and TOKEN_PARAM not in request.META.get('QUERY_STRING', ''):
+            return self.get_response(request)
+        token = request.META.get(TOKEN_HEADER) or request.GET.get(TOKEN_PARAM)
+        user = token_user(token) if token else None
+        if user is None:
+            return self.get_response(request)
+
+        mode = request.META.get(MODE_HEADER) or request.GET.get(MODE_PARAM) or 'cprofile'
+        if mode != 'sample' and not _cprofile_lock.acquire(blocking=False):
+            # Another request is under cProfile; starting a second one would raise
+            mode = 'sample'
+        started = time.perf_counter()
+        if mode == 'sample':
+            sampler = StackSampler(settings.PERF_PROFILE_SAMPLE_INTERVAL)
+            response = sampler.run(self.get_response, request)
+            output = sampler.folded()
+            summary = '\n'.join(output.splitlines()[:SUMMARY_LINES])
+        else:
+            mode = 'cprofile'
+            try:
+                profile = cProfile.Profile()
+                response = profile.runcall(self.get_response, request)
+            finally:
+                _cprofile_lock.release()
+            output, summary = profile, cprofile_summary(profile)
+        duration = time.perf_counter() - started
+        response['X-Profile'] = self.save(request, response, user, mode, duration, output, summary)
+        response['X-Profile-Mode'] = mode
+        return response
+
+    def save(self, request, response, user, mode, duration, output, summary):
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match is not None else ''
+        now = timezone.now()
+        extension = 'folded' if mode == 'sample' else 'prof'
+        slug = slugify((view_name or request.path).replace(':', '-').replace('/', '-'))[:60] or 'root'
+        filename = f'{now:%Y%m%d-%H%M%S-%f}-{slug}.{extension}'
+        path = profile_dir() / filename
+        if mode == 'sample':
+            path.write_text(output)
+        else:
+            output.dump_stats(path)
+        RequestProfile.objects.create(
+            user=user, method=request.method, path=request.path[:500], view_name=view_name[:200],
+            status_code=response.status_code, duration_ms=duration * 1000, mode=mode,
+            filename=filename, summary=summary,
+        )
+        prune(settings.PERF_PROFILE_MAX_FILES)
+        return filename
@@ -0,0 +1,318 @@
+"""Production-scale data for benchmarks (`manage.py generate_scale_data`).
+
+generate() writes users, restaurants, menu items, bookings and reviews with
+bulk_create in batches, together with the history rows the audit app would
+have recorded for them: a 'created' checkpoint for every booking and review,
+an 'updated' delta for the ones edited later and a 'deleted' row for
+soft-deleted bookings.
+
+Everything comes from one random.Random(seed), and dates are placed
+relative to an anchor day, so the same seed, anchor and counts produce the
+same data. The prefix only changes usernames and slugs, so several data
+sets can live in one database.
+
+The shapes follow what production looks like: the busiest 1% of users
+hold a fifth of the bookings, popular restaurants take most covers,
+parties of two dominate, ratings lean to four and five stars, and
+bookings spread from two years back to three months ahead. Nothing is
+created or changed after the anchor, which stands in for "now".
+
+bulk_create sends no signals, so afterwards the search index is rebuilt
+and the menu, restaurant and review cache tags are bumped. Restaurants get
+no RestaurantCapacity rows (unlimited seating), so the occupancy index has
+nothing to hold.
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as day_time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+import audit
+from bookings.models import Booking, BookingHistory
+from menu import search
+from menu.models import Allergen, MenuCategory, MenuItem, Restaurant
+from reviews.models import Review, ReviewHistory
+from yourtable import caching
+
+
+PASSWORD = 'scale-data-pass'
+DEFAULT_COUNTS = {
+    'users': 10_000,
+    'restaurants': 50,
+    'menu_items': 2_000,
+    'bookings': 500_000,
+    'reviews': 100_000,
+}
+
+FIRST_NAMES = ['Ada', 'Ben', 'Chloe', 'Dev', 'Elena', 'Femi', 'Grace', 'Hugo', 'Iris', 'Jonas', 'Kemi', 'Liam',
+               'Maya', 'Noah', 'Osas', 'Priya', 'Quinn', 'Rosa', 'Sam', 'Tara', 'Uche', 'Vera', 'Wen', 'Yusuf']
+LAST_NAMES = ['Adams', 'Brown', 'Chen', 'Diaz', 'Eze', 'Fischer', 'Garcia', 'Hughes', 'Ito', 'Jones', 'Khan',
+              'Lopez', 'Murphy', 'Novak', 'Okafor', 'Patel', 'Rossi', 'Smith', 'Tanaka', 'Walsh']
+PLACE_WORDS = ['Olive', 'Harbour', 'Copper', 'Saffron', 'Garden', 'Lantern', 'Fig', 'Juniper', 'Ember', 'Salt',
+               'Willow', 'Cedar', 'Basil', 'Anchor', 'Orchard', 'Pepper']
+PLACE_KINDS = ['Kitchen', 'Bistro', 'Table', 'House', 'Grill', 'Trattoria', 'Cantina', 'Brasserie']
+STREETS = ['High Street', 'Market Square', 'Mill Lane', 'Quay Road', 'Church Street', 'Park Avenue']
+CATEGORIES = ['Starters', 'Mains', 'Pasta', 'Grill', 'Salads', 'Sides', 'Desserts', 'Drinks']
+DISH_WORDS = ['Grilled', 'Roasted', 'Smoked', 'Crispy', 'Braised', 'Seared', 'Spiced', 'Charred', 'Creamy', 'Wild']
+DISH_NOUNS = ['Salmon', 'Chicken', 'Aubergine', 'Risotto', 'Lamb', 'Halloumi', 'Gnocchi', 'Prawns', 'Tart',
+              'Mushrooms', 'Pork Belly', 'Cauliflower', 'Sea Bass', 'Brownie', 'Burrata', 'Tofu']
+DISH_SIDES = ['with lemon butter', 'with salsa verde', 'on sourdough', 'with chilli oil', 'with toasted hazelnuts',
+              'with seasonal greens', 'with miso glaze', 'with parmesan and herbs']
+ALLERGENS = ['gluten', 'dairy', 'nuts', 'eggs', 'soy', 'fish', 'shellfish', 'sesame', 'celery', 'mustard']
+SPECIAL_REQUESTS = ['Window seat please', 'Birthday celebration', 'High chair needed', 'Wheelchair access',
+                    'Quiet table if possible', 'Vegetarian guest', 'Anniversary dinner', 'Gluten-free guest']
+REVIEW_OPENINGS = ['Lovely evening.', 'Great food.', 'Friendly staff.', 'A bit slow tonight.', 'Fantastic service.',
+                   'Good value.', 'Will be back.', 'Cosy atmosphere.']
+REVIEW_DETAILS = ['The risotto was perfect.', 'Desserts are a must.', 'Booking was easy.', 'Portions were generous.',
+                  'Music was too loud.', 'The wine list is excellent.', 'Table was ready on time.']
+# Parties of two dominate
+GUESTS = [1, 2, 2, 2, 2, 3, 4, 4, 5, 6, 8]
+# Ratings lean to four and five stars
+RATINGS = [1, 2, 3, 3, 4, 4, 4, 5, 5, 5, 5, 5]
+SITTINGS = [day_time(h, m) for h in (12, 13, 18, 19, 20, 21) for m in (0, 15, 30, 45)]
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created/updated times we set instead of stamping now()."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def skewed(rng, items, head, share):
+    """Pick from `items` so that the first `head` fraction of them get about `share` of the picks."""
+    if rng.random() < share:
+        return items[int(len(items) * head * rng.random())]
+    return items[int(len(items) * rng.random())]
+
+
+class Generator:
+    def __init__(self, counts, seed=0, anchor=None, prefix='scale', batch_size=5000, deleted_fraction=0.1,
+                 updated_fraction=0.2, log=None):
+        self.counts = {**DEFAULT_COUNTS, **counts}
+        self.rng = random.Random(seed)
+        anchor = anchor or timezone.localdate()
+        self.anchor = timezone.make_aware(datetime.combine(anchor, day_time()))
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.deleted_fraction = deleted_fraction
+        self.updated_fraction = updated_fraction
+        self.log = log or (lambda message: None)
+        self.totals = {}
+
+    def run(self):
+        with explicit_timestamps(get_user_model(), Booking, BookingHistory, Review, ReviewHistory):
+            self.users = self._timed('users', self.make_users)
+            self.restaurants = self._timed('restaurants', self.make_restaurants)
+            self._timed('menu items', self.make_menu_items)
+            self._timed('bookings', self.make_bookings)
+            self._timed('reviews', self.make_reviews)
+        self._timed('search index', self.rebuild_search_index)
+        caching.bump('menu', 'restaurants', 'reviews')
+        return self.totals
+
+    def rebuild_search_index(self):
+        self.totals['search index'] = search.rebuild()
+
+    def _timed(self, label, step):
+        started = time.perf_counter()
+        result = step()
+        elapsed = time.perf_counter() - started
+        rows = self.totals.get(label)
+        rate = f', {rows / elapsed:,.0f} rows/s' if rows and elapsed else ''
+        self.log(f'{label}: {rows if rows is not None else "done"} in {elapsed:.1f}s{rate}')
+        return result
+
+    def _add(self, label, rows):
+        self.totals[label] = self.totals.get(label, 0) + rows
+
+    def _batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield start, min(self.batch_size, total - start)
+
+    def _moment(self, days_back, days_ahead=0):
+        """A random time between `days_back` days before and `days_ahead` days after the anchor."""
+        return self.anchor + timedelta(seconds=self.rng.uniform(-days_back * 86400, days_ahead * 86400))
+
+    def make_users(self):
+        User = get_user_model()
+        password = make_password(PASSWORD)
+        pks = []
+        for start, size in self._batches(self.counts['users']):
+            users = []
+            for i in range(start, start + size):
+                first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+                users.append(User(
+                    username=f'{self.prefix}-user-{i:07d}', email=f'{self.prefix}.{i}@example.com',
+                    first_name=first, last_name=last, password=password,
+                    date_joined=self._moment(3 * 365),
+                ))
+            with transaction.atomic():
+                pks += [user.pk for user in User.objects.bulk_create(users)]
+            self._add('users', size)
+        return pks
+
+    def make_restaurants(self):
+        restaurants = []
+        for i in range(self.counts['restaurants']):
+            name = f'{self.rng.choice(PLACE_WORDS)} {self.rng.choice(PLACE_KINDS)}'
+            restaurants.append(Restaurant(
+                name=name, slug=f'{self.prefix}-{slugify(name)}-{i}',
+                description=f'{name} serves seasonal plates and a short wine list.',
+                address=f'{self.rng.randint(1, 200)} {self.rng.choice(STREETS)}',
+                phone=f'01{self.rng.randint(100000000, 999999999)}',
+            ))
+        pks = [restaurant.pk for restaurant in Restaurant.objects.bulk_create(restaurants)]
+        self._add('restaurants', len(pks))
+        return pks
+
+    def make_menu_items(self):
+        categories = []
+        for name in CATEGORIES:
+            category, _ = MenuCategory.objects.get_or_create(slug=slugify(name), defaults={'name': name})
+            categories.append(category.pk)
+        Allergen.objects.bulk_create(
+            [Allergen(name=name, slug=slugify(name)) for name in ALLERGENS], ignore_conflicts=True,
+        )
+        allergen_pks = dict(Allergen.objects.filter(name__in=ALLERGENS).values_list('name', 'pk'))
+        Tag = MenuItem.allergen_tags.through
+        for start, size in self._batches(self.counts['menu_items']):
+            items, allergens = [], []
+            for i in range(start, start + size):
+                name = f'{self.rng.choice(DISH_WORDS)} {self.rng.choice(DISH_NOUNS)}'
+                names = self.rng.sample(ALLERGENS, self.rng.choice([0, 0, 1, 1, 2, 3]))
+                allergens.append(names)
+                items.append(MenuItem(
+                    category_id=self.rng.choice(categories), name=name,
+                    slug=f'{self.prefix}-{slugify(name)}-{i}',
+                    description=f'{name} {self.rng.choice(DISH_SIDES)}',
+                    price=Decimal(self.rng.randint(450, 3200)) / 100,
+                    allergens=', '.join(names) if names else 'none',
+                    is_active=self.rng.random() > 0.05,
+                ))
+            with transaction.atomic():
+                MenuItem.objects.bulk_create(items)
+                Tag.objects.bulk_create([
+                    Tag(menuitem_id=item.pk, allergen_id=allergen_pks[name])
+                    for item, names in zip(items, allergens) for name in names
+                ])
+            self._add('menu items', size)
+
+    def make_bookings(self):
+        plan = audit.get_spec(Booking).plan
+        # Busy users and popular restaurants first, so skewed() favours them
+        users = self.rng.sample(self.users, len(self.users))
+        restaurants = self.rng.sample(self.restaurants, len(self.restaurants))
+        now = self.anchor
+        for start, size in self._batches(self.counts['bookings']):
+            bookings, events = [], []
+            for _ in range(size):
+                date = self.anchor.replace(hour=0, minute=0) + timedelta(days=self.rng.randint(-730, 90))
+                sitting = self.rng.choice(SITTINGS)
+                date = date.replace(hour=sitting.hour, minute=sitting.minute)
+                created = min(date - timedelta(days=self.rng.uniform(0, 45), minutes=self.rng.randint(30, 600)), now)
+                booking = Booking(
+                    user_id=skewed(self.rng, users, 0.01, 0.2), restaurant_id=skewed(self.rng, restaurants, 0.2, 0.5),
+                    date=date, guests=self.rng.choice(GUESTS), created_at=created,
+                    special_requests=self.rng.choice(SPECIAL_REQUESTS) if self.rng.random() < 0.15 else '',
+                )
+                # Each event is drawn after the previous one, so history stays in order
+                updated, last = None, created
+                if self.rng.random() < self.updated_fraction:
+                    updated = last = min(created + (date - created) * self.rng.random(), now)
+                deleted = None
+                if self.rng.random() < self.deleted_fraction:
+                    deleted = min(last + (date - last) * self.rng.uniform(0.3, 1), now)
+                    booking.is_deleted, booking.deleted_at = True, deleted
+                elif date <= now and self.rng.random() < 0.9:
+                    booking.reminder_sent_at = date - timedelta(hours=24)
+                original_guests = self.rng.choice(GUESTS) if updated else booking.guests
+                bookings.append(booking)
+                events.append((created, original_guests, updated, deleted))
+            with transaction.atomic():
+                Booking.objects.bulk_create(bookings)
+                history = []
+                for booking, (created, original_guests, updated, deleted) in zip(bookings, events):
+                    state = plan.snapshot(booking)
+                    history.append(self._history(BookingHistory, 'booking', booking, 'created', created,
+                                                 {**state, 'guests': original_guests}, True))
+                    if updated:
+                        history.append(self._history(BookingHistory, 'booking', booking, 'updated', updated,
+                                                     {'guests': booking.guests}, False))
+                    if deleted:
+                        history.append(self._history(BookingHistory, 'booking', None, 'deleted', deleted, {}, False,
+                                                     pk=booking.pk, user_id=booking.user_id))
+                BookingHistory.objects.bulk_create(history)
+            self._add('bookings', size)
+            self._add('booking history', len(history))
+
+    def make_reviews(self):
+        plan = audit.get_spec(Review).plan
+        now = self.anchor
+        for start, size in self._batches(self.counts['reviews']):
+            reviews, edits = [], []
+            for _ in range(size):
+                created = min(self._moment(2 * 365), now)
+                signed_in = self.rng.random() < 0.8
+                review = Review(
+                    user_id=self.rng.choice(self.users) if signed_in else None,
+                    guest_name='' if signed_in else self.rng.choice(FIRST_NAMES),
+                    rating=self.rng.choice(RATINGS),
+                    comment=f'{self.rng.choice(REVIEW_OPENINGS)} {self.rng.choice(REVIEW_DETAILS)}',
+                    created_at=created, updated_at=created,
+                )
+                edit = None
+                if self.rng.random() < self.updated_fraction / 2:
+                    edit = (min(created + timedelta(days=self.rng.uniform(0, 30)), now), review.rating)
+                    review.rating = min(5, review.rating + 1)
+                    review.updated_at = edit[0]
+                reviews.append(review)
+                edits.append((created, edit))
+            with transaction.atomic():
+                Review.objects.bulk_create(reviews)
+                history = []
+                for review, (created, edit) in zip(reviews, edits):
+                    state = plan.snapshot(review)
+                    if edit:
+                        history.append(self._history(ReviewHistory, 'review', review, 'created', created,
+                                                     {**state, 'rating': edit[1]}, True))
+                        history.append(self._history(ReviewHistory, 'review', review, 'updated', edit[0],
+                                                     {'rating': review.rating}, False))
+                    else:
+                        history.append(self._history(ReviewHistory, 'review', review, 'created', created, state, True))
+                ReviewHistory.objects.bulk_create(history)
+            self._add('reviews', size)
+            self._add('review history', len(history))
+
+    def _history(self, model, field, instance, action, timestamp, data, checkpoint, pk=None, user_id=None):
+        return model(**{
+            field: instance,
+            f'{field}_pk': pk if instance is None else instance.pk,
+            'user_id': user_id if instance is None else instance.user_id,
+            'action': action,
+            'timestamp': timestamp,
+            'data': data,
+            'is_checkpoint': checkpoint,
+        })
+
+
+def generate(counts=None, **options):
+    """Generate scale data; see Generator for the options. Returns {label: rows}."""
+    return Generator(counts or {}, **options).run()
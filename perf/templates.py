@@ -0,0 +1,144 @@
+"""Template compilation warm-up and render timing.
+
+With TEMPLATE_CACHE on, Django's cached loader keeps every compiled template
+in memory, so base.html, the navbar, the footer and the carousel partials are
+read and parsed once per worker instead of on every request. warm_up()
+compiles every project and app template up front; yourtable/wsgi.py calls it
+when a worker boots (TEMPLATE_WARMUP), so the first visitors do not pay for
+it either.
+
+render_report() times pages with and without the cached loader and the
+{% cachefragment %} cache, see `manage.py warm_templates --report`.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.loaders.cached import Loader as CachedLoader
+
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt', '.xml')
+
+
+def get_engine():
+    return engines['django'].engine
+
+
+def uses_cached_loader(engine=None):
+    engine = engine or get_engine()
+    return any(isinstance(loader, CachedLoader) for loader in engine.template_loaders)
+
+
+def template_names(engine=None):
+    """Every template name the engine's loaders can find, in lookup order, without duplicates."""
+    engine = engine or get_engine()
+    names = []
+    seen = set()
+    for loader in engine.template_loaders:
+        for directory in loader.get_dirs():
+            for root, _dirs, files in os.walk(directory):
+                for filename in sorted(files):
+                    if not filename.endswith(TEMPLATE_EXTENSIONS):
+                        continue
+                    name = os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/')
+                    if name not in seen:
+                        seen.add(name)
+                        names.append(name)
+    return names
+
+
+def warm_up(engine=None):
+    """
+    Compile every template into the cached loader.
+
+    Returns (compiled, errors, seconds); errors is a list of (name, message)
+    for templates that do not compile, which are skipped rather than raised.
+    Does nothing without the cached loader.
+    """
+    engine = engine or get_engine()
+    started = time.perf_counter()
+    compiled, errors = 0, []
+    if not uses_cached_loader(engine):
+        return compiled, errors, 0.0
+    for name in template_names(engine):
+        try:
+            engine.get_template(name)
+            compiled += 1
+        except (TemplateSyntaxError, UnicodeDecodeError) as exc:
+            # Templates of optional app features that are not installed (allauth's mfa...)
+            errors.append((name, str(exc).splitlines()[0]))
+    return compiled, errors, time.perf_counter() - started
+
+
+@contextmanager
+def template_cache(enabled):
+    """Run the block with the cached loader switched on or off, with an empty cache."""
+    from django.test import override_settings
+
+    config = [dict(entry) for entry in settings.TEMPLATES]
+    options = dict(config[0].get('OPTIONS', {}))
+    loaders = settings.TEMPLATE_LOADERS
+    options['loaders'] = [('django.template.loaders.cached.Loader', loaders)] if enabled else loaders
+    config[0]['OPTIONS'] = options
+    with override_settings(TEMPLATES=config):
+        yield
+
+
+@contextmanager
+def render_timer():
+    """Accumulate the time spent in Template.render() into the yielded list."""
+    from django.template.backends.django import Template
+
+    spent = [0.0]
+    original = Template.render
+
+    def timed(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            spent[0] += time.perf_counter() - started
+
+    Template.render = timed
+    try:
+        yield spent
+    finally:
+        Template.render = original
+
+
+def time_pages(client, paths, rounds):
+    """Return {path: average render milliseconds} over `rounds` requests per path."""
+    results = {}
+    for path in paths:
+        with render_timer() as spent:
+            for _ in range(rounds):
+                response = client.get(path)
+                if response.status_code != 200:
+                    raise RuntimeError(f'{path} returned {response.status_code}')
+        results[path] = spent[0] * 1000 / rounds
+    return results
+
+
+# (label, cached loader, fragment cache)
+REPORT_MODES = (
+    ('uncached', False, False),
+    ('cached loader', True, False),
+    ('+ fragments', True, True),
+)
+
+
+def render_report(client, paths, rounds=50):
+    """
+    Time `paths` under each of REPORT_MODES, warming the cached loader up first.
+    Returns [(path, [ms per mode])].
+    """
+    from django.test import override_settings
+
+    timings = []
+    for _label, loader_cache, fragments in REPORT_MODES:
+        with template_cache(loader_cache), override_settings(FRAGMENT_CACHE=fragments):
+            warm_up()
+            timings.append(time_pages(client, paths, rounds))
+    return [(path, [mode[path] for mode in timings]) for path in paths]
@@ -0,0 +1,84 @@
+import io
+import json
+import tempfile
+from datetime import date
+from pathlib import Path
+
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import LiveServerTestCase, TestCase
+
+from perf import benchmark
+from perf.scaledata import generate
+
+
+COUNTS = {"users": 5, "restaurants": 2, "menu_items": 5, "bookings": 30, "reviews": 10}
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate(COUNTS, anchor=date(2026, 6, 1), deleted_fraction=0)
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = Path(directory.name)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual([benchmark.percentile(values, p) for p in (50, 95, 99, 100)], [50, 95, 99, 100])
+        self.assertEqual(benchmark.percentile([7], 99), 7)
+
+    def test_routes_use_the_busiest_user(self):
+        user = benchmark.benchmark_user()
+        self.assertEqual(set(benchmark.route_paths(user)), {key for key, _name, _login in benchmark.ROUTES})
+        self.assertEqual(benchmark.route_paths(user)["login"], ("/accounts/login/", False))
+        self.assertNotIn("profile", benchmark.route_paths(None))
+
+    def test_in_process_report(self):
+        output = self.dir / "run.json"
+        call_command("benchmark", "--requests=4", "--warmup=1", f"--output={output}", stderr=io.StringIO())
+        report = json.loads(output.read_text())
+        self.assertEqual(report["meta"]["target"], "in-process")
+        self.assertEqual(set(report["routes"]), {key for key, _name, _login in benchmark.ROUTES})
+        for key, entry in report["routes"].items():
+            self.assertEqual(entry["statuses"], {"200": 4}, key)
+            self.assertLessEqual(entry["p50_ms"], entry["p95_ms"])
+            self.assertLessEqual(entry["p95_ms"], entry["p99_ms"])
+            self.assertIsInstance(entry["queries"], int)
+        self.assertGreater(report["routes"]["booking_list"]["queries"], 0)
+        # The login session was rolled back
+        self.assertFalse(Session.objects.exists())
+
+    def test_compare(self):
+        def report(p95, queries):
+            return {"routes": {"home": {"p95_ms": p95, "queries": queries}}}
+
+        self.assertEqual(benchmark.compare(report(10, 2), report(10.5, 2), 10)[1], [])
+        self.assertEqual(benchmark.compare(report(10, 2), report(12, 2), 10)[1], [("home", "p95_ms", 10, 12, 20.0)])
+        self.assertEqual(benchmark.compare(report(10, 2), report(9, 3), 10)[1], [("home", "queries", 2, 3, 50.0)])
+
+    def test_command_fails_on_regressions(self):
+        baseline = self.dir / "baseline.json"
+        baseline.write_text(json.dumps({"meta": {}, "routes": {"home": {"p95_ms": 0.001, "queries": 0}}}))
+        with self.assertRaisesMessage(CommandError, "1 regression(s)"):
+            call_command("benchmark", "--requests=2", "--route=home", f"--compare={baseline}",
+                         stdout=io.StringIO(), stderr=io.StringIO())
+
+
+class HttpTargetTests(LiveServerTestCase):
+    def test_report_over_http(self):
+        generate(COUNTS, anchor=date(2026, 6, 1), deleted_fraction=0)
+        user = benchmark.benchmark_user()
+        target = benchmark.HttpTarget(self.live_server_url, user)
+        paths = {key: path for key, path in benchmark.route_paths(user).items() if key in ("home", "booking_list")}
+        report = benchmark.run(target, paths, count=4, concurrency=2, warmup=1)
+        target.close()
+        self.assertEqual(report["meta"]["target"], self.live_server_url)
+        self.assertEqual(report["routes"]["booking_list"]["statuses"], {"200": 4})
+        self.assertEqual(report["routes"]["home"]["statuses"], {"200": 4})
+        self.assertFalse(Session.objects.exists())
@@ -0,0 +1,124 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from bookings.models import Booking, RestaurantCapacity
+from menu.models import MenuCategory, MenuItem, Restaurant
+from perf.budgets import QueryReport, QueryBudgetTestMixin, normalize
+from reviews.models import Review
+
+
+class QueryReportTests(TestCase):
+    def test_repeated_statements_are_flagged(self):
+        report = QueryReport(budget=10, threshold=3)
+        report.statements = [
+            'SELECT * FROM "auth_user" WHERE "id" = %s',
+            'SELECT * FROM "auth_user" WHERE "id" = %s',
+            'SELECT * FROM "auth_user" WHERE "id" = %s',
+            'SELECT * FROM "menu_restaurant" WHERE "id" IN (%s, %s)',
+        ]
+        self.assertEqual(report.repeated(), [('SELECT * FROM "auth_user" WHERE "id" = %s', 3)])
+        self.assertFalse(report.over_budget)
+        report.budget = 3
+        self.assertEqual(report.problems()[0], '4 queries, budget 3')
+
+    def test_normalize_ignores_values_and_in_list_length(self):
+        self.assertEqual(
+            normalize('SELECT 1 FROM t WHERE a IN (%s, %s, %s) AND b = 7 LIMIT 21'),
+            normalize('SELECT 1 FROM t WHERE a IN (%s) AND b = 9 LIMIT 21'),
+        )
+
+
+class ViewBudgetTests(QueryBudgetTestMixin, TestCase):
+    """Every page stays within its declared budget with several rows per list."""
+
+    def setUp(self):
+        super().setUp()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="diner", password="pass1234")
+        for i in range(3):
+            restaurant = Restaurant.objects.create(name=f"Restaurant {i}", slug=f"restaurant-{i}")
+            RestaurantCapacity.objects.create(restaurant=restaurant, covers_per_slot=20)
+            booking = Booking.objects.create(
+                user=self.user, restaurant=restaurant, date=timezone.now() + timedelta(days=i + 1), guests=2
+            )
+            booking.guests = 3
+            booking.save()
+            other = User.objects.create_user(username=f"reviewer{i}", password="pass1234")
+            Review.objects.create(user=other, rating=4)
+            self.review = Review.objects.create(user=self.user, rating=5)
+            category = MenuCategory.objects.create(name=f"Category {i}", slug=f"category-{i}")
+            MenuItem.objects.create(category=category, name=f"Dish {i}", slug=f"dish-{i}", price=Decimal("9.50"))
+        self.restaurant = restaurant
+        self.booking = booking
+        self.client.login(username="diner", password="pass1234")
+
+    def when(self, days):
+        return (timezone.localtime() + timedelta(days=days)).strftime("%Y-%m-%dT%H:%M")
+
+    def test_get_pages(self):
+        pages = [
+            reverse("bookings:booking_list"),
+            reverse("bookings:booking_detail", args=[self.booking.pk]),
+            reverse("bookings:booking_create"),
+            reverse("bookings:booking_update", args=[self.booking.pk]),
+            reverse("bookings:booking_delete", args=[self.booking.pk]),
+            reverse("bookings:booking_success"),
+            reverse("users:profile"),
+            reverse("reviews:review_list"),
+            reverse("reviews:review_create"),
+            reverse("reviews:review_update", args=[self.review.pk]),
+            reverse("reviews:review_delete", args=[self.review.pk]),
+            reverse("menu:menu_list"),
+            reverse("menu:menu_item_detail", args=["dish-0"]),
+        ]
+        for path in pages:
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertWithinBudget(response)
+
+    def test_booking_posts(self):
+        data = {"restaurant": self.restaurant.pk, "date": self.when(5), "guests": 2}
+        response = self.client.post(reverse("bookings:booking_create"), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertWithinBudget(response)
+
+        data = {"restaurant": self.restaurant.pk, "date": self.when(6), "guests": 4}
+        response = self.client.post(reverse("bookings:booking_update", args=[self.booking.pk]), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertWithinBudget(response)
+
+        response = self.client.post(reverse("bookings:booking_delete", args=[self.booking.pk]))
+        self.assertEqual(response.status_code, 302)
+        self.assertWithinBudget(response)
+
+    def test_review_posts(self):
+        response = self.client.post(reverse("reviews:review_create"), {"rating": 4, "comment": "Lovely"})
+        self.assertWithinBudget(response)
+        response = self.client.post(
+            reverse("reviews:review_update", args=[self.review.pk]), {"rating": 3, "comment": "Fine"}
+        )
+        self.assertWithinBudget(response)
+        response = self.client.post(reverse("reviews:review_delete", args=[self.review.pk]))
+        self.assertWithinBudget(response)
+
+    def test_signup(self):
+        self.client.logout()
+        response = self.client.get(reverse("users:signup"))
+        self.assertWithinBudget(response)
+        response = self.client.post(
+            reverse("users:signup"),
+            {"username": "newcomer", "password1": "S3cure-pass-123", "password2": "S3cure-pass-123"},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertWithinBudget(response)
+
+    def test_budget_overrun_fails(self):
+        response = self.client.get(reverse("bookings:booking_list"))
+        with self.assertRaises(AssertionError):
+            self.assertWithinBudget(response, budget=1)
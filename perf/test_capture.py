@@ -0,0 +1,152 @@
+import io
+import json
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import QueryDict
+from django.test import Client, LiveServerTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from perf import capture
+from perf.benchmark import HttpTarget, benchmark_user
+from perf.scaledata import generate
+
+
+class CaptureTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = Path(directory.name)
+        override = override_settings(PERF_CAPTURE=True, PERF_CAPTURE_DIR=self.dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def entries(self):
+        return capture.read_log(capture.log_files(self.dir))
+
+    def test_records_sanitized_metadata(self):
+        client = Client()
+        client.get(reverse("menu:menu_list"), {"q": "fish", "token": "tok3n", "reset_password": "x", "free_from": "nuts"})
+        client.get("/static/nothing.css")
+        client.post(reverse("account_login"), {"login": "diner", "password": "hunter2"})
+        User = get_user_model()
+        client.force_login(User.objects.create_user("diner", "diner@example.com", "pass1234"))
+        client.get(reverse("bookings:booking_list"))
+        client.force_login(User.objects.create_user("staff", "staff@example.com", "pass1234", is_staff=True))
+        client.get(reverse("users:profile"))
+
+        menu, login, bookings, profile = self.entries()
+        self.assertEqual((menu["method"], menu["route"], menu["query"], menu["auth"], menu["status"]),
+                         ("GET", "menu:menu_list", {"free_from": ["nuts"], "q": [capture.redacted("fish")]}, "anonymous", 200))
+        self.assertIsInstance(menu["queries"], int)
+        self.assertGreater(menu["duration_ms"], 0)
+        self.assertEqual((login["method"], login["form"]), ("POST", ["login", "password"]))
+        self.assertEqual((bookings["route"], bookings["auth"]), ("bookings:booking_list", "user"))
+        self.assertEqual(profile["auth"], "staff")
+        text = "".join(path.read_text() for path in capture.log_files(self.dir))
+        for secret in ("hunter2", "tok3n", "diner@example.com", "/static/", "fish"):
+            self.assertNotIn(secret, text)
+
+    def test_free_text_is_hashed(self):
+        query = capture.sanitized_query(QueryDict("q=fish&q=fish&q=chips&page=2&cursor=abc&email=a@b.c"))
+        self.assertEqual(set(query), {"q", "page", "cursor"})
+        self.assertEqual((query["page"], query["cursor"]), (["2"], ["abc"]))
+        first, again, other = query["q"]
+        self.assertEqual(first, again)
+        self.assertNotEqual(first, other)
+        self.assertNotIn("fish", first)
+
+    def test_url_tokens_are_hashed(self):
+        client = Client()
+        client.get(reverse("account_reset_password_from_key", kwargs={"uidb36": "2", "key": "s3cr3tkey"}))
+        client.get(reverse("account_confirm_email", kwargs={"key": "c0nfirmkey"}))
+        client.get(reverse("menu:menu_item_detail", args=["soup"]))
+        client.get(reverse("reviews:review_update", args=[7]))
+        reset, confirm, item, review = self.entries()
+        self.assertEqual(reset["kwargs"], {"key": capture.redacted("s3cr3tkey"), "uidb36": capture.redacted("2")})
+        self.assertEqual(confirm["kwargs"], {"key": capture.redacted("c0nfirmkey")})
+        self.assertEqual((item["kwargs"], review["kwargs"]), ({"slug": "soup"}, {"pk": 7}))
+        text = "".join(path.read_text() for path in capture.log_files(self.dir))
+        for secret in ("s3cr3tkey", "c0nfirmkey"):
+            self.assertNotIn(secret, text)
+
+    @override_settings(PAGE_CACHE=True)
+    def test_page_cache_hits_are_recorded(self):
+        client = Client()
+        self.assertEqual(client.get(reverse("home"))["X-Page-Cache"], "MISS")
+        self.assertEqual(client.get(reverse("home"))["X-Page-Cache"], "HIT")
+        self.assertEqual([entry["route"] for entry in self.entries()], ["home", "home"])
+
+    @override_settings(PERF_CAPTURE_MAX_BYTES=600, PERF_CAPTURE_BACKUPS=2)
+    def test_log_rotates(self):
+        client = Client()
+        for page in range(20):
+            client.get(reverse("reviews:review_list"), {"page": page})
+        self.assertEqual(len(capture.log_files(self.dir)), 3)
+        pages = [entry["query"]["page"][0] for entry in self.entries()]
+        # The oldest requests were rotated away; the rest are in order
+        self.assertEqual(pages, [str(page) for page in range(20 - len(pages), 20)])
+
+    @override_settings(PERF_CAPTURE_SAMPLE_RATE=0)
+    def test_sampling(self):
+        Client().get(reverse("home"))
+        self.assertEqual(self.entries(), [])
+
+
+class ReplayTests(LiveServerTestCase):
+    def setUp(self):
+        cache.clear()
+        generate({"users": 3, "restaurants": 1, "menu_items": 3, "bookings": 10, "reviews": 5}, anchor=date(2026, 6, 1))
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log = Path(directory.name) / "traffic-1.jsonl"
+        start = timezone.now()
+
+        def line(seconds, route, auth="anonymous", method="GET", **extra):
+            return json.dumps({
+                "ts": (start + timedelta(seconds=seconds)).isoformat(), "method": method, "route": route,
+                "kwargs": {}, "query": {}, "form": [], "auth": auth, "status": 200, "duration_ms": 5.0, "queries": 1,
+                **extra,
+            })
+
+        self.log.write_text("\n".join([
+            line(0, "home"),
+            line(0.1, "bookings:booking_list", auth="user"),
+            line(0.2, "menu:menu_list", query={"q": ["fish"]}),
+            line(0.3, "account_login", method="POST", form=["login", "password"]),
+            line(0.4, "no_such_route"),
+            line(0.5, "users:profile", auth="staff"),
+            "not json",
+        ]) + "\n")
+
+    def test_replay(self):
+        entries = capture.read_log([self.log])
+        user_target = HttpTarget(self.live_server_url, benchmark_user())
+        targets = {"anonymous": (HttpTarget(self.live_server_url), False), "user": (user_target, True)}
+        report = capture.replay(entries, targets, speed=1, concurrency=2)
+        user_target.close()
+
+        self.assertEqual(report["meta"]["replayed"], 3)
+        self.assertEqual(report["meta"]["skipped"], {"method POST": 1, "unknown route": 1, "no staff session": 1})
+        self.assertGreaterEqual(report["meta"]["replay_seconds"], 0.2)
+        self.assertEqual(set(report["routes"]), {"home", "bookings:booking_list", "menu:menu_list"})
+        booking_list = report["routes"]["bookings:booking_list"]
+        self.assertEqual(booking_list["statuses"], {"200": 1})
+        self.assertEqual(booking_list["recorded_p50_ms"], 5.0)
+        self.assertEqual(booking_list["drift_p50_pct"],
+                         round((booking_list["replayed_p50_ms"] - 5.0) * 100 / 5.0, 1))
+
+    def test_command(self):
+        get_user_model().objects.create_user("staff", "staff@example.com", "pass1234", is_staff=True)
+        output = self.log.with_name("report.json")
+        call_command("replay_traffic", str(self.log), f"--url={self.live_server_url}", "--speed=0",
+                     f"--output={output}", stderr=io.StringIO())
+        report = json.loads(output.read_text())
+        self.assertEqual(report["meta"]["replayed"], 4)
+        self.assertEqual(report["routes"]["users:profile"]["statuses"], {"200": 1})
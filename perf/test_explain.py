@@ -0,0 +1,60 @@
+import io
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from bookings.models import Booking
+from menu.models import Restaurant
+from perf.explain import capture_selects, check, problems
+from reviews.models import Review
+
+
+class PlanParsingTests(TestCase):
+    def test_sqlite_scans_and_sorts(self):
+        plan = [
+            "SCAN bookings_booking",
+            "SCAN reviews_review USING INDEX review_created_idx",
+            "SEARCH auth_user USING INTEGER PRIMARY KEY (rowid=?)",
+            "USE TEMP B-TREE FOR ORDER BY",
+        ]
+        self.assertEqual(problems(plan, "sqlite"), ["full scan of bookings_booking", "sort without an index"])
+
+    def test_postgres_scans_and_sorts(self):
+        plan = [
+            "Sort  (cost=10.0..10.1 rows=1 width=8)",
+            "  Sort Key: created_at DESC",
+            "  ->  Seq Scan on reviews_review  (cost=0.00..1.01 rows=1 width=8)",
+            "  ->  Index Scan using booking_active_user_date_idx on bookings_booking  (cost=0.1..8.1 rows=1 width=8)",
+        ]
+        self.assertEqual(problems(plan, "postgresql"), ["sort without an index", "full scan of reviews_review"])
+
+
+class IndexAdvisorTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="diner", password="pass1234")
+        restaurant = Restaurant.objects.create(name="Test Restaurant", slug="test-restaurant")
+        for days in (1, 2, 3):
+            booking = Booking.objects.create(
+                user=self.user, restaurant=restaurant, date=timezone.now() + timedelta(days=days), guests=2
+            )
+            booking.guests = 3
+            booking.save()
+        Review.objects.create(user=self.user, rating=5)
+
+    def test_hot_queries_use_indexes(self):
+        with capture_selects() as queries:
+            list(Booking.all_objects.all_objects().filter(user=self.user).order_by("-created_at"))
+            list(self.user.bookinghistory_set.order_by("-timestamp", "-id")[:50])
+            list(Review.objects.order_by("-created_at"))
+        for sql, plan, issues in check(queries):
+            self.assertEqual(issues, [], f"{sql}\n{plan}")
+
+    def test_command_reports_clean_pages(self):
+        out = io.StringIO()
+        call_command("index_advisor", "--fail", stdout=out)
+        self.assertIn("GET /bookings/", out.getvalue())
+        self.assertIn(f"No full scans or index-less sorts on {connection.vendor}", out.getvalue())
@@ -0,0 +1,129 @@
+import io
+import pstats
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from perf import profiling
+from perf.models import RequestProfile
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = Path(directory.name)
+        override = override_settings(PERF_PROFILE_DIR=self.dir, PERF_PROFILE_MAX_FILES=2)
+        override.enable()
+        self.addCleanup(override.disable)
+        User = get_user_model()
+        self.staff = User.objects.create_user("staff", "staff@example.com", "pass1234", is_staff=True)
+        self.diner = User.objects.create_user("diner", "diner@example.com", "pass1234")
+        self.url = reverse("bookings:booking_create")
+
+    def test_requests_without_a_valid_token_are_not_profiled(self):
+        self.assertNotIn("X-Profile", self.client.get(self.url))
+        self.assertNotIn("X-Profile", self.client.get(self.url, {"_profile": "forged"}))
+        self.assertNotIn("X-Profile", self.client.get(self.url, {"_profile": profiling.make_token(self.diner)}))
+        self.assertNotIn("X-Profile", self.client.get(self.url, HTTP_X_PROFILE=profiling.make_token(self.diner)))
+        with override_settings(PERF_PROFILE_TOKEN_MAX_AGE=-1):
+            self.assertNotIn("X-Profile", self.client.get(self.url, {"_profile": profiling.make_token(self.staff)}))
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_cprofile(self):
+        response = self.client.get(self.url, {"_profile": profiling.make_token(self.staff)})
+        self.assertEqual(response.status_code, 200)
+        profile = RequestProfile.objects.get()
+        self.assertEqual(response["X-Profile"], profile.filename)
+        self.assertEqual(
+            (profile.user, profile.mode, profile.path, profile.view_name, profile.status_code),
+            (self.staff, "cprofile", self.url, "bookings:booking_create", 200),
+        )
+        self.assertTrue(profile.filename.endswith("-bookings-booking_create.prof"))
+        self.assertIn("function calls", profile.summary)
+        stats = pstats.Stats(str(profile.path_on_disk), stream=io.StringIO())
+        self.assertGreater(stats.total_calls, 0)
+
+    def test_stack_samples(self):
+        response = self.client.get(self.url, HTTP_X_PROFILE=profiling.make_token(self.staff), HTTP_X_PROFILE_MODE="sample")
+        profile = RequestProfile.objects.get()
+        self.assertEqual(profile.mode, "sample")
+        self.assertTrue(response["X-Profile"].endswith(".folded"))
+        # Collapsed stacks: frames joined by ';' and a sample count
+        for line in profile.path_on_disk.read_text().splitlines():
+            self.assertRegex(line, r"^\S.*;.* \d+$")
+
+    def test_concurrent_requests_do_not_share_cprofile(self):
+        entered, release = threading.Event(), threading.Event()
+
+        def view(request):
+            if not entered.is_set():
+                entered.set()
+                release.wait(5)
+            return HttpResponse("ok")
+
+        middleware = profiling.ProfilingMiddleware(view)
+        token = profiling.make_token(self.staff)
+        responses = []
+
+        def visit():
+            responses.append(middleware(RequestFactory().get(self.url, HTTP_X_PROFILE=token)))
+
+        # Profiles are saved from the other thread, outside the test transaction
+        with mock.patch.object(profiling, "token_user", return_value=self.staff), \
+                mock.patch.object(profiling.ProfilingMiddleware, "save", return_value="saved"):
+            first = threading.Thread(target=visit)
+            first.start()
+            self.assertTrue(entered.wait(5))
+            visit()
+            release.set()
+            first.join()
+        self.assertEqual([response.status_code for response in responses], [200, 200])
+        self.assertEqual([response["X-Profile-Mode"] for response in responses], ["sample", "cprofile"])
+        # The lock is free again
+        with mock.patch.object(profiling.ProfilingMiddleware, "save", return_value="saved"):
+            self.assertEqual(middleware(RequestFactory().get(self.url, HTTP_X_PROFILE=token))["X-Profile-Mode"], "cprofile")
+
+    def test_sampler_collects_stacks(self):
+        import time
+
+        def slow():
+            time.sleep(0.05)
+            return "done"
+
+        sampler = profiling.StackSampler(0.001)
+        self.assertEqual(sampler.run(slow), "done")
+        self.assertIn("slow (test_profiling.py:", sampler.folded())
+        # Frames of the caller are left out
+        self.assertNotIn("test_sampler_collects_stacks", sampler.folded())
+
+    def test_only_the_newest_profiles_are_kept(self):
+        token = profiling.make_token(self.staff)
+        names = [self.client.get(self.url, {"_profile": token})["X-Profile"] for _ in range(3)]
+        self.assertEqual(sorted(RequestProfile.objects.values_list("filename", flat=True)), sorted(names[1:]))
+        self.assertEqual(sorted(path.name for path in self.dir.iterdir()), sorted(names[1:]))
+
+    def test_admin_lists_and_downloads_profiles(self):
+        self.client.get(self.url, {"_profile": profiling.make_token(self.staff)})
+        profile = RequestProfile.objects.get()
+        admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "pass1234")
+        self.client.force_login(admin)
+        response = self.client.get(reverse("admin:perf_requestprofile_changelist"))
+        self.assertContains(response, profile.filename)
+        self.assertContains(response, "?_profile=")
+        download = self.client.get(reverse("admin:perf_requestprofile_download", args=[profile.pk]))
+        self.assertEqual(b"".join(download.streaming_content), profile.path_on_disk.read_bytes())
+
+    def test_profile_token_command(self):
+        out = io.StringIO()
+        call_command("profile_token", "staff", stdout=out, stderr=io.StringIO())
+        self.assertEqual(profiling.token_user(out.getvalue().strip()), self.staff)
@@ -0,0 +1,101 @@
+import io
+from datetime import date, datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from audit.history import state_at
+from bookings.models import Booking, BookingHistory
+from menu.models import MenuItem, Restaurant
+from perf.scaledata import generate
+from reviews.models import Review, ReviewHistory
+
+
+COUNTS = {"users": 40, "restaurants": 4, "menu_items": 30, "bookings": 300, "reviews": 80}
+
+
+class ScaleDataTests(TestCase):
+    def generate(self, **options):
+        return generate(COUNTS, **{"anchor": date(2026, 6, 1), "batch_size": 70, **options})
+
+    def test_counts_and_history(self):
+        totals = self.generate()
+        self.assertEqual(get_user_model().objects.count(), 40)
+        self.assertEqual(Restaurant.objects.count(), 4)
+        self.assertEqual(MenuItem.objects.count(), 30)
+        self.assertEqual(Booking.objects.all_objects().count(), 300)
+        self.assertEqual(Review.objects.count(), 80)
+        self.assertEqual(totals["booking history"], BookingHistory.objects.count())
+        self.assertEqual(totals["review history"], ReviewHistory.objects.count())
+        # One 'created' checkpoint per booking and review
+        self.assertEqual(BookingHistory.objects.filter(action="created", is_checkpoint=True).count(), 300)
+        self.assertEqual(ReviewHistory.objects.filter(action="created", is_checkpoint=True).count(), 80)
+        self.assertTrue(MenuItem.allergen_tags.through.objects.exists())
+
+    def test_history_replays_to_the_current_state(self):
+        self.generate()
+        deleted = Booking.objects.all_objects().filter(is_deleted=True)
+        self.assertTrue(deleted.exists())
+        for booking in deleted:
+            self.assertTrue(BookingHistory.objects.filter(booking_pk=booking.pk, action="deleted", booking=None).exists())
+            self.assertLessEqual(booking.created_at, booking.deleted_at)
+        edited = BookingHistory.objects.filter(action="updated").values_list("booking_pk", flat=True)
+        self.assertTrue(edited)
+        for booking in Booking.objects.all_objects().filter(pk__in=edited):
+            self.assertEqual(state_at(Booking, booking.pk)["guests"], booking.guests)
+        for review in Review.objects.filter(pk__in=ReviewHistory.objects.filter(action="updated").values("review_pk")):
+            self.assertEqual(state_at(Review, review.pk)["rating"], review.rating)
+
+    def test_timestamps_are_kept_and_not_after_the_anchor(self):
+        self.generate()
+        anchor = timezone.make_aware(datetime(2026, 6, 1))
+        created = set(Booking.objects.all_objects().values_list("created_at", flat=True))
+        # Not all stamped with the moment of the insert
+        self.assertGreater(len(created), 250)
+        self.assertFalse(Booking.objects.all_objects().filter(created_at__gt=anchor).exists())
+        self.assertFalse(BookingHistory.objects.filter(timestamp__gt=anchor).exists())
+        self.assertFalse(Review.objects.filter(updated_at__gt=anchor).exists())
+
+    def test_history_events_are_in_order(self):
+        # Every booking edited and half of them cancelled
+        self.generate(updated_fraction=1, deleted_fraction=0.5)
+        deleted_at = dict(
+            Booking.objects.all_objects().filter(is_deleted=True).values_list("pk", "deleted_at")
+        )
+        self.assertTrue(deleted_at)
+        for pk, timestamp in BookingHistory.objects.filter(booking_pk__in=deleted_at).values_list("booking_pk", "timestamp"):
+            self.assertLessEqual(timestamp, deleted_at[pk])
+        for history in BookingHistory.objects.filter(action="updated"):
+            created = BookingHistory.objects.get(booking_pk=history.booking_pk, action="created")
+            self.assertLessEqual(created.timestamp, history.timestamp)
+
+    def test_same_seed_same_data(self):
+        fields = ("user__username", "restaurant__name", "date", "guests", "created_at", "is_deleted", "special_requests")
+
+        def rows(prefix):
+            return [
+                (row[0].split("-", 1)[1], *row[1:])
+                for row in Booking.objects.all_objects().filter(user__username__startswith=prefix).order_by("pk").values_list(*fields)
+            ]
+
+        self.generate(prefix="one", seed=7)
+        self.generate(prefix="two", seed=7)
+        self.generate(prefix="three", seed=8)
+        self.assertEqual(rows("one-"), rows("two-"))
+        self.assertNotEqual(rows("one-"), rows("three-"))
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command(
+            "generate_scale_data", *(f"--{name.replace('_', '-')}={count}" for name, count in COUNTS.items()),
+            "--anchor=2026-06-01", stdout=out,
+        )
+        self.assertIn("bookings: 300 in", out.getvalue())
+        self.assertEqual(Booking.objects.all_objects().count(), 300)
+        with self.assertRaisesMessage(CommandError, "already exists"):
+            call_command("generate_scale_data", "--users=1", stdout=io.StringIO())
+        with self.assertRaisesMessage(CommandError, "--anchor"):
+            call_command("generate_scale_data", "--anchor=June", "--prefix=other", stdout=io.StringIO())
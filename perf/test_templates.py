@@ -0,0 +1,43 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from perf.templates import get_engine, template_cache, template_names, uses_cached_loader, warm_up
+
+
+class TemplateWarmUpTests(TestCase):
+    def test_template_names_cover_project_and_app_templates(self):
+        names = template_names()
+        self.assertIn("home.html", names)
+        self.assertIn("partials/_carousel_bookings.html", names)
+        self.assertIn("menu/_menu_body.html", names)
+        self.assertIn("admin/base.html", names)
+        self.assertEqual(len(names), len(set(names)))
+
+    def test_warm_up_fills_the_cached_loader(self):
+        with template_cache(True):
+            self.assertTrue(uses_cached_loader())
+            compiled, errors, seconds = warm_up()
+            self.assertGreater(compiled, 40)
+            self.assertNotIn("home.html", [name for name, _ in errors])
+            loader = get_engine().template_loaders[0]
+            self.assertIn("home.html", loader.get_template_cache)
+            # A warm page loads no templates from disk
+            loader.loaders[0].get_contents = None
+            self.assertEqual(self.client.get("/").status_code, 200)
+
+    def test_warm_up_needs_the_cached_loader(self):
+        with template_cache(False):
+            self.assertFalse(uses_cached_loader())
+            self.assertEqual(warm_up(), (0, [], 0.0))
+
+    def test_command_report(self):
+        get_user_model().objects.create_user("diner", "diner@example.com", "pass1234")
+        out = io.StringIO()
+        call_command("warm_templates", "--report", "--rounds", "2", stdout=out)
+        output = out.getvalue()
+        self.assertIn("Compiled", output)
+        for path in ("/ ", "/menu/", "/bookings/create/", "/users/profile/"):
+            self.assertIn(path, output)
@@ -0,0 +1,102 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from perf import timing
+
+
+class RequestTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        timing.histograms.series.clear()
+        self.user = get_user_model().objects.create_user("diner", "diner@example.com", "pass1234", is_staff=True)
+        self.client.force_login(self.user)
+
+    def test_server_timing_header(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("bookings:booking_list"))
+        header = response["Server-Timing"]
+        self.assertRegex(header, r'^db;dur=[\d.]+;desc="3 queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+        # Rendering happens inside the request
+        tpl, total = (float(value) for value in re.findall(r"(?:tpl|total);dur=([\d.]+)", header))
+        self.assertLessEqual(tpl, total)
+
+    def test_requests_feed_the_histograms(self):
+        self.client.get(reverse("bookings:booking_list"))
+        self.client.get(reverse("bookings:booking_list"))
+        self.client.get("/no-such-page/")
+        series = timing.histograms.snapshot()
+        self.assertEqual(series["bookings:booking_list"]["count"], 2)
+        self.assertEqual(series["bookings:booking_list"]["queries"], 6)
+        self.assertEqual(series["bookings:booking_list"]["buckets"][-1], 2)
+        self.assertEqual(series["unresolved"]["count"], 1)
+
+    def test_header_only_for_staff_and_timing_tokens(self):
+        url = reverse("bookings:booking_list")
+        get_user_model().objects.filter(pk=self.user.pk).update(is_staff=False)
+        self.assertNotIn("Server-Timing", self.client.get(url))
+        self.client.logout()
+        self.assertNotIn("Server-Timing", self.client.get(reverse("home")))
+        self.assertNotIn("Server-Timing", self.client.get(reverse("home"), HTTP_X_SERVER_TIMING="forged"))
+        response = self.client.get(reverse("home"), HTTP_X_SERVER_TIMING=timing.make_token())
+        self.assertIn("queries", response["Server-Timing"])
+
+    @override_settings(PERF_TIMING=False)
+    def test_can_be_switched_off(self):
+        self.assertNotIn("Server-Timing", self.client.get(reverse("bookings:booking_list")))
+
+
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        timing.histograms.series.clear()
+        self.url = reverse("perf:metrics")
+        self.staff = get_user_model().objects.create_user("staff", "staff@example.com", "pass1234", is_staff=True)
+
+    def test_staff_only(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_login(get_user_model().objects.create_user("diner", "diner@example.com", "pass1234"))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+
+    @override_settings(PERF_METRICS_TOKEN="s3cret")
+    def test_bearer_token(self):
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
+
+    def test_prometheus_text_adds_up_every_worker(self):
+        self.client.get(reverse("menu:menu_list"))
+        # Another worker's last flush
+        other = {"menu:menu_list": {
+            "buckets": [1] * len(timing.BUCKETS), "count": 1, "sum": 0.001, "queries": 2,
+            "sections": {"db": 0.0005, "tpl": 0.0002, "cld": 0.0},
+        }}
+        cache.set("perf-metrics:other", other)
+        cache.set(timing.WORKERS_KEY, ["other"])
+
+        self.client.force_login(self.staff)
+        text = self.client.get(self.url).content.decode()
+        self.assertIn("# TYPE yourtable_request_duration_seconds histogram", text)
+        self.assertIn('yourtable_request_duration_seconds_bucket{view="menu:menu_list",le="+Inf"} 2', text)
+        self.assertIn('yourtable_request_duration_seconds_count{view="menu:menu_list"} 2', text)
+        self.assertRegex(text, r'yourtable_request_queries_total\{view="menu:menu_list"\} [3-9]')
+        self.assertIn('yourtable_request_template_seconds_total{view="menu:menu_list"}', text)
+        self.assertIn('yourtable_request_cloudinary_seconds_total{view="menu:menu_list"}', text)
+
+    def test_flush_registers_the_worker(self):
+        self.client.get(reverse("home"))
+        timing.histograms.flush(force=True)
+        self.assertIn(timing.WORKER, cache.get(timing.WORKERS_KEY))
+        self.assertEqual(cache.get(f"perf-metrics:{timing.WORKER}")["home"]["count"], 1)
+
+    def test_flush_drops_workers_whose_copy_expired(self):
+        cache.set("perf-metrics:alive", {})
+        cache.set(timing.WORKERS_KEY, ["gone", "alive"])
+        timing.histograms.flush(force=True)
+        self.assertEqual(cache.get(timing.WORKERS_KEY), ["alive", timing.WORKER])
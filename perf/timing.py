@@ -0,0 +1,303 @@
+"""Per-request timing: Server-Timing headers and latency histograms.
+
+RequestTimingMiddleware measures every request: total time, time and
+number of SQL statements, top-level template rendering and Cloudinary URL
+building. The breakdown goes out in a Server-Timing header, which browser
+dev tools show next to the request:
+
+    Server-Timing: db;dur=4.1;desc="6 queries", tpl;dur=2.3, cld;dur=0.4, total;dur=9.8
+
+Sections overlap (a template that evaluates a queryset counts in both tpl
+and db), so they do not add up to the total. The header is only sent to
+staff users and to requests with an `X-Server-Timing: <make_token()>`
+header, as the benchmark and replay tools send; the timings of the request
+in progress are also left on `request.perf_timings` for other middleware.
+
+Each request is also added to a latency histogram for its URL name (page
+cache hits count as 'pagecache', unresolved paths as 'unresolved'). Every
+gunicorn worker keeps its own histograms and copies them into the site
+cache every PERF_METRICS_FLUSH_SECONDS; workers whose last copy expired
+are dropped from the list. metrics_view() adds up all workers in the
+Prometheus text format for staff users, or for scrapers sending
+`Authorization: Bearer <PERF_METRICS_TOKEN>`.
+
+Measuring costs a few microseconds per request and per query; the
+middleware is on unless PERF_TIMING is false.
+"""
+import contextvars
+import importlib
+import os
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject, empty
+
+from yourtable import caching
+
+
+# Server-Timing name -> (dotted path of the callable to time, Prometheus metric name)
+SECTIONS = {
+    'tpl': ('django.template.backends.django.Template.render', 'template'),
+    'cld': ('cloudinary.utils.cloudinary_url', 'cloudinary'),
+}
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+WORKER = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+WORKERS_KEY = 'perf-metrics:workers'
+TOKEN_HEADER = 'HTTP_X_SERVER_TIMING'
+SALT = 'perf.timing'
+
+_current = contextvars.ContextVar('perf_request_timings', default=None)
+
+
+class RequestTimings:
+    """Seconds and calls per section of the request in progress."""
+
+    def __init__(self):
+        self.sections = {}
+
+    def add(self, name, seconds):
+        total, calls = self.sections.get(name, (0.0, 0))
+        self.sections[name] = (total + seconds, calls + 1)
+
+    def seconds(self, name):
+        return self.sections.get(name, (0.0, 0))[0]
+
+    def calls(self, name):
+        return self.sections.get(name, (0.0, 0))[1]
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add('db', time.perf_counter() - started)
+
+    def header(self, total):
+        parts = [f'db;dur={self.seconds("db") * 1000:.1f};desc="{self.calls("db")} queries"']
+        parts.extend(
+            f'{name};dur={self.seconds(name) * 1000:.1f}'
+            for name in SECTIONS if self.calls(name)
+        )
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+
+def timed(name, func):
+    """Wrap `func` to add its duration to the current request's `name` section."""
+    if getattr(func, 'perf_section', None):
+        return func
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = _current.get()
+        if timings is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.add(name, time.perf_counter() - started)
+
+    wrapper.perf_section = name
+    return wrapper
+
+
+def instrument():
+    """Wrap the SECTIONS callables; those whose package is not installed are skipped."""
+    for name, (path, _metric) in SECTIONS.items():
+        module_path, _, attribute = path.rpartition('.')
+        owner = None
+        try:
+            owner = importlib.import_module(module_path)
+        except ImportError:
+            # A method: import the module and look the class up
+            module_path, _, class_name = module_path.rpartition('.')
+            try:
+                owner = getattr(importlib.import_module(module_path), class_name)
+            except (ImportError, AttributeError):
+                continue
+        if hasattr(owner, attribute):
+            setattr(owner, attribute, timed(name, getattr(owner, attribute)))
+
+
+class Histograms:
+    """Per-URL-name request latency histograms and section totals for this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}
+        self.flushed = time.monotonic()
+
+    def observe(self, view, total, timings):
+        with self.lock:
+            series = self.series.get(view)
+            if series is None:
+                series = self.series[view] = {
+                    'buckets': [0] * len(BUCKETS), 'count': 0, 'sum': 0.0,
+                    'queries': 0, 'sections': dict.fromkeys(['db', *SECTIONS], 0.0),
+                }
+            for index, bound in enumerate(BUCKETS):
+                if total <= bound:
+                    series['buckets'][index] += 1
+            series['count'] += 1
+            series['sum'] += total
+            series['queries'] += timings.calls('db')
+            for name in series['sections']:
+                series['sections'][name] += timings.seconds(name)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                view: {**series, 'buckets': list(series['buckets']), 'sections': dict(series['sections'])}
+                for view, series in self.series.items()
+            }
+
+    def flush(self, force=False):
+        """Copy this worker's histograms into the site cache, at most every PERF_METRICS_FLUSH_SECONDS."""
+        now = time.monotonic()
+        if not force and now - self.flushed < settings.PERF_METRICS_FLUSH_SECONDS:
+            return
+        self.flushed = now
+        cache = caching.get_cache()
+        cache.set(f'perf-metrics:{WORKER}', self.snapshot(), settings.PERF_METRICS_TTL)
+        workers = cache.get(WORKERS_KEY) or []
+        # Workers that stopped (restarts, scaling down) leave an expired copy behind
+        alive = cache.get_many([f'perf-metrics:{worker}' for worker in workers if worker != WORKER])
+        registered = [worker for worker in workers if f'perf-metrics:{worker}' in alive]
+        registered.append(WORKER)
+        if registered != workers:
+            # Another worker registering at the same moment may be dropped; it re-registers on its next flush
+            cache.set(WORKERS_KEY, registered, None)
+
+
+histograms = Histograms()
+
+
+def merged_series():
+    """This worker's live histograms plus the last copy of every other worker's."""
+    cache = caching.get_cache()
+    workers = [worker for worker in cache.get(WORKERS_KEY) or [] if worker != WORKER]
+    found = cache.get_many([f'perf-metrics:{worker}' for worker in workers])
+    merged = {}
+    for snapshot in [*found.values(), histograms.snapshot()]:
+        for view, series in snapshot.items():
+            target = merged.get(view)
+            if target is None:
+                merged[view] = {**series, 'buckets': list(series['buckets']), 'sections': dict(series['sections'])}
+                continue
+            target['buckets'] = [a + b for a, b in zip(target['buckets'], series['buckets'])]
+            for field in ('count', 'sum', 'queries'):
+                target[field] += series[field]
+            for name, seconds in series['sections'].items():
+                target['sections'][name] = target['sections'].get(name, 0.0) + seconds
+    return merged
+
+
+def prometheus_text(series):
+    """Render merged_series() in the Prometheus text exposition format."""
+    def label(view):
+        return view.replace('\\', '\\\\').replace('"', '\\"')
+
+    lines = [
+        '# HELP yourtable_request_duration_seconds Request latency by URL name.',
+        '# TYPE yourtable_request_duration_seconds histogram',
+    ]
+    for view, data in sorted(series.items()):
+        for bound, count in zip(BUCKETS, data['buckets']):
+            lines.append(f'yourtable_request_duration_seconds_bucket{{view="{label(view)}",le="{bound}"}} {count}')
+        lines.append(f'yourtable_request_duration_seconds_bucket{{view="{label(view)}",le="+Inf"}} {data["count"]}')
+        lines.append(f'yourtable_request_duration_seconds_sum{{view="{label(view)}"}} {data["sum"]:.6f}')
+        lines.append(f'yourtable_request_duration_seconds_count{{view="{label(view)}"}} {data["count"]}')
+
+    lines += [
+        '# HELP yourtable_request_queries_total SQL statements run, by URL name.',
+        '# TYPE yourtable_request_queries_total counter',
+    ]
+    lines += [f'yourtable_request_queries_total{{view="{label(view)}"}} {data["queries"]}' for view, data in sorted(series.items())]
+
+    metrics = {'db': 'db', **{name: metric for name, (_path, metric) in SECTIONS.items()}}
+    for name, metric in metrics.items():
+        lines += [
+            f'# HELP yourtable_request_{metric}_seconds_total Time spent in {metric}, by URL name.',
+            f'# TYPE yourtable_request_{metric}_seconds_total counter',
+        ]
+        lines += [
+            f'yourtable_request_{metric}_seconds_total{{view="{label(view)}"}} {data["sections"].get(name, 0.0):.6f}'
+            for view, data in sorted(series.items())
+        ]
+    return '\n'.join(lines) + '\n'
+
+
+def make_token():
+    """A token that makes the response carry Server-Timing, valid for PERF_TIMING_TOKEN_MAX_AGE seconds."""
+    return signing.TimestampSigner(salt=SALT).sign('server-timing')
+
+
+def shows_timing(request):
+    """True for staff users and requests with a valid timing token."""
+    token = request.META.get(TOKEN_HEADER)
+    if token:
+        try:
+            signing.TimestampSigner(salt=SALT).unsign(token, max_age=settings.PERF_TIMING_TOKEN_MAX_AGE)
+            return True
+        except signing.BadSignature:
+            pass
+    user = getattr(request, 'user', None)
+    if user is None or (isinstance(user, SimpleLazyObject) and user._wrapped is empty):
+        # Not loaded by the request; looking the user up here would add queries
+        return False
+    return user.is_active and user.is_staff
+
+
+def view_name(request, response):
+    if response.get('X-Page-Cache') in ('HIT', 'STALE'):
+        return 'pagecache'
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None and match.view_name else 'unresolved'
+
+
+class RequestTimingMiddleware:
+    """Time each request, add a Server-Timing header and feed the latency histograms."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PERF_TIMING:
+            return self.get_response(request)
+        request.perf_timings = timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings.record_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+        if shows_timing(request):
+            response['Server-Timing'] = timings.header(total)
+        histograms.observe(view_name(request, response), total, timings)
+        histograms.flush()
+        return response
+
+
+def metrics_view(request):
+    """Prometheus metrics for staff users, or for requests with the PERF_METRICS_TOKEN bearer token."""
+    token = settings.PERF_METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    allowed = request.user.is_active and request.user.is_staff
+    if not allowed and token and authorization.startswith('Bearer '):
+        allowed = constant_time_compare(authorization[len('Bearer '):], token)
+    if not allowed:
+        return HttpResponse('Forbidden\n', status=403, content_type='text/plain')
+    return HttpResponse(prometheus_text(merged_series()), content_type='text/plain; version=0.0.4; charset=utf-8')
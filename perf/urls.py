@@ -0,0 +1,9 @@
+from django.urls import path
+
+from perf.timing import metrics_view
+
+app_name = 'perf'
+
+urlpatterns = [
+    path('metrics/', metrics_view, name='metrics'),
+]
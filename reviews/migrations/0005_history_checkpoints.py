@@ -0,0 +1,22 @@
+# Generated by Django 4.2.25 on 2026-10-18 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_review_guest_name_alter_review_user_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reviewhistory',
+            name='is_checkpoint',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='reviewhistory',
+            index=models.Index(fields=['review_pk', 'id'], name='reviewhist_pk_id_idx'),
+        ),
+    ]
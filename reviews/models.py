@@ -1,5 +1,25 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+
+import audit
+from audit.querysets import AuditedQuerySet
+from yourtable import caching
+
+
+class ReviewQuerySet(AuditedQuerySet):
+	"""Audited bulk operations that also invalidate cached reviews."""
+
+	def audited_update(self, **kwargs):
+		# update() skips auto_now, and list pages are validated against updated_at
+		kwargs.setdefault('updated_at', timezone.now())
+		return super().audited_update(**kwargs)
+
+	def _after_audited_update(self, before, after):
+		caching.invalidate_instances(after, using=self.db)
+
+	def _after_audited_bulk_create(self, objs):
+		caching.invalidate_instances(objs, using=self.db)
 
 
 class Review(models.Model):
@@ -13,6 +33,17 @@ class Review(models.Model):
 	comment = models.TextField(blank=True)
 	image = models.ImageField(upload_to='reviews/', blank=True, null=True)
 	created_at = models.DateTimeField(auto_now_add=True)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	# delete(), audited_update() and audited_bulk_create() record ReviewHistory in bulk
+	objects = ReviewQuerySet.as_manager()
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['-created_at', '-id'], name='review_created_idx'),
+			# Max(updated_at) is the review list's Last-Modified
+			models.Index(fields=['updated_at'], name='review_updated_idx'),
+		]
 
 	def __str__(self):
 		name = self.user.get_full_name() if self.user else self.guest_name or "Anonymous"
@@ -35,9 +66,16 @@ class ReviewHistory(models.Model):
 	action = models.CharField(max_length=10, choices=ACTIONS)
 	timestamp = models.DateTimeField(auto_now_add=True)
 	data = models.JSONField(null=True, blank=True)
+	# Full snapshot; other rows hold only the fields that changed (see audit.history)
+	is_checkpoint = models.BooleanField(default=True)
 
 	class Meta:
 		ordering = ['-timestamp']
+		indexes = [models.Index(fields=['review_pk', 'id'], name='reviewhist_pk_id_idx')]
 
 	def __str__(self):
 		return f"{self.get_action_display()} review {self.review_pk} at {self.timestamp.isoformat()}"
+
+
+audit.register(Review, ReviewHistory, fields=['user', 'guest_name', 'rating', 'comment', 'image'])
+caching.register(Review, tags=['reviews'])
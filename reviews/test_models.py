@@ -21,4 +21,18 @@ class ReviewHistoryTests(TestCase):
 
     def test_str_uses_guest_name_for_anonymous(self):
         review = Review.objects.create(guest_name="Walk-in", rating=5, comment="Great meal")
-        self.assertEqual(str(review), "Review(Walk-in, 5)")
\ No newline at end of file
+        self.assertEqual(str(review), "Review(Walk-in, 5)")
+
+    def test_queryset_delete_records_history_once_per_review(self):
+        reviews = Review.objects.bulk_create(
+            [Review(guest_name=f"Guest {i}", rating=4, comment="Fine") for i in range(3)]
+        )
+        Review.objects.filter(pk__in=[r.pk for r in reviews]).delete()
+        self.assertFalse(Review.objects.filter(pk__in=[r.pk for r in reviews]).exists())
+        self.assertEqual(ReviewHistory.objects.filter(action="deleted").count(), 3)
+
+    def test_audited_update_records_history(self):
+        review = Review.objects.create(user=self.user, rating=3, comment="Ok")
+        Review.objects.filter(pk=review.pk).audited_update(rating=5)
+        history = ReviewHistory.objects.filter(review_pk=review.pk, action="updated").get()
+        self.assertEqual(history.data["rating"], 5)
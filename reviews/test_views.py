@@ -1,7 +1,11 @@
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 from reviews.models import Review, ReviewHistory
+from reviews.views import ReviewListView
 
 
 class ReviewViewTests(TestCase):
@@ -129,3 +133,56 @@ class ReviewViewTests(TestCase):
         # Check that new history entry was created
         updated_count = ReviewHistory.objects.filter(review_pk=review.pk).count()
         self.assertGreater(updated_count, initial_count)
+
+
+class ReviewListConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="reviewer", password="pass1234")
+        self.review = Review.objects.create(user=self.user, rating=5, comment="Lovely")
+        self.url = reverse("reviews:review_list")
+
+    def revalidate(self, response):
+        return self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_unchanged_list_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertIn("Cookie", response["Vary"])
+        self.assertIn("Last-Modified", response)
+        with self.assertNumQueries(0):
+            again = self.revalidate(response)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b"")
+        modified = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(modified.status_code, 304)
+
+    def test_adds_edits_and_deletes_change_the_etag(self):
+        changes = [
+            lambda: Review.objects.create(guest_name="Sam", rating=4),
+            lambda: Review.objects.filter(pk=self.review.pk).audited_update(rating=3),
+            lambda: Review.objects.filter(pk=self.review.pk).delete(),
+        ]
+        for change in changes:
+            response = self.client.get(self.url)
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            self.assertEqual(self.revalidate(response).status_code, 200)
+
+    def test_etag_depends_on_the_user(self):
+        anonymous = self.client.get(self.url)
+        self.client.login(username="reviewer", password="pass1234")
+        response = self.revalidate(anonymous)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertEqual(self.revalidate(response).status_code, 304)
+
+    def test_pending_messages_are_never_hidden_behind_a_304(self):
+        self.client.login(username="reviewer", password="pass1234")
+        with mock.patch.object(ReviewListView, "get_content_version", return_value="pinned"):
+            etag = self.client.get(self.url)["ETag"]
+            self.client.post(
+                reverse("reviews:review_update", args=[self.review.pk]), {"rating": 5, "comment": "Lovely"}
+            )
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertContains(response, "Review updated successfully!")
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
@@ -1,23 +1,55 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
-from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import redirect_to_login
 from django.contrib import messages
 from django.utils import timezone
 from django.apps import apps
+from django.db.models import Max
+from yourtable import caching
+from yourtable.mixins import ConditionalGetMixin, OwnerRequiredMixin
+from yourtable.pagination import KeysetListMixin
 from .models import Review
 
 
-class ReviewListView(ListView):
+class ReviewListView(ConditionalGetMixin, KeysetListMixin, ListView):
 	"""
-	List all reviews.
+	List all reviews, newest first, a page at a time with a "Load more" button.
 	Authenticated users see all reviews.
 	Anonymous users see only reviews with a guest_name.
+	Repeat visits get a 304 while no review was added, edited or deleted.
 	"""
 	model = Review
 	template_name = 'reviews/review_list.html'
+	query_budget = {'GET': 4}
+	fragment_template_name = 'reviews/_review_items.html'
 	context_object_name = 'reviews'
+	keyset_ordering = ('-created_at', '-id')
+
+	def get_queryset(self):
+		# The template shows each reviewer's name
+		return super().get_queryset().select_related('user')
+
+	def review_stats(self):
+		# The tag version changes on every save and delete; the latest update
+		# time is read over review_updated_idx once per version
+		if not hasattr(self, '_review_stats'):
+			self._review_stats = {
+				'version': caching.tag_versions(['reviews'])['reviews'],
+				'updated': caching.get_or_set('review-updated', self.latest_update, tags=['reviews']),
+			}
+		return self._review_stats
+
+	def latest_update(self):
+		return Review.objects.aggregate(updated=Max('updated_at'))['updated']
+
+	def get_content_version(self):
+		stats = self.review_stats()
+		return f"{stats['version']}|{stats['updated'] and stats['updated'].isoformat()}"
+
+	def get_last_modified(self):
+		return self.review_stats()['updated']
 
 
 class ReviewCreateView(CreateView):
@@ -28,6 +60,7 @@ class ReviewCreateView(CreateView):
 	"""
 	model = Review
 	template_name = 'reviews/review_form.html'
+	query_budget = {'GET': 2, 'POST': 4}
 	success_url = reverse_lazy('reviews:review_list')
 
 	def get_form_fields(self):
@@ -61,38 +94,30 @@ class ReviewCreateView(CreateView):
 		return super().form_valid(form)
 
 
-class ReviewUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class ReviewUpdateView(LoginRequiredMixin, OwnerRequiredMixin, UpdateView):
 	"""
 	Allow authenticated users to edit their own reviews.
 	"""
 	model = Review
 	template_name = 'reviews/review_form.html'
+	query_budget = {'GET': 3, 'POST': 6}
 	success_url = reverse_lazy('reviews:review_list')
 	fields = ['rating', 'comment', 'image']
 
-	def test_func(self):
-		"""Only the review owner can edit their review."""
-		review = self.get_object()
-		return review.user == self.request.user
-
 	def form_valid(self, form):
 		messages.success(self.request, 'Review updated successfully!')
 		return super().form_valid(form)
 
 
-class ReviewDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class ReviewDeleteView(LoginRequiredMixin, OwnerRequiredMixin, DeleteView):
 	"""
 	Allow authenticated users to delete their own reviews.
 	"""
 	model = Review
 	template_name = 'reviews/review_confirm_delete.html'
+	query_budget = {'GET': 3, 'POST': 6}
 	success_url = reverse_lazy('reviews:review_list')
 
-	def test_func(self):
-		"""Only the review owner can delete their review."""
-		review = self.get_object()
-		return review.user == self.request.user
-
 	def delete(self, request, *args, **kwargs):
 		messages.success(request, 'Review deleted successfully!')
 		return super().delete(request, *args, **kwargs)
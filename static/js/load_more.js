@@ -0,0 +1,39 @@
+/* ======================================
+   YourTable - "Load more" for keyset-paginated lists
+   ====================================== */
+
+/**
+ * Links rendered by templates/load_more.html carry the next cursor in their
+ * href. Fetch it as JSON, append the returned HTML to the list named in
+ * data-load-more and point the link at the following page (or hide it).
+ */
+document.addEventListener("click", async (event) => {
+    const link = event.target.closest("[data-load-more]");
+    if (!link) {
+        return;
+    }
+    event.preventDefault();
+    const target = document.querySelector(link.dataset.loadMore);
+    const url = new URL(link.href, window.location.href);
+    url.searchParams.set("format", "json");
+    link.classList.add("disabled");
+    try {
+        const response = await fetch(url, { headers: { "X-Requested-With": "XMLHttpRequest" } });
+        if (!response.ok) {
+            throw new Error(response.statusText);
+        }
+        const data = await response.json();
+        target.insertAdjacentHTML("beforeend", data.html);
+        if (data.next_cursor) {
+            const next = new URL(link.href, window.location.href);
+            next.searchParams.set(link.dataset.cursorParam || "cursor", data.next_cursor);
+            link.href = next.pathname + next.search;
+        } else {
+            link.closest(".load-more").hidden = true;
+        }
+    } catch (error) {
+        showToast("Could not load more items. Please try again.", "error");
+    } finally {
+        link.classList.remove("disabled");
+    }
+});
@@ -0,0 +1,58 @@
+/* ======================================
+   YourTable - Search typeahead
+   ====================================== */
+
+/**
+ * Inputs with data-typeahead="<suggest url>" show matching dishes and
+ * restaurants while the user types. The results list is the next
+ * [data-typeahead-results] element in the same form.
+ */
+(function () {
+    const DELAY_MS = 150;
+
+    function render(container, results) {
+        container.replaceChildren(...results.map((result) => {
+            const link = document.createElement("a");
+            link.href = result.url;
+            link.className = "list-group-item list-group-item-action";
+            link.textContent = result.title;
+            return link;
+        }));
+        container.hidden = results.length === 0;
+    }
+
+    document.querySelectorAll("[data-typeahead]").forEach((input) => {
+        const container = input.form.querySelector("[data-typeahead-results]");
+        let timer = null;
+        let latest = 0;
+
+        input.addEventListener("input", () => {
+            clearTimeout(timer);
+            const query = input.value.trim();
+            if (query.length < 2) {
+                render(container, []);
+                return;
+            }
+            timer = setTimeout(async () => {
+                const request = ++latest;
+                const url = new URL(input.dataset.typeahead, window.location.href);
+                url.searchParams.set("q", query);
+                try {
+                    const response = await fetch(url, { headers: { "X-Requested-With": "XMLHttpRequest" } });
+                    const data = await response.json();
+                    // Ignore answers to queries the user has already typed past
+                    if (request === latest) {
+                        render(container, data.results);
+                    }
+                } catch (error) {
+                    render(container, []);
+                }
+            }, DELAY_MS);
+        });
+
+        input.addEventListener("blur", () => {
+            // Leave time for a click on a suggestion to land
+            setTimeout(() => { container.hidden = true; }, 200);
+        });
+    });
+})();
@@ -2,14 +2,19 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseBadRequest
+from perf.budgets import query_budget
+from yourtable.pagination import InvalidCursor, KeysetPaginator, load_more_response, wants_fragment
 from .forms import ProfilePictureForm
 from .models import Profile
 
 # Create your views here.
 
 @login_required
+@query_budget({'GET': 9})
 def profile_view(request):
     """User profile showing all booking history and changes."""
+    from audit.history import annotate_changes, describe_changes
     from bookings.models import Booking, BookingHistory
     
     # Ensure user has a profile (for existing users who don't have one yet)
@@ -25,24 +30,40 @@ def profile_view(request):
     else:
         form = ProfilePictureForm(instance=profile)
     
-    # Get all bookings (including soft-deleted) for the user
+    # Bookings (including soft-deleted) and history, a page of each at a time
     try:
         base_manager = getattr(Booking, 'all_objects', Booking.objects)
-        bookings = base_manager.filter(user=request.user).order_by('-created_at')
+        bookings = base_manager.filter(user=request.user)
     except Exception:
-        bookings = Booking.objects.filter(user=request.user).order_by('-created_at')
-    
-    # Get all booking history for the user
-    history = BookingHistory.objects.filter(user=request.user).order_by('-timestamp')[:50]
-    
+        bookings = Booking.objects.filter(user=request.user)
+    bookings = bookings.select_related('restaurant')
+    history = BookingHistory.objects.filter(user=request.user)
+    booking_pages = KeysetPaginator(bookings, ('-created_at', '-id'))
+    history_pages = KeysetPaginator(history, ('-timestamp', '-id'))
+    try:
+        if wants_fragment(request):
+            # "Load more" for one of the two lists
+            if 'history_cursor' in request.GET:
+                page = history_pages.page(request.GET['history_cursor'])
+                describe_changes(Booking, annotate_changes(Booking, page.items), 'd M Y, H:i')
+                return load_more_response(request, page, 'registration/_history_items.html', {})
+            page = booking_pages.page(request.GET.get('bookings_cursor'))
+            return load_more_response(request, page, 'registration/_profile_booking_items.html', {})
+        bookings_page = booking_pages.page(request.GET.get('bookings_cursor'))
+        history_page = history_pages.page(request.GET.get('history_cursor'))
+    except InvalidCursor:
+        return HttpResponseBadRequest('Invalid cursor')
+    describe_changes(Booking, annotate_changes(Booking, history_page.items), 'd M Y, H:i')
+
     context = {
-        'bookings': bookings,
-        'booking_history': history,
+        'bookings': bookings_page,
+        'booking_history': history_page,
         'profile_form': form,
     }
     return render(request, 'registration/profile.html', context)
 
 
+@query_budget({'GET': 0, 'POST': 5})
 def signup(request):
     if request.method == 'POST':
         form = UserCreationForm(request.POST)
@@ -0,0 +1,172 @@
+"""Site cache tier: versioned keys and dependency tags.
+
+The backend is chosen by the CACHE_URL environment variable (see
+cache_config()): locmem for development, a shared file directory or a
+Redis server in production. A locmem cache is private to each process, so
+with several gunicorn workers only a shared backend keeps them consistent.
+
+Cached values are addressed by a name, some key parts and the tags they
+depend on:
+
+    html = caching.get_or_set('menu-list', render, tags=['menu'])
+
+Each tag has a version number stored in the cache, and the key of a value
+embeds the current version of every tag it depends on. Invalidating a tag
+bumps its version, so every value built from the old version simply stops
+being looked up and expires on its own; nothing has to be found and deleted.
+
+Models registered with register() bump their tags whenever an instance is
+saved or deleted, once the transaction commits.
+
+`manage.py check --deploy` fails while the backend is process-local, since
+each worker would then invalidate only its own copies.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+
+CACHE_ALIAS = 'default'
+TAG_PREFIX = 'tag:'
+SHARED_SCHEMES = ('file', 'redis', 'rediss')
+
+
+def cache_config(url, **options):
+    """
+    Return a CACHES entry for a cache URL:
+
+        locmem://[name]           per-process memory (the default)
+        file:///path/to/dir       a directory shared by the workers of one host
+        redis://host:6379/0       a Redis-protocol server (needs the redis package)
+        dummy://                  no caching
+    """
+    scheme, _, location = url.partition('://')
+    backends = {
+        'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+        'file': 'django.core.cache.backends.filebased.FileBasedCache',
+        'redis': 'django.core.cache.backends.redis.RedisCache',
+        'rediss': 'django.core.cache.backends.redis.RedisCache',
+        'dummy': 'django.core.cache.backends.dummy.DummyCache',
+    }
+    if scheme not in backends:
+        raise ImproperlyConfigured(f'Unsupported CACHE_URL scheme: {scheme!r}')
+    if scheme.startswith('redis'):
+        location = url
+    elif scheme == 'file' and not location:
+        raise ImproperlyConfigured('A file:// CACHE_URL needs a directory, e.g. file:///var/tmp/yourtable-cache')
+    return {'BACKEND': backends[scheme], 'LOCATION': location, **options}
+
+
+def is_shared(url):
+    """True if every process configured with the cache URL `url` sees the same entries."""
+    return url.partition('://')[0] in SHARED_SCHEMES
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs=None, **kwargs):
+    if settings.CACHES[CACHE_ALIAS]['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache':
+        return []
+    return [checks.Error(
+        'The cache is private to each process, so each gunicorn worker keeps serving what the others invalidated.',
+        hint='Set CACHE_URL to redis://host:6379/0, or file:///dir for the workers of one host; dummy:// turns caching off.',
+        id='yourtable.E001',
+    )]
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def tag_versions(tags):
+    """Return {tag: version} for `tags`, creating missing tags, in one round trip when all exist."""
+    tags = sorted(set(tags))
+    if not tags:
+        return {}
+    cache = get_cache()
+    found = cache.get_many([TAG_PREFIX + tag for tag in tags])
+    versions = {}
+    for tag in tags:
+        version = found.get(TAG_PREFIX + tag)
+        if version is None:
+            # Start from the clock so a tag evicted from the cache never comes
+            # back with a version an old value was stored under
+            cache.add(TAG_PREFIX + tag, time.time_ns() // 1000, timeout=None)
+            version = cache.get(TAG_PREFIX + tag)
+        versions[tag] = version
+    return versions
+
+
+def make_key(name, *parts, tags=()):
+    """Return the cache key of `name` and `parts` at the current versions of `tags`."""
+    versions = tag_versions(tags)
+    signature = '|'.join([*map(str, parts), *(f'{tag}={v}' for tag, v in versions.items())])
+    return f'{name}:{hashlib.md5(signature.encode()).hexdigest()}'
+
+
+def get_or_set(name, compute, *parts, tags=(), timeout=None):
+    """Return the cached value for the key, computing and storing it on a miss."""
+    cache = get_cache()
+    key = make_key(name, *parts, tags=tags)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        if timeout is None:
+            cache.set(key, value)
+        else:
+            cache.set(key, value, timeout)
+    return value
+
+
+def bump(*tags):
+    """Invalidate every value that depends on `tags`, immediately."""
+    cache = get_cache()
+    for tag in set(tags):
+        try:
+            cache.incr(TAG_PREFIX + tag)
+        except ValueError:
+            # Never read yet, or evicted: any fresh version invalidates
+            cache.set(TAG_PREFIX + tag, time.time_ns() // 1000, timeout=None)
+
+
+def invalidate(*tags, using=None):
+    """Bump `tags` once the current transaction commits (at once outside a transaction)."""
+    transaction.on_commit(lambda: bump(*tags), using=using)
+
+
+_registry = {}
+
+
+def model_tag(model):
+    return model._meta.label_lower
+
+
+def tags_for(instance):
+    """The tags bumped when `instance` changes: its model, itself, and any registered extras."""
+    model = type(instance)._meta.concrete_model
+    extra = _registry.get(model, ())
+    return [model_tag(model), f'{model_tag(model)}:{instance.pk}', *extra]
+
+
+def register(model, tags=()):
+    """Bump the tags of `model` instances on save and delete. `tags` are extra tags to bump."""
+    _registry[model] = tuple(tags)
+    uid = f'caching:{model_tag(model)}'
+    post_save.connect(_changed, sender=model, weak=False, dispatch_uid=uid + ':save')
+    post_delete.connect(_changed, sender=model, weak=False, dispatch_uid=uid + ':delete')
+
+
+def invalidate_instances(instances, using=None):
+    """Bump the tags of several instances at once, for bulk changes that send no signals."""
+    tags = {tag for instance in instances for tag in tags_for(instance)}
+    if tags:
+        invalidate(*tags, using=using)
+
+
+def _changed(sender, instance, using=None, **kwargs):
+    invalidate(*tags_for(instance), using=using)
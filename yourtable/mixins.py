@@ -0,0 +1,74 @@
+"""View mixins shared by the apps."""
+import hashlib
+
+from django.contrib.auth.mixins import UserPassesTestMixin
+from django.contrib.messages import get_messages
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+
+class OwnerRequiredMixin(UserPassesTestMixin):
+    """
+    Allow only the owner of the view's object, and load that object once.
+
+    UserPassesTestMixin runs test_func() before get()/post(), and both need
+    the object. get_object() is memoized for the request, so the permission
+    check and the view share one SELECT. Ownership is decided on the foreign
+    key value (`<owner_field>_id`), without loading the owner.
+    """
+    owner_field = 'user'
+
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+        if not hasattr(self, '_owned_object'):
+            self._owned_object = super().get_object()
+        return self._owned_object
+
+    def test_func(self):
+        obj = self.get_object()
+        return getattr(obj, f'{self.owner_field}_id') == self.request.user.pk
+
+
+class ConditionalGetMixin:
+    """
+    Answer GET and HEAD with 304 Not Modified when the client's copy is current.
+
+    Views implement get_content_version(), returning something that changes
+    whenever the page would (a cache tag version, the newest timestamp and a
+    row count...), and may implement get_last_modified(). Both must be cheap:
+    they run before, and instead of, rendering the page.
+
+    The page greets the user by name, so the ETag includes the user and the
+    response varies on Cookie. Authenticated pages are marked private. A
+    request with flash messages waiting is always rendered in full, so the
+    messages are not lost behind a 304.
+    """
+
+    def get_content_version(self):
+        return None
+
+    def get_last_modified(self):
+        return None
+
+    def get_etag(self):
+        version = self.get_content_version()
+        if version is None:
+            return None
+        user = self.request.user.pk if self.request.user.is_authenticated else 'anonymous'
+        return hashlib.md5(f'{type(self).__name__}|{version}|{user}'.encode()).hexdigest()
+
+    def get(self, request, *args, **kwargs):
+        view = super().get
+        if not len(get_messages(request)):
+            view = condition(
+                etag_func=lambda request, *args, **kwargs: self.get_etag(),
+                last_modified_func=lambda request, *args, **kwargs: self.get_last_modified(),
+            )(view)
+        response = view(request, *args, **kwargs)
+        patch_vary_headers(response, ('Cookie',))
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+        else:
+            patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+        return response
@@ -0,0 +1,138 @@
+"""Full-page cache for anonymous visitors.
+
+Home, about and the menu pages are the same HTML for every anonymous
+visitor. PageCacheMiddleware sits ahead of the session, CSRF, auth and
+message middleware and answers those requests from the site cache (see
+yourtable/caching.py), so a burst of anonymous traffic mostly never reaches
+a view, the template engine or the database.
+
+Only some requests are served from, or stored in, the cache:
+
+- GET requests for a path matching PAGE_CACHE_URLS;
+- without a session or messages cookie: signed-in visitors, and anonymous
+  ones with a flash message waiting, always get the full stack;
+- and only 200 responses that set no cookie, used no CSRF token, and are
+  not marked private or no-store.
+
+Each PAGE_CACHE_URLS entry lists the cache tags its pages depend on, so
+saving a menu item purges the menu pages. Every page also depends on the
+'pages' tag; `manage.py purge_page_cache` bumps it, e.g. after a deploy.
+Purges only reach the processes sharing the cache, so PAGE_CACHE is off
+unless CACHE_URL names a shared backend.
+
+Regeneration is single-flight: when a page is missing, one request takes a
+lock and renders it while the others are answered with the previous copy
+of the page (kept PAGE_CACHE_STALE_TIMEOUT seconds), if there is one, or
+wait up to PAGE_CACHE_LOCK_WAIT seconds for the new copy before rendering it
+themselves.
+"""
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from yourtable import caching
+
+
+PAGES_TAG = 'pages'
+POLL_INTERVAL = 0.05
+UNCACHEABLE_CONTROL = ('private', 'no-store', 'no-cache')
+# Per-response headers that are set again on the way out
+SKIPPED_HEADERS = ('set-cookie', 'content-length')
+
+
+def page_tags(path):
+    """The tags of the first PAGE_CACHE_URLS pattern matching `path`, or None when it is not cached."""
+    for pattern, tags in settings.PAGE_CACHE_URLS:
+        if re.search(pattern, path):
+            return [PAGES_TAG, *tags]
+    return None
+
+
+def purge(*tags):
+    """Drop every cached page, or those depending on `tags`."""
+    caching.bump(*(tags or (PAGES_TAG,)))
+
+
+class PageCacheMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tags = self.cacheable_request(request)
+        if tags is None:
+            return self.get_response(request)
+
+        cache = caching.get_cache()
+        url = request.build_absolute_uri()
+        key = caching.make_key('page', url, tags=tags)
+        entry = cache.get(key)
+        if entry is not None:
+            return self.respond(request, entry, 'HIT')
+
+        # Single flight: one request renders the page, the rest use the last copy or wait
+        lock = f'{key}:lock'
+        previous = f'page-previous:{hashlib.md5(url.encode()).hexdigest()}'
+        if not cache.add(lock, 1, settings.PAGE_CACHE_LOCK_TIMEOUT):
+            entry = cache.get(previous)
+            if entry is not None:
+                return self.respond(request, entry, 'STALE')
+            deadline = time.monotonic() + settings.PAGE_CACHE_LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(POLL_INTERVAL)
+                entry = cache.get(key)
+                if entry is not None:
+                    return self.respond(request, entry, 'HIT')
+            response = self.get_response(request)
+            response['X-Page-Cache'] = 'MISS'
+            return response
+
+        try:
+            response = self.get_response(request)
+            if self.cacheable_response(request, response):
+                entry = self.entry(response)
+                cache.set(key, entry, settings.PAGE_CACHE_TIMEOUT)
+                cache.set(previous, entry, settings.PAGE_CACHE_STALE_TIMEOUT)
+            response['X-Page-Cache'] = 'MISS'
+        finally:
+            cache.delete(lock)
+        return response
+
+    def cacheable_request(self, request):
+        """Return the request's page tags if it may use the cache, else None."""
+        if not settings.PAGE_CACHE or request.method != 'GET':
+            return None
+        if settings.SESSION_COOKIE_NAME in request.COOKIES or 'messages' in request.COOKIES:
+            return None
+        return page_tags(request.path_info)
+
+    def cacheable_response(self, request, response):
+        if response.status_code != 200 or response.streaming or response.cookies:
+            return False
+        # The page rendered a CSRF token (a form), which must not be shared
+        if request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+            return False
+        control = response.get('Cache-Control', '').lower()
+        return not any(directive in control for directive in UNCACHEABLE_CONTROL)
+
+    def entry(self, response):
+        headers = [(name, value) for name, value in response.items() if name.lower() not in SKIPPED_HEADERS]
+        return response.status_code, headers, response.content
+
+    def respond(self, request, entry, status):
+        status_code, headers, content = entry
+        response = HttpResponse(content, status=status_code)
+        for name, value in headers:
+            response[name] = value
+        response['X-Page-Cache'] = status
+        last_modified = response.get('Last-Modified')
+        return get_conditional_response(
+            request,
+            etag=response.get('ETag'),
+            last_modified=parse_http_date_safe(last_modified) if last_modified else None,
+            response=response,
+        )
@@ -0,0 +1,122 @@
+"""Keyset ("load more") pagination.
+
+Instead of OFFSET and a COUNT(*), each page asks for the rows that sort after
+the last row already shown, so fetching page 50 costs the same index seek as
+page 1 and rows added meanwhile never shift or repeat items. The position is
+handed to the client as an opaque, signed cursor.
+
+The ordering must be on non-null fields and end with a unique one (usually
+`id`), e.g. ('date', 'id') or ('-created_at', '-id').
+"""
+from django.core import signing
+from django.db.models import Q
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.template.loader import render_to_string
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    """One page of results plus the cursor for the next one (None on the last page)."""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+class KeysetPaginator:
+    """Paginate `queryset` by `ordering`, `per_page` rows at a time."""
+
+    def __init__(self, queryset, ordering, per_page=20):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self._salt = f'keyset:{queryset.model._meta.label}:{",".join(self.ordering)}'
+
+    def page(self, cursor=None):
+        """Return the page after `cursor` (the first page if None); raises InvalidCursor."""
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(self._decode(cursor)))
+        # One extra row tells whether there is a next page without counting
+        rows = list(queryset[:self.per_page + 1])
+        items = rows[:self.per_page]
+        next_cursor = self._encode(items[-1]) if len(rows) > self.per_page else None
+        return KeysetPage(items, next_cursor)
+
+    def _after(self, values):
+        # (a, b) after (x, y) is: a > x OR (a = x AND b > y), with < for descending fields
+        condition = Q()
+        equal = {}
+        for name, value in zip(self.ordering, values):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+    def _encode(self, obj):
+        values = [self.queryset.model._meta.get_field(f).value_to_string(obj) for f in self.fields]
+        return signing.dumps(values, salt=self._salt, compress=True)
+
+    def _decode(self, cursor):
+        try:
+            values = signing.loads(cursor, salt=self._salt)
+            return [self.queryset.model._meta.get_field(f).to_python(v) for f, v in zip(self.fields, values)]
+        except Exception as exc:
+            raise InvalidCursor(str(exc))
+
+
+def load_more_response(request, page, template_name, context):
+    """
+    JSON answer for a "load more" request: the rendered items and the next cursor.
+
+    `context` is passed to `template_name` together with the page as `page`.
+    """
+    html = render_to_string(template_name, {**context, 'page': page}, request=request)
+    return JsonResponse({'html': html, 'next_cursor': page.next_cursor})
+
+
+def wants_fragment(request):
+    return request.GET.get('format') == 'json'
+
+
+class KeysetListMixin:
+    """
+    ListView mixin that shows one keyset page and answers "load more" requests.
+
+    `?cursor=...` renders the full page from that position (works without
+    JavaScript); adding `format=json` returns only the rendered
+    `fragment_template_name` and the next cursor.
+    """
+    keyset_ordering = ('-id',)
+    keyset_per_page = 20
+    fragment_template_name = None
+
+    def get(self, request, *args, **kwargs):
+        paginator = KeysetPaginator(self.get_queryset(), self.keyset_ordering, self.keyset_per_page)
+        try:
+            self.page = paginator.page(request.GET.get('cursor'))
+        except InvalidCursor:
+            return HttpResponseBadRequest('Invalid cursor')
+        self.object_list = self.page.items
+        if wants_fragment(request):
+            return load_more_response(request, self.page, self.fragment_template_name, {'view': self})
+        return self.render_to_response(self.get_context_data())
+
+    def get_context_data(self, **kwargs):
+        kwargs.setdefault('page', self.page)
+        return super().get_context_data(**kwargs)
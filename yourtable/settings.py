@@ -64,6 +64,8 @@ INSTALLED_APPS = [
     'users',
     'reviews',
     'about',
+    'audit',
+    'perf',
 
 ]
 
@@ -72,8 +74,18 @@ LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
 MIDDLEWARE = [
+    # Records sanitized request metadata for replay when PERF_CAPTURE is on (see perf/capture.py)
+    'perf.capture.TrafficCaptureMiddleware',
+    # Server-Timing headers and per-view latency histograms (see perf/timing.py)
+    'perf.timing.RequestTimingMiddleware',
+    # Profiles single requests that carry a staff profiling token (see perf/profiling.py)
+    'perf.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Counts each request's SQL against its view's budget (see perf/budgets.py)
+    'perf.budgets.QueryBudgetMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Answers anonymous requests for cached pages before sessions and auth (see yourtable/pagecache.py)
+    'yourtable.pagecache.PageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -85,6 +97,23 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yourtable.urls'
 
+# Check project-level templates in `TEMPLATES['DIRS']` first so files
+# in the top-level `templates/` directory override third-party app
+# templates (e.g. django-allauth). Then fall back to app directories.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# TEMPLATE_CACHE keeps compiled templates in memory (Django's cached loader)
+# instead of reading and parsing them on every render; edits then need a
+# restart, so it is off under DEBUG. TEMPLATE_WARMUP compiles every template
+# when a worker boots (see yourtable/wsgi.py and perf/templates.py).
+TEMPLATE_CACHE = os.environ.get('TEMPLATE_CACHE', str(not DEBUG)).lower() in ('1', 'true', 'yes')
+TEMPLATE_WARMUP = os.environ.get('TEMPLATE_WARMUP', str(TEMPLATE_CACHE)).lower() in ('1', 'true', 'yes')
+# {% cachefragment %} (yourtable/templatetags/fragments.py) keeps the navbar,
+# footer and carousels in the site cache; FRAGMENT_CACHE=false renders them every time
+FRAGMENT_CACHE = os.environ.get('FRAGMENT_CACHE', 'true').lower() in ('1', 'true', 'yes')
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -92,13 +121,13 @@ TEMPLATES = [
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': False,
         'OPTIONS': {
-            # Check project-level templates in `TEMPLATES['DIRS']` first so files
-            # in the top-level `templates/` directory override third-party app
-            # templates (e.g. django-allauth). Then fall back to app directories.
-            'loaders': [
-                    'django.template.loaders.filesystem.Loader',
-                    'django.template.loaders.app_directories.Loader',
-                ],
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if TEMPLATE_CACHE else TEMPLATE_LOADERS
+            ),
+            'libraries': {
+                'fragments': 'yourtable.templatetags.fragments',
+            },
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -144,6 +173,23 @@ else:
     }
 
 
+# Cache
+# CACHE_URL selects the backend (see yourtable/caching.py): locmem:// in
+# development; file:///shared/dir or redis://host:6379/0 when several
+# gunicorn workers must see the same invalidations. `check --deploy` fails
+# on a locmem cache.
+from yourtable.caching import cache_config, is_shared  # noqa: E402
+
+CACHE_URL = os.environ.get('CACHE_URL', 'locmem://yourtable')
+CACHES = {
+    'default': cache_config(
+        CACHE_URL,
+        KEY_PREFIX=os.environ.get('CACHE_KEY_PREFIX', 'yourtable'),
+        TIMEOUT=int(os.environ.get('CACHE_TIMEOUT', 300)),
+    )
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -260,6 +306,77 @@ DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@yourtable.com
 #     EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 #     EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 
+# Transactional email outbox (bookings/outbox.py), drained by `manage.py drain_outbox`
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 6
+OUTBOX_BACKOFF_SECONDS = 30
+OUTBOX_BACKOFF_MAX_SECONDS = 3600
+OUTBOX_LEASE_SECONDS = 300
+
+# Booking reminders (bookings/reminders.py), queued by `manage.py send_reminders`
+REMINDER_HOURS_AHEAD = 24
+REMINDER_CHUNK_SIZE = 2000
+
+# History writes for audited models (see audit/writer.py):
+# 'sync' writes each history row inside the request, 'commit' writes one
+# bulk insert per committed transaction and 'interval' queues committed rows
+# for a background flush every AUDIT_HISTORY_FLUSH_MS milliseconds.
+AUDIT_HISTORY_MODE = os.environ.get('AUDIT_HISTORY_MODE', 'sync')
+AUDIT_HISTORY_FLUSH_MS = int(os.environ.get('AUDIT_HISTORY_FLUSH_MS', 200))
+AUDIT_HISTORY_BATCH_SIZE = 500
+# Every Nth history row per object stores a full snapshot; the rest store only changed fields
+AUDIT_CHECKPOINT_INTERVAL = int(os.environ.get('AUDIT_CHECKPOINT_INTERVAL', 10))
+# `manage.py archive_history` moves older rows into gzip files under AUDIT_ARCHIVE_DIR
+AUDIT_ARCHIVE_DIR = Path(os.environ.get('AUDIT_ARCHIVE_DIR', BASE_DIR / 'archive'))
+AUDIT_ARCHIVE_AFTER_DAYS = int(os.environ.get('AUDIT_ARCHIVE_AFTER_DAYS', 180))
+
+# Anonymous full-page cache (yourtable/pagecache.py): path patterns and the
+# cache tags their pages depend on. Pages are kept PAGE_CACHE_TIMEOUT seconds;
+# the previous copy is served to concurrent requests while one regenerates it.
+# On by default only with a shared CACHE_URL: with a per-process cache a purge
+# reaches one gunicorn worker and the others keep serving the old page.
+PAGE_CACHE = os.environ.get('PAGE_CACHE', str(is_shared(CACHE_URL))).lower() in ('1', 'true', 'yes')
+PAGE_CACHE_URLS = [
+    (r'^/$', []),
+    (r'^/about/$', []),
+    (r'^/menu/', ['menu', 'restaurants']),
+]
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 300))
+PAGE_CACHE_STALE_TIMEOUT = 24 * 60 * 60
+PAGE_CACHE_LOCK_TIMEOUT = 30
+PAGE_CACHE_LOCK_WAIT = 2
+
+# Query budgets (perf/budgets.py): record each request's SQL and warn about
+# views over budget or running the same statement PERF_NPLUSONE_THRESHOLD times
+PERF_QUERY_BUDGETS = os.environ.get('PERF_QUERY_BUDGETS', str(DEBUG)).lower() in ('1', 'true', 'yes')
+PERF_NPLUSONE_THRESHOLD = 3
+
+# Request timing (perf/timing.py): Server-Timing headers for staff and for
+# requests with a timing token, and latency histograms each worker copies into
+# the cache every PERF_METRICS_FLUSH_SECONDS for /perf/metrics/ (staff, or
+# `Authorization: Bearer $PERF_METRICS_TOKEN`)
+PERF_TIMING = os.environ.get('PERF_TIMING', 'true').lower() in ('1', 'true', 'yes')
+PERF_TIMING_TOKEN_MAX_AGE = 24 * 60 * 60
+PERF_METRICS_FLUSH_SECONDS = 10
+PERF_METRICS_TTL = 24 * 60 * 60
+PERF_METRICS_TOKEN = os.environ.get('PERF_METRICS_TOKEN', '')
+
+# On-demand profiling (perf/profiling.py): requests carrying a signed staff
+# token are profiled; the newest PERF_PROFILE_MAX_FILES profiles are kept
+PERF_PROFILING = os.environ.get('PERF_PROFILING', 'true').lower() in ('1', 'true', 'yes')
+PERF_PROFILE_DIR = Path(os.environ.get('PERF_PROFILE_DIR', BASE_DIR / 'profiles'))
+PERF_PROFILE_MAX_FILES = int(os.environ.get('PERF_PROFILE_MAX_FILES', 50))
+PERF_PROFILE_TOKEN_MAX_AGE = 60 * 60
+PERF_PROFILE_SAMPLE_INTERVAL = 0.001
+
+# Traffic capture (perf/capture.py): sanitized metadata of a share of the
+# requests, one rotating JSONL file per worker, for `manage.py replay_traffic`
+PERF_CAPTURE = os.environ.get('PERF_CAPTURE', 'false').lower() in ('1', 'true', 'yes')
+PERF_CAPTURE_DIR = Path(os.environ.get('PERF_CAPTURE_DIR', BASE_DIR / 'captures'))
+PERF_CAPTURE_SAMPLE_RATE = float(os.environ.get('PERF_CAPTURE_SAMPLE_RATE', 1.0))
+PERF_CAPTURE_MAX_BYTES = 10 * 1024 * 1024
+PERF_CAPTURE_BACKUPS = 5
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
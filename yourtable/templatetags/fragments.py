@@ -0,0 +1,114 @@
+"""
+{% cachefragment %}: keep a rendered piece of template in the site cache.
+
+    {% load fragments %}
+    {% cachefragment "navbar" request.resolver_match.url_name vary="auth" %}
+        ...
+    {% endcachefragment %}
+
+The first argument names the fragment and any further arguments are key
+parts, as with Django's {% cache %}. Keyword arguments:
+
+    vary="none"         one copy for every visitor (the default)
+    vary="auth"         one copy for anonymous visitors, one for signed-in users
+    vary="user"         one copy per user
+    tags="menu,..."     yourtable.caching tags the fragment depends on
+    timeout=600         seconds (default: the cache's own timeout)
+
+Keys also include a hash of the fragment's own template source, so after a
+deploy that edits it a shared cache never serves the old markup. A
+{% csrf_token %} inside the fragment is cached as a placeholder and replaced
+with the visitor's token on every render.
+
+FRAGMENT_CACHE = False renders every fragment normally.
+"""
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.template.base import token_kwargs
+from django.utils.safestring import mark_safe
+
+from yourtable import caching
+
+register = template.Library()
+
+CSRF_PLACEHOLDER = 'csrf-token-placeholder-9f3a61'
+VARY_CHOICES = ('none', 'auth', 'user')
+
+
+def source_hash(tokens):
+    digest = hashlib.md5()
+    for token in tokens:
+        digest.update(f'{token.token_type.value}:{token.contents}\n'.encode())
+    return digest.hexdigest()[:12]
+
+
+class CacheFragmentNode(template.Node):
+    def __init__(self, nodelist, name, parts, options, version):
+        self.nodelist = nodelist
+        self.name = name
+        self.parts = parts
+        self.options = options
+        self.version = version
+
+    def option(self, context, name, default=None):
+        value = self.options.get(name)
+        return default if value is None else value.resolve(context)
+
+    def render(self, context):
+        if not getattr(settings, 'FRAGMENT_CACHE', True):
+            return self.nodelist.render(context)
+
+        parts = [self.version, *(part.resolve(context) for part in self.parts)]
+        vary = self.option(context, 'vary', 'none')
+        if vary not in VARY_CHOICES:
+            raise template.TemplateSyntaxError(f'cachefragment vary must be one of {", ".join(VARY_CHOICES)}, not {vary!r}')
+        if vary != 'none':
+            user = context.get('user')
+            signed_in = user is not None and user.is_authenticated
+            if vary == 'auth':
+                parts.append('auth' if signed_in else 'anonymous')
+            else:
+                parts.append(f'user={user.pk}' if signed_in else 'anonymous')
+        tags = [tag.strip() for tag in str(self.option(context, 'tags', '')).split(',') if tag.strip()]
+        timeout = self.option(context, 'timeout')
+
+        def render():
+            with context.push(csrf_token=CSRF_PLACEHOLDER):
+                return str(self.nodelist.render(context))
+
+        html = caching.get_or_set(
+            f'fragment:{self.name.resolve(context)}', render, *parts,
+            tags=tags, timeout=None if timeout is None else int(timeout),
+        )
+        if CSRF_PLACEHOLDER in html:
+            html = html.replace(CSRF_PLACEHOLDER, str(context.get('csrf_token', '')))
+        return mark_safe(html)
+
+
+@register.tag
+def cachefragment(parser, token):
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f'{bits[0]!r} needs a fragment name')
+    args, options = [], {}
+    for bit in bits[1:]:
+        kwarg = token_kwargs([bit], parser)
+        if kwarg:
+            options.update(kwarg)
+        elif options:
+            raise template.TemplateSyntaxError(f'{bits[0]!r} key parts must come before keyword arguments')
+        else:
+            args.append(parser.compile_filter(bit))
+    unknown = set(options) - {'vary', 'tags', 'timeout'}
+    if unknown:
+        raise template.TemplateSyntaxError(f'{bits[0]!r} got unknown arguments: {", ".join(sorted(unknown))}')
+
+    # The parser pops tokens off the end of its list, so what parse() consumes
+    # is the tail of the list as it was before
+    remaining = list(parser.tokens)
+    nodelist = parser.parse(('endcachefragment',))
+    version = source_hash(remaining[len(parser.tokens):])
+    parser.delete_first_token()
+    return CacheFragmentNode(nodelist, args[0], args[1:], options, version)
@@ -0,0 +1,99 @@
+import tempfile
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+
+from menu.models import MenuCategory, MenuItem, Restaurant
+from reviews.models import Review
+from yourtable import caching
+
+
+class CacheConfigTests(TestCase):
+    def test_urls_map_to_backends(self):
+        self.assertEqual(caching.cache_config('locmem://site')['LOCATION'], 'site')
+        config = caching.cache_config('file:///var/tmp/cache', TIMEOUT=60)
+        self.assertEqual(
+            (config['BACKEND'], config['LOCATION'], config['TIMEOUT']),
+            ('django.core.cache.backends.filebased.FileBasedCache', '/var/tmp/cache', 60),
+        )
+        self.assertEqual(caching.cache_config('redis://cache:6379/1')['LOCATION'], 'redis://cache:6379/1')
+        with self.assertRaises(ImproperlyConfigured):
+            caching.cache_config('memcached://cache:11211')
+        with self.assertRaises(ImproperlyConfigured):
+            caching.cache_config('file://')
+
+    def test_deploy_check_requires_a_shared_backend(self):
+        self.assertTrue(caching.is_shared('redis://cache:6379/1'))
+        self.assertFalse(caching.is_shared('locmem://site'))
+        with override_settings(CACHES={'default': caching.cache_config('locmem://site')}):
+            self.assertEqual([e.id for e in caching.check_shared_cache()], ['yourtable.E001'])
+        with override_settings(CACHES={'default': caching.cache_config('file:///var/tmp/cache')}):
+            self.assertEqual(caching.check_shared_cache(), [])
+
+
+class TaggedCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = MenuCategory.objects.create(name="Mains", slug="mains")
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return f"value {self.calls}"
+
+    def test_values_are_reused_until_a_tag_is_bumped(self):
+        self.assertEqual(caching.get_or_set('menu-list', self.compute, tags=['menu']), "value 1")
+        self.assertEqual(caching.get_or_set('menu-list', self.compute, tags=['menu']), "value 1")
+        # Other key parts and unrelated tags are separate entries
+        self.assertEqual(caching.get_or_set('menu-list', self.compute, 'en', tags=['menu']), "value 2")
+        caching.bump('reviews')
+        self.assertEqual(caching.get_or_set('menu-list', self.compute, tags=['menu']), "value 1")
+        caching.bump('menu')
+        self.assertEqual(caching.get_or_set('menu-list', self.compute, tags=['menu']), "value 3")
+
+    def test_evicted_tags_do_not_resurrect_old_values(self):
+        key = caching.make_key('menu-list', tags=['menu'])
+        cache.delete(caching.TAG_PREFIX + 'menu')
+        self.assertNotEqual(caching.make_key('menu-list', tags=['menu']), key)
+
+    def test_model_changes_bump_tags_on_commit(self):
+        before = caching.make_key('menu-list', tags=['menu'])
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            item = MenuItem.objects.create(category=self.category, name="Stew", slug="stew", price=Decimal("9.50"))
+        # Nothing changes until the transaction commits
+        self.assertEqual(caching.make_key('menu-list', tags=['menu']), before)
+        for callback in callbacks:
+            callback()
+        after = caching.make_key('menu-list', tags=['menu'])
+        self.assertNotEqual(after, before)
+
+        item_key = caching.make_key('item', tags=[f'menu.menuitem:{item.pk}'])
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        self.assertNotEqual(caching.make_key('item', tags=[f'menu.menuitem:{item.pk}']), item_key)
+
+    def test_registered_models(self):
+        cases = [
+            (lambda: self.category.save(), 'menu'),
+            (lambda: Restaurant.objects.create(name="Bistro", slug="bistro"), 'restaurants'),
+            (lambda: Review.objects.create(rating=4, guest_name="Sam"), 'reviews'),
+            (lambda: Review.objects.all().audited_update(rating=2), 'reviews'),
+        ]
+        for change, tag in cases:
+            with self.subTest(tag=tag):
+                before = caching.make_key('page', tags=[tag])
+                with self.captureOnCommitCallbacks(execute=True):
+                    change()
+                self.assertNotEqual(caching.make_key('page', tags=[tag]), before)
+
+
+class FileCacheTests(TestCase):
+    def test_tags_work_on_a_shared_file_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(CACHES={'default': caching.cache_config(f'file://{directory}')}):
+                first = caching.get_or_set('page', lambda: 'one', tags=['menu'])
+                caching.bump('menu')
+                second = caching.get_or_set('page', lambda: 'two', tags=['menu'])
+        self.assertEqual((first, second), ('one', 'two'))
@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.template import Context, Template, TemplateSyntaxError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from yourtable import caching
+
+
+class CacheFragmentTagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        self.alice = get_user_model().objects.create_user("alice", "alice@example.com", "pass1234")
+        self.bob = get_user_model().objects.create_user("bob", "bob@example.com", "pass1234")
+
+    def count(self):
+        self.calls += 1
+        return self.calls
+
+    def render(self, source, user=None, **context):
+        template = Template("{% load fragments %}" + source)
+        return template.render(Context({"count": self.count, "user": user or AnonymousUser(), **context}))
+
+    def test_fragments_are_rendered_once(self):
+        source = '{% cachefragment "box" %}[{{ count }}]{% endcachefragment %}'
+        self.assertEqual(self.render(source), "[1]")
+        self.assertEqual(self.render(source, user=self.alice), "[1]")
+        with override_settings(FRAGMENT_CACHE=False):
+            self.assertEqual(self.render(source), "[2]")
+
+    def test_vary_on_auth_and_user(self):
+        source = '{% cachefragment "box" vary="auth" %}[{{ count }}]{% endcachefragment %}'
+        self.assertEqual(self.render(source), "[1]")
+        self.assertEqual(self.render(source, user=self.alice), "[2]")
+        self.assertEqual(self.render(source, user=self.bob), "[2]")
+        self.assertEqual(self.render(source), "[1]")
+
+        source = '{% cachefragment "box" vary="user" %}[{{ count }}]{% endcachefragment %}'
+        self.assertEqual(self.render(source, user=self.alice), "[3]")
+        self.assertEqual(self.render(source, user=self.bob), "[4]")
+        self.assertEqual(self.render(source, user=self.alice), "[3]")
+
+    def test_key_parts_tags_and_source(self):
+        source = '{% cachefragment "box" page tags="menu" %}[{{ count }}]{% endcachefragment %}'
+        self.assertEqual(self.render(source, page="home"), "[1]")
+        self.assertEqual(self.render(source, page="about"), "[2]")
+        self.assertEqual(self.render(source, page="home"), "[1]")
+        caching.bump("menu")
+        self.assertEqual(self.render(source, page="home"), "[3]")
+        # Editing the fragment's markup changes its key
+        edited = '{% cachefragment "box" page tags="menu" %}<{{ count }}>{% endcachefragment %}'
+        self.assertEqual(self.render(edited, page="home"), "<4>")
+
+    def test_csrf_token_is_never_cached(self):
+        source = '{% cachefragment "form" %}{% csrf_token %}{% endcachefragment %}'
+        self.assertIn('value="first-token"', self.render(source, csrf_token="first-token"))
+        self.assertIn('value="second-token"', self.render(source, csrf_token="second-token"))
+
+    def test_bad_arguments(self):
+        with self.assertRaises(TemplateSyntaxError):
+            self.render('{% cachefragment %}{% endcachefragment %}')
+        with self.assertRaises(TemplateSyntaxError):
+            self.render('{% cachefragment "box" colour="red" %}{% endcachefragment %}')
+        with self.assertRaises(TemplateSyntaxError):
+            self.render('{% cachefragment "box" vary="everyone" %}{% endcachefragment %}')
+
+    def test_navbar_follows_sign_in_state(self):
+        home = reverse("home")
+        self.assertContains(self.client.get(home), "Login")
+        self.client.force_login(self.alice)
+        response = self.client.get(home)
+        self.assertNotContains(response, "Login</a>")
+        self.assertContains(response, 'name="csrfmiddlewaretoken"')
+        # The page title in the navbar is part of the key
+        self.assertContains(self.client.get(reverse("menu:menu_list")), "\n                    Menu\n")
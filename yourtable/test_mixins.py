@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from bookings.models import Booking
+from menu.models import Restaurant
+from reviews.models import Review
+
+
+class OwnerRequiredMixinTests(TestCase):
+    """Ownership-checked views load their object once and never load its owner."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username="diner", password="pass1234")
+        self.other = User.objects.create_user(username="other", password="pass1234")
+        restaurant = Restaurant.objects.create(name="Test Restaurant", slug="test-restaurant")
+        self.booking = Booking.objects.create(
+            user=self.user, restaurant=restaurant, date=timezone.now() + timedelta(days=1), guests=2
+        )
+        self.review = Review.objects.create(user=self.user, rating=5)
+        self.client.login(username="diner", password="pass1234")
+
+    def urls(self):
+        return [
+            reverse("bookings:booking_detail", args=[self.booking.pk]),
+            reverse("bookings:booking_update", args=[self.booking.pk]),
+            reverse("bookings:booking_delete", args=[self.booking.pk]),
+            reverse("reviews:review_update", args=[self.review.pk]),
+            reverse("reviews:review_delete", args=[self.review.pk]),
+        ]
+
+    def test_object_is_fetched_once(self):
+        expected = {
+            # session, user, object, then what the page itself needs
+            # (history, its checkpoints, and one lookup per related model)
+            "booking_detail": 7,
+            "booking_update": 4,
+            "booking_delete": 3,
+            "review_update": 3,
+            "review_delete": 3,
+        }
+        for url, (name, count) in zip(self.urls(), expected.items()):
+            with self.subTest(view=name):
+                with self.assertNumQueries(count):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_other_users_are_refused(self):
+        self.client.login(username="other", password="pass1234")
+        for url in self.urls():
+            with self.subTest(url=url):
+                with self.assertNumQueries(3):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 403)
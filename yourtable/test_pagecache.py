@@ -0,0 +1,130 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from menu.models import MenuCategory, MenuItem
+from yourtable import caching, pagecache
+
+
+@override_settings(PAGE_CACHE=True)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = MenuCategory.objects.create(name="Mains", slug="mains")
+        self.item = MenuItem.objects.create(category=category, name="Risotto", slug="risotto", price=Decimal("12.00"))
+        self.url = reverse("menu:menu_list")
+
+    def test_anonymous_repeat_visits_are_served_from_the_cache(self):
+        self.assertEqual(self.client.get(self.url)["X-Page-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Page-Cache"], "HIT")
+        self.assertContains(response, "Risotto")
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        # Query strings are separate pages
+        self.assertEqual(self.client.get(self.url, {"free_from": "nuts"})["X-Page-Cache"], "MISS")
+
+    def test_signed_in_visitors_and_waiting_messages_bypass_the_cache(self):
+        self.client.get(self.url)
+        self.client.cookies["messages"] = "pending"
+        self.assertNotIn("X-Page-Cache", self.client.get(self.url))
+        del self.client.cookies["messages"]
+
+        self.client.force_login(get_user_model().objects.create_user("diner", "diner@example.com", "pass1234"))
+        response = self.client.get(self.url)
+        self.assertNotIn("X-Page-Cache", response)
+        self.assertContains(response, "Profile")
+        self.assertNotIn("X-Page-Cache", self.client.get(reverse("home")))
+
+    def test_menu_changes_purge_the_menu_pages(self):
+        self.client.get(self.url)
+        self.client.get(reverse("home"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.name = "Mushroom Risotto"
+            self.item.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Page-Cache"], "MISS")
+        self.assertContains(response, "Mushroom Risotto")
+        self.assertEqual(self.client.get(reverse("home"))["X-Page-Cache"], "HIT")
+
+        out = io.StringIO()
+        call_command("purge_page_cache", stdout=out)
+        self.assertIn("Purged cached pages tagged pages", out.getvalue())
+        self.assertEqual(self.client.get(reverse("home"))["X-Page-Cache"], "MISS")
+
+    @override_settings(PAGE_CACHE_URLS=[(r"^/accounts/login/$", [])])
+    def test_pages_with_a_csrf_token_are_not_stored(self):
+        url = reverse("account_login")
+        self.assertEqual(self.client.get(url)["X-Page-Cache"], "MISS")
+        self.assertEqual(self.client.get(url)["X-Page-Cache"], "MISS")
+
+    def test_other_paths_are_not_cached(self):
+        self.assertNotIn("X-Page-Cache", self.client.get(reverse("reviews:review_list")))
+
+    def test_purges_reach_other_processes_sharing_the_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            url = f"file://{directory}"
+            config = caching.cache_config(url, KEY_PREFIX=settings.CACHES["default"]["KEY_PREFIX"])
+            with override_settings(CACHES={"default": config}):
+                self.client.get(self.url)
+                self.assertEqual(self.client.get(self.url)["X-Page-Cache"], "HIT")
+                # Another process on the same cache, as a second gunicorn worker would be
+                subprocess.run(
+                    [sys.executable, "manage.py", "purge_page_cache"],
+                    cwd=settings.BASE_DIR, env={**os.environ, "CACHE_URL": url}, check=True, capture_output=True,
+                )
+                self.assertEqual(self.client.get(self.url)["X-Page-Cache"], "MISS")
+
+
+@override_settings(PAGE_CACHE=True)
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.renders = 0
+        self.middleware = pagecache.PageCacheMiddleware(self.slow_view)
+
+    def slow_view(self, request):
+        self.renders += 1
+        time.sleep(0.2)
+        return HttpResponse(f"render {self.renders}")
+
+    def burst(self, count=8):
+        results = []
+
+        def visit():
+            response = self.middleware(RequestFactory().get("/"))
+            results.append((response["X-Page-Cache"], response.content.decode()))
+
+        threads = [threading.Thread(target=visit) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_one_request_regenerates_a_missing_page(self):
+        results = self.burst()
+        self.assertEqual(self.renders, 1)
+        self.assertEqual({content for _, content in results}, {"render 1"})
+        self.assertEqual(sorted(status for status, _ in results), ["HIT"] * 7 + ["MISS"])
+
+    def test_others_get_the_previous_copy_while_a_purged_page_regenerates(self):
+        self.burst(1)
+        pagecache.purge()
+        results = self.burst()
+        self.assertEqual(self.renders, 2)
+        self.assertIn(("MISS", "render 2"), results)
+        self.assertEqual(results.count(("STALE", "render 1")), 7)
@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from bookings.models import Booking
+from menu.models import Restaurant
+from reviews.models import Review
+from yourtable.pagination import InvalidCursor, KeysetPaginator
+
+
+class KeysetPaginatorTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="diner", password="pass1234")
+        restaurant = Restaurant.objects.create(name="Test Restaurant", slug="test-restaurant")
+        start = timezone.now() + timedelta(days=1)
+        # Pairs of bookings share a date so the id tie-breaker matters
+        self.bookings = [
+            Booking.objects.create(user=self.user, restaurant=restaurant, date=start + timedelta(days=i // 2), guests=2)
+            for i in range(7)
+        ]
+
+    def walk(self, paginator):
+        seen, cursor = [], None
+        while True:
+            page = paginator.page(cursor)
+            seen.extend(b.pk for b in page)
+            if not page.has_next:
+                return seen
+            cursor = page.next_cursor
+
+    def test_pages_cover_every_row_once_in_order(self):
+        paginator = KeysetPaginator(Booking.objects.all(), ("date", "id"), per_page=3)
+        self.assertEqual(self.walk(paginator), [b.pk for b in self.bookings])
+        paginator = KeysetPaginator(Booking.objects.all(), ("-date", "-id"), per_page=2)
+        self.assertEqual(self.walk(paginator), [b.pk for b in reversed(self.bookings)])
+
+    def test_pages_run_one_query_without_count(self):
+        paginator = KeysetPaginator(Booking.objects.all(), ("date", "id"), per_page=3)
+        cursor = paginator.page().next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            paginator.page(cursor)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("COUNT", queries[0]["sql"].upper())
+        self.assertNotIn("OFFSET", queries[0]["sql"].upper())
+
+    def test_tampered_cursor_is_rejected(self):
+        paginator = KeysetPaginator(Booking.objects.all(), ("date", "id"), per_page=3)
+        cursor = paginator.page().next_cursor
+        with self.assertRaises(InvalidCursor):
+            paginator.page(cursor[:-2] + "xx")
+        with self.assertRaises(InvalidCursor):
+            KeysetPaginator(Booking.objects.all(), ("-date", "-id")).page(cursor)
+
+
+class LoadMoreViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="diner", password="pass1234")
+        restaurant = Restaurant.objects.create(name="Test Restaurant", slug="test-restaurant")
+        for days in range(25):
+            Booking.objects.create(
+                user=self.user, restaurant=restaurant, date=timezone.now() + timedelta(days=days + 1), guests=2
+            )
+        self.client.login(username="diner", password="pass1234")
+
+    def test_booking_list_loads_more_as_json(self):
+        response = self.client.get(reverse("bookings:booking_list"))
+        self.assertEqual(len(response.context["bookings"]), 20)
+        cursor = response.context["page"].next_cursor
+        self.assertContains(response, "Load more")
+
+        response = self.client.get(reverse("bookings:booking_list"), {"cursor": cursor, "format": "json"})
+        data = response.json()
+        self.assertIsNone(data["next_cursor"])
+        self.assertEqual(data["html"].count("booking-card"), 5)
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        response = self.client.get(reverse("bookings:booking_list"), {"cursor": "nope"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_profile_pages_each_list(self):
+        response = self.client.get(reverse("users:profile"))
+        self.assertEqual(len(response.context["bookings"]), 20)
+        cursor = response.context["booking_history"].next_cursor
+        response = self.client.get(reverse("users:profile"), {"history_cursor": cursor, "format": "json"})
+        self.assertEqual(response.json()["html"].count("activity-item"), 5)
+
+    def test_reviews_load_more(self):
+        for rating in range(22):
+            Review.objects.create(user=self.user, rating=rating % 5 + 1)
+        response = self.client.get(reverse("reviews:review_list"))
+        cursor = response.context["page"].next_cursor
+        response = self.client.get(reverse("reviews:review_list"), {"cursor": cursor, "format": "json"})
+        self.assertEqual(response.json()["html"].count('class="card mb-2"'), 2)
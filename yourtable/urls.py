@@ -29,6 +29,7 @@ urlpatterns = [
     path('users/', include('users.urls')),
     path("accounts/", include("allauth.urls")),
     path('reviews/', include('reviews.urls')),
+    path('perf/', include('perf.urls')),
 ]
 
 if settings.DEBUG:
@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yourtable.settings')
 
 application = get_wsgi_application()
+
+# Compile every template while the worker boots rather than on first use
+from django.conf import settings  # noqa: E402
+
+if settings.TEMPLATE_WARMUP:
+    from perf.templates import warm_up  # noqa: E402
+
+    warm_up()